@@ -0,0 +1,192 @@
+"""
+Closed-loop load test of the webhook and conversation detail endpoints.
+Each scenario keeps --concurrency connections busy for --duration seconds
+against every --target and reports requests/second and latency
+percentiles, e.g. the sync gunicorn deployment against the async views on
+uvicorn with the same WEB_CONCURRENCY and WEB_CPUS:
+
+    docker compose --profile asgi up -d
+    poetry run python benchmarks/load_test.py \\
+        --target sync=http://127.0.0.1:8000 --target async=http://127.0.0.1:8002
+
+Scenarios: ``webhook`` posts NEW_MESSAGE events, ``detail`` reads a
+(cached) conversation, ``delta`` reads ``?since=`` pages straight from
+Postgres and ``longpoll`` holds ``?wait=`` requests open with no new
+messages, the case where a sync worker sits idle for the whole wait.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+SCENARIOS = ("webhook", "detail", "delta", "longpoll")
+RESULT_HEADER = "{:<10}  {:<9}  {:>9}  {:>9}  {:>9}  {:>9}  {:>7}"
+RESULT_LINE = "{:<10}  {:<9}  {:>9}  {:>9.1f}  {:>9.2f}  {:>9.2f}  {:>7}"
+
+
+class HTTPConnection:
+    """Minimal HTTP/1.1 client over one keep-alive connection."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        )
+        self.writer.write(head.encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by the server")
+        headers = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "content-length" in headers:
+            content = await self.reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            content = await self._read_chunked()
+        else:
+            content = await self.reader.read()
+            headers["connection"] = "close"
+        # gunicorn's sync workers close the connection after every response.
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return int(status_line.split()[1]), content
+
+    async def _read_chunked(self) -> bytes:
+        content = b""
+        while size := int((await self.reader.readline()).split(b";")[0], 16):
+            content += await self.reader.readexactly(size)
+            await self.reader.readline()
+        await self.reader.readline()
+        return content
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = self.reader = None
+
+
+def new_message_event(conversation_id: str) -> bytes:
+    return json.dumps({
+        "type": "NEW_MESSAGE",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "data": {"id": str(uuid.uuid4()), "conversation_id": conversation_id, "content": "Olá, tudo bem?"},
+    }).encode()
+
+
+async def create_conversations(connection: HTTPConnection, count: int, messages: int) -> list[tuple[str, str]]:
+    """Conversations with ``messages`` messages each and the delta cursor after them."""
+    conversations = []
+    for _ in range(count):
+        conversation_id = str(uuid.uuid4())
+        status, _ = await connection.request("POST", "/webhook/", json.dumps({
+            "type": "NEW_CONVERSATION",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "data": {"id": conversation_id},
+        }).encode())
+        assert status == 201, status
+        for _ in range(messages):
+            status, _ = await connection.request("POST", "/webhook/", new_message_event(conversation_id))
+            assert status == 202, status
+        status, content = await connection.request("GET", f"/conversations/{conversation_id}/?since=")
+        assert status == 200, status
+        conversations.append((conversation_id, json.loads(content)["cursor"]))
+    return conversations
+
+
+def next_request(scenario: str, conversation_id: str, cursor: str, wait: float) -> tuple[str, str, bytes]:
+    if scenario == "webhook":
+        return "POST", "/webhook/", new_message_event(conversation_id)
+    if scenario == "detail":
+        return "GET", f"/conversations/{conversation_id}/", b""
+    if scenario == "delta":
+        return "GET", f"/conversations/{conversation_id}/?since=", b""
+    return "GET", f"/conversations/{conversation_id}/?since={cursor}&wait={wait}", b""
+
+
+async def run_client(host, port, scenario, conversations, deadline, wait, latencies, errors) -> None:
+    connection = HTTPConnection(host, port)
+    index = 0
+    while time.monotonic() < deadline:
+        conversation_id, cursor = conversations[index % len(conversations)]
+        index += 1
+        method, path, body = next_request(scenario, conversation_id, cursor, wait)
+        started = time.perf_counter()
+        try:
+            status, _ = await connection.request(method, path, body)
+        except (OSError, asyncio.IncompleteReadError):
+            await connection.close()
+            errors.append(None)
+            continue
+        latencies.append(time.perf_counter() - started)
+        if status >= 400:
+            errors.append(status)
+    await connection.close()
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_scenario(name, url, scenario, conversations, options) -> None:
+    parts = urlsplit(url)
+    latencies, errors = [], []
+    started = time.monotonic()
+    deadline = started + options.duration
+    await asyncio.gather(*[
+        run_client(parts.hostname, parts.port or 80, scenario, conversations, deadline, options.wait, latencies, errors)
+        for _ in range(options.concurrency)
+    ])
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    if not latencies:
+        print(RESULT_HEADER.format(name, scenario, 0, "-", "-", "-", len(errors)))
+        return
+    print(RESULT_LINE.format(
+        name,
+        scenario,
+        len(latencies),
+        len(latencies) / elapsed,
+        percentile(latencies, 0.50) * 1000,
+        percentile(latencies, 0.99) * 1000,
+        len(errors),
+    ))
+
+
+async def main(options) -> None:
+    print(RESULT_HEADER.format("target", "scenario", "requests", "req/s", "p50 ms", "p99 ms", "errors"))
+    for target in options.target:
+        name, _, url = target.rpartition("=")
+        parts = urlsplit(url)
+        for scenario in options.scenario or SCENARIOS:
+            # Fresh conversations, so earlier scenarios don't grow them or
+            # wake up the long-polls.
+            setup_connection = HTTPConnection(parts.hostname, parts.port or 80)
+            conversations = await create_conversations(setup_connection, options.conversations, options.messages)
+            await setup_connection.close()
+            await run_scenario(name or url, url, scenario, conversations, options)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", required=True, help="[name=]base URL, repeatable.")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Defaults to all of them.")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent connections.")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per scenario and target.")
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=20, help="Messages per conversation.")
+    parser.add_argument("--wait", type=float, default=0.5, help="?wait= of the longpoll scenario.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""
+Compares rendering a conversation detail body through the DRF serializers
+with the fast read path (values_list rows + orjson), at several conversation
+sizes. Each timing is the best of ``--repeat`` runs of fetching the messages and
+encoding the body.
+
+The messages are inserted inside a transaction that is rolled back at the
+end, so it can run against the development database:
+
+    poetry run python benchmarks/render_conversation.py --sizes 10 1000 100000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "realmate_challenge.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from realmate_challenge_app.models import Conversation, Message  # noqa: E402
+from realmate_challenge_app.serializers.fast import message_rows, render_conversation_detail  # noqa: E402
+from realmate_challenge_app.serializers.responses import ConversationDetailSerializer  # noqa: E402
+
+RESULT_HEADER = "{:>9}  {:>12}  {:>12}  {:>8}"
+RESULT_LINE = "{:>9}  {:>10.2f}ms  {:>10.2f}ms  {:>7.1f}x"
+
+
+def render_with_drf(conversation, queryset) -> bytes:
+    context = {"messages": list(queryset), "next": None, "previous": None}
+    return JSONRenderer().render(ConversationDetailSerializer(conversation, context=context).data)
+
+
+def render_fast(conversation, queryset) -> bytes:
+    return render_conversation_detail(conversation, list(message_rows(queryset)), None, None)
+
+
+def best_of(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings) * 1000
+
+
+def create_conversation(size: int) -> Conversation:
+    conversation = Conversation.objects.create(id=uuid.uuid4())
+    base_timestamp = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    Message.objects.bulk_create(
+        (
+            Message(
+                conversation_id=conversation,
+                content=f"Mensagem {index} com acentuação",
+                timestamp=base_timestamp + timedelta(milliseconds=index),
+            )
+            for index in range(size)
+        ),
+        batch_size=5000,
+    )
+    return conversation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    print(RESULT_HEADER.format("messages", "drf", "fast", "speedup"))
+    with transaction.atomic():
+        for size in options.sizes:
+            conversation = create_conversation(size)
+            queryset = Message.objects.filter(conversation_id=conversation.id).order_by("timestamp", "id")
+            assert render_fast(conversation, queryset) == render_with_drf(conversation, queryset)
+
+            drf_ms = best_of(lambda: render_with_drf(conversation, queryset), options.repeat)
+            fast_ms = best_of(lambda: render_fast(conversation, queryset), options.repeat)
+            print(RESULT_LINE.format(size, drf_ms, fast_ms, drf_ms / fast_ms))
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
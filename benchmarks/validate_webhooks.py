@@ -0,0 +1,86 @@
+"""
+Compares decoding and validating webhook events with the DRF serializers
+(stdlib JSON parsing + Serializer.is_valid) against the msgspec decoder used
+when WEBHOOK_VALIDATION_BACKEND is 'msgspec'. Needs no database:
+
+    poetry run python benchmarks/validate_webhooks.py --number 20000
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import timeit
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "realmate_challenge.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.parsers import JSONParser  # noqa: E402
+
+from realmate_challenge_app.serializers.fast_payloads import webhook_event_decoder  # noqa: E402
+from realmate_challenge_app.serializers.payloads import (  # noqa: E402
+    CloseConversationPayloadSerializer,
+    NewConversationPayloadSerializer,
+    NewMessagePayloadSerializer,
+)
+
+RESULT_HEADER = "{:<20}  {:>10}  {:>10}  {:>8}"
+RESULT_LINE = "{:<20}  {:>8.2f}us  {:>8.2f}us  {:>7.1f}x"
+TIMESTAMP = "2025-02-21T10:20:42.123456Z"
+
+EVENTS = {
+    "NEW_CONVERSATION": (
+        NewConversationPayloadSerializer,
+        {"type": "NEW_CONVERSATION", "timestamp": TIMESTAMP, "data": {"id": str(uuid.uuid4())}},
+    ),
+    "NEW_MESSAGE": (
+        NewMessagePayloadSerializer,
+        {
+            "type": "NEW_MESSAGE",
+            "timestamp": TIMESTAMP,
+            "data": {"id": str(uuid.uuid4()), "content": "Olá, quero saber do meu pedido", "conversation_id": str(uuid.uuid4())},
+        },
+    ),
+    "CLOSE_CONVERSATION": (
+        CloseConversationPayloadSerializer,
+        {"type": "CLOSE_CONVERSATION", "timestamp": TIMESTAMP, "data": {"id": str(uuid.uuid4())}},
+    ),
+}
+
+
+def validate_with_drf(serializer_class, body: bytes) -> dict:
+    serializer = serializer_class(data=JSONParser().parse(io.BytesIO(body)))
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="Events validated per measurement.")
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    print(RESULT_HEADER.format("event", "drf", "msgspec", "speedup"))
+    for payload_type, (serializer_class, payload) in EVENTS.items():
+        body = json.dumps(payload).encode()
+        assert webhook_event_decoder.decode(body) == (payload_type, validate_with_drf(serializer_class, body))
+
+        drf_seconds = min(timeit.repeat(
+            lambda: validate_with_drf(serializer_class, body), number=options.number, repeat=options.repeat
+        ))
+        msgspec_seconds = min(timeit.repeat(
+            lambda: webhook_event_decoder.decode(body), number=options.number, repeat=options.repeat
+        ))
+        drf_us = drf_seconds / options.number * 1e6
+        msgspec_us = msgspec_seconds / options.number * 1e6
+        print(RESULT_LINE.format(payload_type, drf_us, msgspec_us, drf_us / msgspec_us))
+
+
+if __name__ == "__main__":
+    main()
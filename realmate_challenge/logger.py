@@ -1,8 +1,167 @@
+import os
+import queue
+import random
 import sys
+import threading
+import time
+import traceback
+
+import orjson
+from django.conf import settings
 from loguru import logger
 
-logger.add(
-    sys.stdout, 
-    level="DEBUG", 
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
 )
+MSG_LOG_RECORDS_DROPPED = "{} log records dropped while the log writer was behind."
+WRITER_STOP_TIMEOUT_SECONDS = 5
+
+
+class BackgroundWriter:
+    """
+    File-like loguru sink that hands formatted records to a daemon thread,
+    so logging calls never wait on stdout. Records that arrive while
+    ``max_queued`` are already waiting are dropped and counted. Forked
+    children (gunicorn and Celery workers) start a writer of their own.
+    """
+
+    def __init__(self, stream, max_queued: int):
+        self.stream = stream
+        self.max_queued = max_queued
+        self._start()
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self) -> None:
+        self._queue = queue.Queue(self.max_queued)
+        self._dropped = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message: str) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self._dropped += 1
+
+    def isatty(self) -> bool:
+        return self.stream.isatty()
+
+    def stop(self) -> None:
+        """Writes what is still queued; loguru calls it when the sink is removed."""
+        self._queue.put(None)
+        self._thread.join(WRITER_STOP_TIMEOUT_SECONDS)
+
+    def _run(self) -> None:
+        while True:
+            messages = [self._queue.get()]
+            while len(messages) < self.max_queued:
+                try:
+                    messages.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in messages
+            try:
+                self.stream.write("".join(message for message in messages if message is not None))
+                self.stream.flush()
+            except (OSError, ValueError):
+                # Closed stream or broken pipe: nowhere left to write these.
+                pass
+            if stopping:
+                return
+            if self._dropped:
+                dropped, self._dropped = self._dropped, 0
+                logger.warning(MSG_LOG_RECORDS_DROPPED, dropped)
+
+
+class LogFilter:
+    """
+    Keeps the fraction ``sample_rates[level]`` of the records of each level
+    (all records of levels not listed) and at most ``rate_limit`` records
+    per call site every ``window_seconds``. The first record a limited call
+    site writes in its next window carries the number suppressed in
+    ``extra["suppressed"]``.
+    """
+
+    def __init__(self, sample_rates: dict[str, float], rate_limit: int, window_seconds: float):
+        self.sample_rates = sample_rates
+        self.rate_limit = rate_limit
+        self.window_seconds = window_seconds
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, record) -> bool:
+        sample_rate = self.sample_rates.get(record["level"].name)
+        if sample_rate is not None and random.random() >= sample_rate:
+            return False
+        if self.rate_limit <= 0:
+            return True
+
+        call_site = (record["name"], record["line"])
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(call_site)
+            if window is None or now - window[0] >= self.window_seconds:
+                # [window start, records written, records suppressed]
+                self._windows[call_site] = [now, 1, 0]
+                suppressed = window[2] if window else 0
+            elif window[1] < self.rate_limit:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record["extra"]["suppressed"] = suppressed
+        return True
+
+
+def parse_sample_rates(value: str) -> dict[str, float]:
+    """``'DEBUG=0.01,INFO=0.1'`` -> ``{"DEBUG": 0.01, "INFO": 0.1}``."""
+    sample_rates = {}
+    for item in filter(None, value.split(",")):
+        level, _, rate = item.partition("=")
+        sample_rates[level.strip().upper()] = float(rate)
+    return sample_rates
+
+
+def format_text(record) -> str:
+    suffix = " <dim>({extra[suppressed]} similar records suppressed)</dim>" if "suppressed" in record["extra"] else ""
+    return TEXT_FORMAT + suffix + "\n{exception}"
+
+
+def format_json(record) -> str:
+    """One JSON object per record, with the logging call's keyword arguments as fields."""
+    fields = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+        **record["extra"],
+    }
+    if record["exception"] is not None:
+        fields["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    record["extra"]["serialized"] = orjson.dumps(fields, default=str).decode()
+    return "{extra[serialized]}\n"
+
+
+def configure_logger() -> None:
+    sink = sys.stdout
+    if settings.LOG_BACKGROUND_WRITER:
+        sink = BackgroundWriter(sys.stdout, settings.LOG_QUEUE_SIZE)
+    logger.remove()
+    logger.add(
+        sink,
+        level=settings.LOG_LEVEL,
+        format=format_json if settings.LOG_FORMAT == "json" else format_text,
+        filter=LogFilter(
+            parse_sample_rates(settings.LOG_SAMPLING),
+            settings.LOG_RATE_LIMIT,
+            settings.LOG_RATE_LIMIT_WINDOW_SECONDS,
+        ),
+    )
+
+
+configure_logger()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
+import socket
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -55,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'realmate_challenge_app.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'realmate_challenge.urls'
@@ -89,9 +91,47 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
         'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        # Connections are checked before being handed out (pooled or persistent)
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Postgres connections of each process: 'pool' keeps a psycopg connection
+# pool sized for the process role, 'persistent' reuses one connection per
+# thread for DATABASE_CONN_MAX_AGE_SECONDS, 'none' opens one per request/task
+DATABASE_CONNECTIONS = os.getenv('DATABASE_CONNECTIONS', 'pool')
+DATABASE_CONN_MAX_AGE_SECONDS = int(os.getenv('DATABASE_CONN_MAX_AGE_SECONDS', '60'))
+# 'web' for gunicorn/uvicorn, 'worker' for Celery and the timer runner. Each
+# process has its own pool, so Postgres sees up to max size x processes
+DATABASE_POOL_ROLE = os.getenv('DATABASE_POOL_ROLE', 'web')
+DATABASE_POOL_SIZES = {
+    'web': (
+        int(os.getenv('DATABASE_POOL_WEB_MIN_SIZE', '2')),
+        int(os.getenv('DATABASE_POOL_WEB_MAX_SIZE', '8')),
+    ),
+    'worker': (
+        int(os.getenv('DATABASE_POOL_WORKER_MIN_SIZE', '1')),
+        int(os.getenv('DATABASE_POOL_WORKER_MAX_SIZE', '2')),
+    ),
+}
+# Longest wait for a pooled connection before the request or task fails
+DATABASE_POOL_TIMEOUT_SECONDS = float(os.getenv('DATABASE_POOL_TIMEOUT_SECONDS', '5'))
+# How often each process logs its pool statistics (0 disables them)
+DATABASE_POOL_STATS_INTERVAL_SECONDS = int(os.getenv('DATABASE_POOL_STATS_INTERVAL_SECONDS', '60'))
+
+if DATABASE_CONNECTIONS == 'pool':
+    pool_min_size, pool_max_size = DATABASE_POOL_SIZES[DATABASE_POOL_ROLE]
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': pool_min_size,
+            'max_size': pool_max_size,
+            'timeout': DATABASE_POOL_TIMEOUT_SECONDS,
+            'name': DATABASE_POOL_ROLE,
+        },
+    }
+elif DATABASE_CONNECTIONS == 'persistent':
+    DATABASES['default']['CONN_MAX_AGE'] = DATABASE_CONN_MAX_AGE_SECONDS
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -139,7 +179,110 @@ CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {}
+
+# Redis used by the app itself (idempotency index, buffers, caches)
+REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/2')
+
+# Views routed to /webhook/ and /conversations/<id>/: 'sync' for the WSGI
+# application, 'async' for the ASGI one (uvicorn), which uses the async views
+API_VIEWS = os.getenv('API_VIEWS', 'sync')
+
+# Webhook configs
+WEBHOOK_BATCH_MAX_EVENTS = int(os.getenv('WEBHOOK_BATCH_MAX_EVENTS', '1000'))
+WEBHOOK_IDEMPOTENCY_LRU_SIZE = int(os.getenv('WEBHOOK_IDEMPOTENCY_LRU_SIZE', '10000'))
+WEBHOOK_IDEMPOTENCY_TTL_SECONDS = int(os.getenv('WEBHOOK_IDEMPOTENCY_TTL_SECONDS', '86400'))
+# 'msgspec' decodes and validates JSON events with compiled schemas and only
+# runs the DRF serializers for events that fail; 'drf' always runs them
+WEBHOOK_VALIDATION_BACKEND = os.getenv('WEBHOOK_VALIDATION_BACKEND', 'msgspec')
+
+# Messages that arrive before their conversation: 'redis' keeps them in a
+# TTL buffer, 'database' stores orphan rows removed by a periodic sweeper
+PENDING_MESSAGES_BACKEND = os.getenv('PENDING_MESSAGES_BACKEND', 'redis')
+PENDING_MESSAGES_TTL_SECONDS = 6
+ORPHAN_SWEEP_BATCH_SIZE = int(os.getenv('ORPHAN_SWEEP_BATCH_SIZE', '1000'))
+# Safety net for orphan rows whose expiry timer was lost; the Redis buffer
+# expires its keys on its own
+if PENDING_MESSAGES_BACKEND == 'database':
+    CELERY_BEAT_SCHEDULE['sweep-expired-orphan-messages'] = {
+        'task': 'realmate_challenge_app.tasks.sweep_expired_orphan_messages',
+        'schedule': 1.0,
+    }
 
+# Number of shard tasks process_inbound_messages fans out to (1 runs inline)
+INBOUND_PROCESSING_SHARDS = int(os.getenv('INBOUND_PROCESSING_SHARDS', '1'))
+
+# GET /conversations/<id>/ message pages (keyset pagination over timestamp, id)
+CONVERSATION_MESSAGES_DEFAULT_LIMIT = int(os.getenv('CONVERSATION_MESSAGES_DEFAULT_LIMIT', '100'))
+CONVERSATION_MESSAGES_MAX_LIMIT = int(os.getenv('CONVERSATION_MESSAGES_MAX_LIMIT', '1000'))
+
+# Messages kept in each conversation snapshot transcript; conversations up
+# to this size are rendered from their snapshot row alone
+CONVERSATION_SNAPSHOT_TRANSCRIPT_SIZE = int(os.getenv('CONVERSATION_SNAPSHOT_TRANSCRIPT_SIZE', '100'))
+
+# Rows fetched per server-side cursor round trip by the NDJSON conversation export
+CONVERSATION_EXPORT_CHUNK_SIZE = int(os.getenv('CONVERSATION_EXPORT_CHUNK_SIZE', '2000'))
+
+# Rendered conversation detail cache (Redis with an in-process LRU in front)
+CONVERSATION_CACHE_LRU_SIZE = int(os.getenv('CONVERSATION_CACHE_LRU_SIZE', '1000'))
+CONVERSATION_CACHE_TTL_SECONDS = int(os.getenv('CONVERSATION_CACHE_TTL_SECONDS', '60'))
+CONVERSATION_CACHE_VERSION_TTL_SECONDS = int(os.getenv('CONVERSATION_CACHE_VERSION_TTL_SECONDS', '604800'))
+CLOSED_CONVERSATION_MAX_AGE_SECONDS = 31536000
+
+# ?since= delta sync: longest ?wait= long-poll and how often it looks for changes
+CONVERSATION_LONG_POLL_MAX_SECONDS = int(os.getenv('CONVERSATION_LONG_POLL_MAX_SECONDS', '30'))
+CONVERSATION_LONG_POLL_INTERVAL_MS = int(os.getenv('CONVERSATION_LONG_POLL_INTERVAL_MS', '250'))
+
+# /conversations/<id>/events/ Server-Sent Events streams
+CONVERSATION_EVENTS_KEEPALIVE_SECONDS = int(os.getenv('CONVERSATION_EVENTS_KEEPALIVE_SECONDS', '15'))
+CONVERSATION_EVENTS_RETRY_MS = int(os.getenv('CONVERSATION_EVENTS_RETRY_MS', '3000'))
+
+# Redis timers fired by `manage.py run_timers`: a conversation is flushed
+# INBOUND_FLUSH_DELAY_MS after its last message, orphans expire after the TTL
+INBOUND_FLUSH_DELAY_MS = int(os.getenv('INBOUND_FLUSH_DELAY_MS', '5000'))
+TIMERS_LEASE_MS = int(os.getenv('TIMERS_LEASE_MS', '30000'))
+TIMERS_POLL_INTERVAL_MS = int(os.getenv('TIMERS_POLL_INTERVAL_MS', '100'))
+TIMERS_CLAIM_BATCH_SIZE = int(os.getenv('TIMERS_CLAIM_BATCH_SIZE', '100'))
+
+# Containers sharing a metrics volume reuse pids, so each one writes its
+# metrics under METRICS_MULTIPROC_ROOT/<hostname> and /metrics adds up every
+# directory there. prometheus_client reads PROMETHEUS_MULTIPROC_DIR when it's
+# first imported, which the app only does after loading these settings
+METRICS_MULTIPROC_ROOT = os.getenv('METRICS_MULTIPROC_ROOT', '')
+if METRICS_MULTIPROC_ROOT:
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = os.path.join(METRICS_MULTIPROC_ROOT, socket.gethostname())
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+# On-demand cProfile runs of the views in PROFILING_VIEWS: a fraction of their
+# requests plus those with PROFILING_TOKEN in an X-Profile header. With both
+# unset the profiling middleware isn't loaded at all
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+PROFILING_VIEWS = os.getenv(
+    'PROFILING_VIEWS', 'WebhookView,ConversationDetailView,AsyncWebhookView,AsyncConversationDetailView'
+).split(',')
+# Where the .prof files and their JSON summaries go; empty only logs summaries
+PROFILING_OUTPUT_DIR = os.getenv('PROFILING_OUTPUT_DIR', '')
+
+# Live burst detection: 'redis' shares the open bursts between processes,
+# 'memory' keeps them in the current process only
+SESSION_WINDOW_BACKEND = os.getenv('SESSION_WINDOW_BACKEND', 'redis')
+SESSION_WINDOW_GAP_MS = 5000
+SESSION_WINDOW_IDLE_TTL_SECONDS = int(os.getenv('SESSION_WINDOW_IDLE_TTL_SECONDS', '86400'))
+
+# Application logs (realmate_challenge.logger): 'text' colourised lines or
+# 'json' objects, one per line, on stdout
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
+# Records are written by a background thread so requests never wait on
+# stdout; past LOG_QUEUE_SIZE waiting records new ones are dropped and counted
+LOG_BACKGROUND_WRITER = os.getenv('LOG_BACKGROUND_WRITER', 'True') == 'True'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Fraction of the records kept per level, e.g. 'DEBUG=0.01,INFO=0.1'
+LOG_SAMPLING = os.getenv('LOG_SAMPLING', '')
+# Records written per call site every LOG_RATE_LIMIT_WINDOW_SECONDS (0 disables it)
+LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', '0'))
+LOG_RATE_LIMIT_WINDOW_SECONDS = int(os.getenv('LOG_RATE_LIMIT_WINDOW_SECONDS', '60'))
 
 # Disable django loggin
 LOGGING = {
@@ -14,13 +14,32 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 
-from realmate_challenge_app.views import WebhookView, ConversationDetailView
+from realmate_challenge_app.views import (
+    AsyncConversationDetailView,
+    AsyncWebhookView,
+    WebhookView,
+    WebhookBatchView,
+    ConversationDetailView,
+    ConversationExportView,
+    ConversationEventsView,
+    MetricsView,
+)
+
+if settings.API_VIEWS == 'async':
+    webhook_view, conversation_detail_view = AsyncWebhookView, AsyncConversationDetailView
+else:
+    webhook_view, conversation_detail_view = WebhookView, ConversationDetailView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('webhook/', WebhookView.as_view(), name='webhook'),
-    path('conversations/<uuid:id>/', ConversationDetailView.as_view(), name='conversations'),
+    path('webhook/', webhook_view.as_view(), name='webhook'),
+    path('webhook/batch/', WebhookBatchView.as_view(), name='webhook-batch'),
+    path('conversations/export/', ConversationExportView.as_view(), name='conversation-export'),
+    path('conversations/<uuid:id>/', conversation_detail_view.as_view(), name='conversations'),
+    path('conversations/<uuid:id>/events/', ConversationEventsView.as_view(), name='conversation-events'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
@@ -6,4 +6,13 @@ class RealmateChallengeAppConfig(AppConfig):
     name = 'realmate_challenge_app'
 
     def ready(self):
-        import realmate_challenge_app.signals
+        from celery.signals import task_postrun, task_prerun
+        from django.core.signals import request_finished
+
+        from .db_pool import report_pool_stats
+        from .metrics import task_finished, task_started
+
+        request_finished.connect(report_pool_stats, dispatch_uid="report_pool_stats")
+        task_postrun.connect(report_pool_stats, dispatch_uid="report_pool_stats")
+        task_prerun.connect(task_started, dispatch_uid="task_started")
+        task_postrun.connect(task_finished, dispatch_uid="task_finished")
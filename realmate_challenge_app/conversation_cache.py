@@ -0,0 +1,101 @@
+import hashlib
+import uuid
+
+import redis
+from django.conf import settings
+
+from realmate_challenge.logger import logger
+from .lru import LocalLRU
+from .redis_client import get_redis_client
+
+CONVERSATION_VERSION_KEY = "conversation:{}:version"
+CONVERSATION_DETAIL_KEY = "conversation:{}:detail:{}:{}"
+MSG_CONVERSATION_CACHE_UNAVAILABLE = "Conversation cache unavailable. Error: {}"
+
+
+class ConversationDetailCache:
+    """
+    Rendered GET /conversations/<id>/ bodies keyed by conversation version
+    and request URL. Writers replace the version token with invalidate(), so
+    stale entries are simply never looked up again. A bounded in-process LRU
+    sits in front of Redis. Entries marked immutable live as long as the
+    version token itself, the others for ``ttl_seconds``.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, version_ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.version_ttl_seconds = version_ttl_seconds
+        self._local = LocalLRU(max_entries)
+
+    @staticmethod
+    def request_key(url: str) -> str:
+        return hashlib.sha1(url.encode()).hexdigest()
+
+    @staticmethod
+    def etag(version: str, request_key: str) -> str:
+        return f'"{version}-{request_key[:12]}"'
+
+    def get_version(self, conversation_id, create: bool = True) -> str | None:
+        """
+        The conversation's current version token, or None when Redis is
+        unavailable. A missing token is created unless ``create`` is False,
+        which callers not yet sure the conversation exists pass so lookups of
+        unknown ids leave no keys behind.
+        """
+        key = CONVERSATION_VERSION_KEY.format(conversation_id)
+        try:
+            client = get_redis_client()
+            version = client.get(key)
+            if version is None and create:
+                client.set(key, uuid.uuid4().hex, nx=True, ex=self.version_ttl_seconds)
+                version = client.get(key)
+        except redis.RedisError as exc:
+            logger.warning(MSG_CONVERSATION_CACHE_UNAVAILABLE, exc)
+            return None
+        return version.decode() if version is not None else None
+
+    def get(self, conversation_id, version: str, request_key: str) -> tuple[bytes, bool] | None:
+        key = CONVERSATION_DETAIL_KEY.format(conversation_id, version, request_key)
+        cached = self._local.get(key)
+        if cached is not None:
+            return cached
+        try:
+            value = get_redis_client().get(key)
+        except redis.RedisError as exc:
+            logger.warning(MSG_CONVERSATION_CACHE_UNAVAILABLE, exc)
+            return None
+        if value is None:
+            return None
+        cached = value[1:], value[:1] == b"1"
+        self._local.set(key, cached)
+        return cached
+
+    def set(self, conversation_id, version: str, request_key: str, body: bytes, immutable: bool) -> None:
+        key = CONVERSATION_DETAIL_KEY.format(conversation_id, version, request_key)
+        self._local.set(key, (body, immutable))
+        try:
+            get_redis_client().set(
+                key, (b"1" if immutable else b"0") + body, ex=self.version_ttl_seconds if immutable else self.ttl_seconds
+            )
+        except redis.RedisError as exc:
+            logger.warning(MSG_CONVERSATION_CACHE_UNAVAILABLE, exc)
+
+    def invalidate(self, conversation_ids) -> None:
+        if not conversation_ids:
+            return
+        try:
+            pipeline = get_redis_client().pipeline(transaction=False)
+            for conversation_id in conversation_ids:
+                pipeline.set(
+                    CONVERSATION_VERSION_KEY.format(conversation_id), uuid.uuid4().hex, ex=self.version_ttl_seconds
+                )
+            pipeline.execute()
+        except redis.RedisError as exc:
+            logger.warning(MSG_CONVERSATION_CACHE_UNAVAILABLE, exc)
+
+
+conversation_cache = ConversationDetailCache(
+    max_entries=settings.CONVERSATION_CACHE_LRU_SIZE,
+    ttl_seconds=settings.CONVERSATION_CACHE_TTL_SECONDS,
+    version_ttl_seconds=settings.CONVERSATION_CACHE_VERSION_TTL_SECONDS,
+)
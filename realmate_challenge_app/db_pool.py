@@ -0,0 +1,75 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from realmate_challenge.logger import logger
+
+MSG_DATABASE_POOL_STATS = "Database pool {} ({}): {}"
+
+
+def get_pool_stats(alias: str = DEFAULT_DB_ALIAS, reset: bool = False) -> dict | None:
+    """
+    Statistics of this process' connection pool for ``alias``, or None when
+    the alias isn't pooled or the process hasn't opened its pool yet.
+    ``size``, ``in_use`` and ``waiting`` are point-in-time values; the other
+    counters add up since the pool was opened or since the last call with
+    ``reset``.
+    """
+    pool = connections[alias].pool
+    if pool is None or pool.closed:
+        return None
+
+    stats = pool.pop_stats() if reset else pool.get_stats()
+    return {
+        "min_size": stats["pool_min"],
+        "max_size": stats["pool_max"],
+        "size": stats["pool_size"],
+        "in_use": stats["pool_size"] - stats["pool_available"],
+        "waiting": stats["requests_waiting"],
+        "requests": stats.get("requests_num", 0),
+        "requests_queued": stats.get("requests_queued", 0),
+        "wait_ms": stats.get("requests_wait_ms", 0),
+        "request_errors": stats.get("requests_errors", 0),
+        "connections_opened": stats.get("connections_num", 0),
+        "connections_lost": stats.get("connections_lost", 0),
+        "returns_bad": stats.get("returns_bad", 0),
+    }
+
+
+class PoolStatsReporter:
+    """
+    Logs this process' pool statistics at most every ``interval_seconds``,
+    resetting the counters so each line covers the connections handed out
+    since the previous one. It runs at the end of requests and Celery tasks
+    instead of on a thread of its own, so idle processes stay quiet.
+    """
+
+    def __init__(self, interval_seconds: int, alias: str = DEFAULT_DB_ALIAS):
+        self.interval_seconds = interval_seconds
+        self.alias = alias
+        self._next_report_at = time.monotonic() + interval_seconds
+        self._lock = threading.Lock()
+
+    def maybe_report(self) -> None:
+        if self.interval_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_report_at:
+                return
+            self._next_report_at = now + self.interval_seconds
+
+        stats = get_pool_stats(self.alias, reset=True)
+        if stats is not None:
+            summary = " ".join(f"{name}={value}" for name, value in stats.items())
+            logger.info(MSG_DATABASE_POOL_STATS, self.alias, settings.DATABASE_POOL_ROLE, summary)
+
+
+pool_stats_reporter = PoolStatsReporter(settings.DATABASE_POOL_STATS_INTERVAL_SECONDS)
+
+
+def report_pool_stats(**kwargs) -> None:
+    """Receiver of ``request_finished`` and Celery's ``task_postrun``."""
+    pool_stats_reporter.maybe_report()
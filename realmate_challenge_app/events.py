@@ -0,0 +1,33 @@
+import redis
+import redis.asyncio
+from django.conf import settings
+
+from realmate_challenge.logger import logger
+from .conversation_cache import conversation_cache
+from .redis_client import get_redis_client
+
+CONVERSATION_EVENTS_CHANNEL = "conversation:{}:events"
+MSG_CONVERSATION_EVENTS_UNAVAILABLE = "Conversation events not published. Error: {}"
+
+
+def notify_conversations_changed(conversation_ids) -> None:
+    """
+    Called after messages are added to or the status of the conversations
+    changes: drops their cached details and wakes up their event streams.
+    The published payload is only a wake-up, streams read the changes
+    themselves so a missed notification can't lose a message.
+    """
+    if not conversation_ids:
+        return
+    conversation_cache.invalidate(conversation_ids)
+    try:
+        pipeline = get_redis_client().pipeline(transaction=False)
+        for conversation_id in conversation_ids:
+            pipeline.publish(CONVERSATION_EVENTS_CHANNEL.format(conversation_id), "changed")
+        pipeline.execute()
+    except redis.RedisError as exc:
+        logger.warning(MSG_CONVERSATION_EVENTS_UNAVAILABLE, exc)
+
+
+def get_async_redis_client() -> redis.asyncio.Redis:
+    return redis.asyncio.Redis.from_url(settings.REDIS_URL)
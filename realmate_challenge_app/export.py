@@ -0,0 +1,70 @@
+from typing import Iterator
+
+from .models import Conversation, Message
+from .serializers.fast import render_json
+
+EXPORT_BUFFER_BYTES = 64 * 1024
+
+
+def export_conversations(
+    chunk_size: int,
+    status: str | None = None,
+    created_after=None,
+    created_before=None,
+) -> Iterator[bytes]:
+    """
+    NDJSON export of the conversations matching the filters, one line per
+    conversation with all of its messages in ``(timestamp, id)`` order and
+    timestamps in UTC. Conversations and messages are read through two
+    server-side cursors sorted by conversation id and merged as they stream,
+    so memory stays bounded by ``chunk_size`` rows and EXPORT_BUFFER_BYTES
+    no matter how many conversations or messages are exported.
+    """
+    conversations = Conversation.objects.all()
+    messages = Message.objects.filter(conversation_id__isnull=False)
+    if status is not None:
+        # Not applied to messages: status may change between the two cursors.
+        conversations = conversations.filter(status=status)
+    if created_after is not None:
+        conversations = conversations.filter(created_at__gte=created_after)
+        messages = messages.filter(conversation_id__created_at__gte=created_after)
+    if created_before is not None:
+        conversations = conversations.filter(created_at__lt=created_before)
+        messages = messages.filter(conversation_id__created_at__lt=created_before)
+
+    conversation_rows = (
+        conversations.order_by("id").values_list("id", "status", "created_at", named=True).iterator(chunk_size)
+    )
+    message_rows = (
+        messages.order_by("conversation_id", "timestamp", "id")
+        .values_list("conversation_id", "id", "type", "content", "timestamp", named=True)
+        .iterator(chunk_size)
+    )
+
+    buffer = bytearray()
+    message = next(message_rows, None)
+    for conversation in conversation_rows:
+        # Messages of conversations filtered out or created between the cursors.
+        while message is not None and message.conversation_id < conversation.id:
+            message = next(message_rows, None)
+
+        # The line is written in pieces so a long conversation isn't held whole.
+        header = render_json({"id": conversation.id, "status": conversation.status, "created_at": conversation.created_at})
+        buffer += header[:-1] + b',"messages":['
+        separator = b""
+        while message is not None and message.conversation_id == conversation.id:
+            buffer += separator + render_json(
+                {"id": message.id, "type": message.type, "content": message.content, "timestamp": message.timestamp}
+            )
+            separator = b","
+            message = next(message_rows, None)
+            if len(buffer) >= EXPORT_BUFFER_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += b"]}\n"
+        if len(buffer) >= EXPORT_BUFFER_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+
+    if buffer:
+        yield bytes(buffer)
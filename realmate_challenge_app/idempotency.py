@@ -0,0 +1,74 @@
+import json
+
+import redis
+from django.conf import settings
+
+from realmate_challenge.logger import logger
+from .lru import LocalLRU
+from .redis_client import get_redis_client
+
+SEEN_EVENT_KEY = "webhook:seen:{}"
+MSG_SEEN_EVENT_INDEX_UNAVAILABLE = "Seen event index unavailable, falling back to the database. Error: {}"
+
+
+class SeenEventIndex:
+    """
+    Remembers the outcome of already applied webhook events so retried
+    deliveries are answered without touching Postgres. A bounded in-process
+    LRU sits in front of Redis keys that expire after ``ttl_seconds``.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._local = LocalLRU(max_entries, ttl_seconds)
+
+    def get(self, event_id) -> tuple[dict, int] | None:
+        return self.get_many([event_id]).get(str(event_id))
+
+    def get_many(self, event_ids) -> dict[str, tuple[dict, int]]:
+        found = {}
+        missing = []
+        for event_id in map(str, event_ids):
+            outcome = self._local.get(event_id)
+            if outcome is None:
+                missing.append(event_id)
+            else:
+                found[event_id] = outcome
+
+        if missing:
+            try:
+                values = get_redis_client().mget([SEEN_EVENT_KEY.format(event_id) for event_id in missing])
+            except redis.RedisError as exc:
+                logger.warning(MSG_SEEN_EVENT_INDEX_UNAVAILABLE, exc)
+                values = []
+            for event_id, value in zip(missing, values):
+                if value is not None:
+                    output, http_status = json.loads(value)
+                    found[event_id] = (output, http_status)
+                    self._local.set(event_id, (output, http_status))
+        return found
+
+    def remember(self, event_id, output: dict, http_status: int) -> None:
+        self.remember_many({event_id: (output, http_status)})
+
+    def remember_many(self, outcomes: dict) -> None:
+        if not outcomes:
+            return
+        try:
+            pipeline = get_redis_client().pipeline(transaction=False)
+            for event_id, outcome in outcomes.items():
+                pipeline.set(SEEN_EVENT_KEY.format(event_id), json.dumps(outcome), ex=self.ttl_seconds)
+            pipeline.execute()
+        except redis.RedisError as exc:
+            logger.warning(MSG_SEEN_EVENT_INDEX_UNAVAILABLE, exc)
+        for event_id, outcome in outcomes.items():
+            self._local.set(str(event_id), outcome)
+
+    def clear(self) -> None:
+        self._local.clear()
+
+
+seen_events = SeenEventIndex(
+    max_entries=settings.WEBHOOK_IDEMPOTENCY_LRU_SIZE,
+    ttl_seconds=settings.WEBHOOK_IDEMPOTENCY_TTL_SECONDS,
+)
@@ -0,0 +1,49 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from realmate_challenge.logger import logger
+from realmate_challenge_app.export import export_conversations
+from realmate_challenge_app.serializers.payloads import ConversationExportFiltersSerializer
+
+MSG_CONVERSATIONS_EXPORTED = "{count} conversations exported to {output}."
+
+
+class Command(BaseCommand):
+    help = "Streams conversations with their messages as NDJSON, one conversation per line."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--status", help="Only conversations with this status.")
+        parser.add_argument("--created-after", help="Only conversations created at or after this ISO 8601 datetime.")
+        parser.add_argument("--created-before", help="Only conversations created before this ISO 8601 datetime.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.CONVERSATION_EXPORT_CHUNK_SIZE,
+            help="Rows fetched per server-side cursor round trip.",
+        )
+        parser.add_argument("--output", default="-", help="File to write to, '-' for stdout.")
+
+    def handle(self, *args, **options):
+        filter_names = ("status", "created_after", "created_before")
+        filters = ConversationExportFiltersSerializer(
+            data={name: options[name] for name in filter_names if options[name] is not None}
+        )
+        if not filters.is_valid():
+            raise CommandError(filters.errors)
+
+        chunks = export_conversations(options["chunk_size"], **filters.validated_data)
+        if options["output"] == "-":
+            # Nothing is logged: the log sink is stdout too.
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        count = 0
+        with open(options["output"], "wb") as output:
+            for chunk in chunks:
+                output.write(chunk)
+                count += chunk.count(b"\n")
+        logger.info(MSG_CONVERSATIONS_EXPORTED, count=count, output=options["output"])
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from realmate_challenge.logger import logger
+from realmate_challenge_app import queries
+from realmate_challenge_app.models import Conversation
+
+MSG_SNAPSHOTS_REBUILT = "{count} conversation snapshots rebuilt."
+
+
+class Command(BaseCommand):
+    help = "Regenerates every conversation snapshot from the Message table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Conversations rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        conversations = Conversation.objects.order_by("id").values_list("id", flat=True)
+        rebuilt = 0
+        last_id = None
+        while True:
+            batch = conversations if last_id is None else conversations.filter(id__gt=last_id)
+            conversation_ids = list(batch[:batch_size])
+            if not conversation_ids:
+                break
+            with transaction.atomic():
+                queries.rebuild_conversation_snapshots(conversation_ids)
+            rebuilt += len(conversation_ids)
+            last_id = conversation_ids[-1]
+        logger.info(MSG_SNAPSHOTS_REBUILT, count=rebuilt)
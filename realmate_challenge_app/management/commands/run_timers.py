@@ -0,0 +1,49 @@
+import time
+
+import redis
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from realmate_challenge.logger import logger
+from realmate_challenge_app.db_pool import pool_stats_reporter
+from realmate_challenge_app.tasks import fire_due_timers
+from realmate_challenge_app.timers import timer_service
+
+MSG_TIMER_RUNNER_STARTED = "Timer runner started, polling every {} ms at most."
+MSG_TIMER_RUNNER_REDIS_ERROR = "Timer runner could not reach Redis. Error: {}"
+MSG_TIMER_RUNNER_DATABASE_ERROR = "Timer runner could not reach the database. Error: {}"
+
+
+class Command(BaseCommand):
+    help = "Fires the due burst flush and orphan expiry timers kept in Redis."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Fire the currently due timers and exit.")
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            fire_due_timers()
+            return
+
+        poll_interval_ms = settings.TIMERS_POLL_INTERVAL_MS
+        logger.info(MSG_TIMER_RUNNER_STARTED, poll_interval_ms)
+        while True:
+            try:
+                # Like Celery before each task: drop connections that broke or
+                # aged out, so a database restart doesn't fail every timer.
+                close_old_connections()
+                if fire_due_timers():
+                    continue
+                next_due_in_ms = timer_service.next_due_in_ms()
+            except redis.RedisError as exc:
+                logger.warning(MSG_TIMER_RUNNER_REDIS_ERROR, exc)
+                next_due_in_ms = None
+            except DatabaseError as exc:
+                logger.warning(MSG_TIMER_RUNNER_DATABASE_ERROR, exc)
+                next_due_in_ms = None
+
+            pool_stats_reporter.maybe_report()
+            if next_due_in_ms is None:
+                next_due_in_ms = poll_interval_ms
+            time.sleep(min(next_due_in_ms, poll_interval_ms) / 1000)
@@ -0,0 +1,141 @@
+import glob
+import os
+import time
+
+import redis
+from django.conf import settings
+from django.db.models import Count, Min
+from django.utils import timezone
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+from realmate_challenge.logger import logger
+from .models import Message
+from .pending import get_pending_buffer
+
+WEBHOOK_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+TASK_DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Finer around the 5 s burst gap and the 6 s reply SLA.
+REPLY_LAG_BUCKETS = (0.5, 1, 2, 3, 4, 5, 5.5, 6, 7, 8, 10, 15, 30, 60, 120)
+BATCH_EVENT_TYPE = "BATCH"
+INVALID_EVENT_TYPE = "INVALID"
+MSG_ORPHAN_COUNT_UNAVAILABLE = "Orphan message count unavailable, gauge left out of the scrape. Error: {}"
+
+# In-process metrics. Under gunicorn or Celery's prefork pool each process
+# writes them to PROMETHEUS_MULTIPROC_DIR instead and the scrape adds them up.
+registry = CollectorRegistry()
+
+webhook_duration = Histogram(
+    "realmate_webhook_request_duration_seconds",
+    "Time to validate and apply a webhook request, by event type (BATCH for /webhook/batch/).",
+    ["event_type"],
+    buckets=WEBHOOK_LATENCY_BUCKETS,
+    registry=registry,
+)
+webhook_events = Counter(
+    "realmate_webhook_events",
+    "Webhook events handled, by event type and HTTP status of their outcome.",
+    ["event_type", "status"],
+    registry=registry,
+)
+task_duration = Histogram(
+    "realmate_task_duration_seconds",
+    "Celery task run time, by task and final state.",
+    ["task", "state"],
+    buckets=TASK_DURATION_BUCKETS,
+    registry=registry,
+)
+reply_lag = Histogram(
+    "realmate_inbound_reply_lag_seconds",
+    "Time from the last INBOUND message of a group reaching its conversation to the OUTBOUND reply.",
+    buckets=REPLY_LAG_BUCKETS,
+    registry=registry,
+)
+
+_task_started_at = {}
+
+
+class ContainersMultiProcessCollector:
+    """MultiProcessCollector over the directory of every container under ``root``."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def collect(self):
+        files = glob.glob(os.path.join(self.root, "*", "*.db"))
+        return multiprocess.MultiProcessCollector.merge(files, accumulate=True)
+
+
+class BacklogCollector:
+    """Backlog gauges, read from Postgres and the pending buffer at scrape time."""
+
+    def collect(self):
+        backlog = Message.objects.filter(
+            type=Message.MessageType.INBOUND, processed=False, conversation_id__isnull=False
+        ).aggregate(count=Count("id"), oldest=Min("created_at"))
+        oldest_age = (timezone.now() - backlog["oldest"]).total_seconds() if backlog["oldest"] else 0
+
+        try:
+            yield GaugeMetricFamily(
+                "realmate_orphan_messages",
+                "Messages waiting for their conversation to be created.",
+                value=get_pending_buffer().count(),
+            )
+        except redis.RedisError as exc:
+            logger.warning(MSG_ORPHAN_COUNT_UNAVAILABLE, exc)
+        yield GaugeMetricFamily(
+            "realmate_unprocessed_inbound_messages",
+            "INBOUND messages of existing conversations not replied to yet.",
+            value=backlog["count"],
+        )
+        yield GaugeMetricFamily(
+            "realmate_unprocessed_inbound_oldest_age_seconds",
+            "Age of the oldest INBOUND message not replied to yet.",
+            value=max(oldest_age, 0),
+        )
+
+
+def observe_webhook(event_type: str | None, http_status: int, started: float) -> None:
+    event_type = event_type or INVALID_EVENT_TYPE
+    webhook_duration.labels(event_type).observe(time.perf_counter() - started)
+    webhook_events.labels(event_type, http_status).inc()
+
+
+def observe_webhook_batch(event_types: list, http_statuses: list, started: float) -> None:
+    webhook_duration.labels(BATCH_EVENT_TYPE).observe(time.perf_counter() - started)
+    for event_type, http_status in zip(event_types, http_statuses):
+        webhook_events.labels(event_type or INVALID_EVENT_TYPE, http_status).inc()
+
+
+def observe_reply_lag(replied_at, received_at: list) -> None:
+    if received_at:
+        reply_lag.observe(max((replied_at - max(received_at)).total_seconds(), 0))
+
+
+def observe_task(task_name: str, state: str, started: float) -> None:
+    task_duration.labels(task_name.rsplit(".", 1)[-1], state).observe(time.perf_counter() - started)
+
+
+def task_started(task_id=None, **kwargs) -> None:
+    """Receiver of Celery's ``task_prerun``."""
+    _task_started_at[task_id] = time.perf_counter()
+
+
+def task_finished(task_id=None, task=None, state=None, **kwargs) -> None:
+    """Receiver of Celery's ``task_postrun``."""
+    started = _task_started_at.pop(task_id, None)
+    if started is not None:
+        observe_task(task.name, state or "UNKNOWN", started)
+
+
+def render_metrics() -> bytes:
+    """Text exposition of the metrics of every process plus the backlog gauges."""
+    scrape_registry = CollectorRegistry()
+    if settings.METRICS_MULTIPROC_ROOT:
+        scrape_registry.register(ContainersMultiProcessCollector(settings.METRICS_MULTIPROC_ROOT))
+    elif os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.MultiProcessCollector(scrape_registry)
+    else:
+        scrape_registry.register(registry)
+    scrape_registry.register(BacklogCollector())
+    return generate_latest(scrape_registry)
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realmate_challenge_app', '0009_alter_message_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('conversation_id__isnull', True)), fields=['expected_conversation_id'], name='message_orphan_expected_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realmate_challenge_app', '0010_message_orphan_expected_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('conversation_id__isnull', True)), fields=['created_at'], name='message_orphan_created_idx'),
+        ),
+    ]
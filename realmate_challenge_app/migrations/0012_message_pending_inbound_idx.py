@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realmate_challenge_app', '0011_message_orphan_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('processed', False), ('type', 'INBOUND')), fields=['conversation_id', 'timestamp'], name='message_pending_inbound_idx'),
+        ),
+    ]
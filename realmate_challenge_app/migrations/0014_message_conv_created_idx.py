@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realmate_challenge_app', '0013_message_conv_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation_id', 'created_at', 'id'], name='message_conv_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realmate_challenge_app', '0014_message_conv_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationSnapshot',
+            fields=[
+                ('conversation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='realmate_challenge_app.conversation')),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('last_message_at', models.DateTimeField(null=True)),
+                ('last_outbound', models.JSONField(null=True)),
+                ('transcript', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realmate_challenge_app', '0015_conversation_snapshot'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='message',
+            name='message_conv_created_idx',
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='message_sequence',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='sequence',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunSQL(
+            sql=[
+                """
+                UPDATE realmate_challenge_app_message AS message
+                SET sequence = numbered.sequence
+                FROM (
+                    SELECT id, row_number() OVER (PARTITION BY conversation_id_id ORDER BY created_at, id) AS sequence
+                    FROM realmate_challenge_app_message
+                    WHERE conversation_id_id IS NOT NULL
+                ) AS numbered
+                WHERE message.id = numbered.id
+                """,
+                """
+                UPDATE realmate_challenge_app_conversation AS conversation
+                SET message_sequence = last.sequence
+                FROM (
+                    SELECT conversation_id_id, max(sequence) AS sequence
+                    FROM realmate_challenge_app_message
+                    WHERE conversation_id_id IS NOT NULL
+                    GROUP BY conversation_id_id
+                ) AS last
+                WHERE conversation.id = last.conversation_id_id
+                """,
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation_id', 'sequence'], name='message_conv_sequence_idx'),
+        ),
+    ]
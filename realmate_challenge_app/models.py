@@ -1,6 +1,7 @@
 import uuid
 
 from django.db import models
+from django.db.models import Q
 
 
 class Conversation(models.Model):
@@ -17,6 +18,7 @@ class Conversation(models.Model):
     )
     timestamp = models.DateTimeField(null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    message_sequence = models.BigIntegerField(default=0)
 
 
 class Message(models.Model):
@@ -38,4 +40,51 @@ class Message(models.Model):
     expected_conversation_id = models.UUIDField(null=True, blank=True)
     processed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    
\ No newline at end of file
+    sequence = models.BigIntegerField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['expected_conversation_id'],
+                condition=Q(conversation_id__isnull=True),
+                name='message_orphan_expected_idx',
+            ),
+            models.Index(
+                fields=['created_at'],
+                condition=Q(conversation_id__isnull=True),
+                name='message_orphan_created_idx',
+            ),
+            models.Index(
+                fields=['conversation_id', 'timestamp'],
+                condition=Q(processed=False, type='INBOUND'),
+                name='message_pending_inbound_idx',
+            ),
+            models.Index(
+                fields=['conversation_id', 'timestamp', 'id'],
+                name='message_conv_keyset_idx',
+            ),
+            models.Index(
+                fields=['conversation_id', 'sequence'],
+                name='message_conv_sequence_idx',
+            ),
+        ]
+
+
+class ConversationSnapshot(models.Model):
+    """
+    Denormalised read model of a conversation, kept up to date by the writes
+    that add messages to it. ``transcript`` holds the most recent messages
+    already rendered like MessageSerializer, oldest first.
+    """
+
+    conversation = models.OneToOneField(
+        'Conversation',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='snapshot'
+    )
+    message_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True)
+    last_outbound = models.JSONField(null=True)
+    transcript = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,161 @@
+import base64
+import binascii
+import uuid
+
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+ERROR_INVALID_LIMIT = "limit must be an integer between 1 and {}"
+ERROR_INVALID_CURSOR = "Invalid cursor {}"
+ERROR_AFTER_AND_BEFORE = "Use either after or before, not both"
+ERROR_SINCE_WITH_AFTER_OR_BEFORE = "since can't be combined with after or before"
+
+
+def encode_cursor(timestamp, message_id) -> str:
+    raw = f"{timestamp.isoformat()}|{message_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw_timestamp, raw_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        timestamp = parse_datetime(raw_timestamp)
+        message_id = uuid.UUID(raw_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(ERROR_INVALID_CURSOR.format(cursor))
+    if timestamp is None:
+        raise ValueError(ERROR_INVALID_CURSOR.format(cursor))
+    return timestamp, message_id
+
+
+def encode_sequence_cursor(sequence: int) -> str:
+    return base64.urlsafe_b64encode(str(sequence).encode()).decode()
+
+
+def decode_sequence_cursor(cursor: str) -> int:
+    try:
+        sequence = int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(ERROR_INVALID_CURSOR.format(cursor))
+    if sequence < 0:
+        raise ValueError(ERROR_INVALID_CURSOR.format(cursor))
+    return sequence
+
+
+def parse_limit(request: Request, default_limit: int, max_limit: int) -> int:
+    raw_limit = request.query_params.get("limit")
+    if raw_limit is None:
+        return default_limit
+    try:
+        limit = int(raw_limit)
+    except ValueError:
+        raise ValueError(ERROR_INVALID_LIMIT.format(max_limit))
+    if not 1 <= limit <= max_limit:
+        raise ValueError(ERROR_INVALID_LIMIT.format(max_limit))
+    return limit
+
+
+def messages_since(queryset: QuerySet, since: str) -> QuerySet:
+    """
+    Messages of a conversation stored after the ``since`` cursor, in
+    ``sequence`` order. Sequences are handed out under the conversation row
+    lock, so one that is visible never has an invisible predecessor and the
+    cursor can't step over a message committed late.
+    """
+    return queryset.filter(sequence__gt=decode_sequence_cursor(since) if since else 0).order_by("sequence")
+
+
+class MessageKeysetPagination:
+    """
+    Keyset pagination over ``(timestamp, id)``. ``after`` and ``before``
+    take opaque cursors returned in ``next`` and ``previous``, so every page
+    is a bounded index range scan no matter how deep it is. Invalid
+    parameters raise ValueError.
+    """
+
+    def __init__(self, default_limit: int, max_limit: int):
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+
+    def paginate(self, queryset: QuerySet, request: Request) -> tuple[list, str | None, str | None]:
+        limit, after, before = self._parse(request)
+        rows = list(self._rows(queryset, limit, after, before))
+        return self._page(rows, request, limit, after, before)
+
+    async def apaginate(self, queryset: QuerySet, request: Request) -> tuple[list, str | None, str | None]:
+        limit, after, before = self._parse(request)
+        rows = [row async for row in self._rows(queryset, limit, after, before)]
+        return self._page(rows, request, limit, after, before)
+
+    def _parse(self, request: Request) -> tuple[int, str | None, str | None]:
+        limit = parse_limit(request, self.default_limit, self.max_limit)
+        after = request.query_params.get("after")
+        before = request.query_params.get("before")
+        if after and before:
+            raise ValueError(ERROR_AFTER_AND_BEFORE)
+        return limit, after, before
+
+    def _rows(self, queryset: QuerySet, limit: int, after: str | None, before: str | None) -> QuerySet:
+        if before:
+            timestamp, message_id = decode_cursor(before)
+            return queryset.filter(
+                Q(timestamp__lte=timestamp), Q(timestamp__lt=timestamp) | Q(id__lt=message_id)
+            ).order_by("-timestamp", "-id")[:limit + 1]
+        if after:
+            timestamp, message_id = decode_cursor(after)
+            queryset = queryset.filter(
+                Q(timestamp__gte=timestamp), Q(timestamp__gt=timestamp) | Q(id__gt=message_id)
+            )
+        return queryset.order_by("timestamp", "id")[:limit + 1]
+
+    def _page(
+        self, rows: list, request: Request, limit: int, after: str | None, before: str | None
+    ) -> tuple[list, str | None, str | None]:
+        if before:
+            has_previous, has_next = len(rows) > limit, True
+            page = rows[:limit][::-1]
+        else:
+            has_previous, has_next = bool(after), len(rows) > limit
+            page = rows[:limit]
+
+        url = remove_query_param(remove_query_param(request.build_absolute_uri(), "after"), "before")
+        next_url = previous_url = None
+        if page and has_next:
+            next_url = replace_query_param(url, "after", encode_cursor(page[-1].timestamp, page[-1].id))
+        if page and has_previous:
+            previous_url = replace_query_param(url, "before", encode_cursor(page[0].timestamp, page[0].id))
+        return page, next_url, previous_url
+
+
+class MessageDeltaSync:
+    """
+    Messages stored after a ``since`` cursor, in ``sequence`` order.
+    An empty ``since`` starts from the first message. The returned cursor
+    is the one to send on the next call, even when nothing new was found.
+    """
+
+    def __init__(self, default_limit: int, max_limit: int):
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+
+    def fetch(self, queryset: QuerySet, request: Request) -> tuple[list, str, bool]:
+        limit, since = self._parse(request)
+        rows = list(messages_since(queryset, since)[:limit + 1])
+        return self._page(rows, limit, since)
+
+    async def afetch(self, queryset: QuerySet, request: Request) -> tuple[list, str, bool]:
+        limit, since = self._parse(request)
+        rows = [row async for row in messages_since(queryset, since)[:limit + 1]]
+        return self._page(rows, limit, since)
+
+    def _parse(self, request: Request) -> tuple[int, str]:
+        if request.query_params.get("after") or request.query_params.get("before"):
+            raise ValueError(ERROR_SINCE_WITH_AFTER_OR_BEFORE)
+        return parse_limit(request, self.default_limit, self.max_limit), request.query_params.get("since", "")
+
+    def _page(self, rows: list, limit: int, since: str) -> tuple[list, str, bool]:
+        page = rows[:limit]
+        cursor = encode_sequence_cursor(page[-1].sequence) if page else since
+        return page, cursor, len(rows) > limit
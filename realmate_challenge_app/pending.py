@@ -0,0 +1,171 @@
+import json
+import time
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from realmate_challenge.logger import logger
+from . import queries
+from .models import Message
+from .redis_client import get_redis_client
+from .timers import schedule_orphan_expiry
+
+PENDING_MESSAGES_KEY = "webhook:pending:{}"
+MSG_PENDING_MESSAGES_ADOPTED = "{count} buffered messages adopted by conversation {conversation_id}"
+MSG_ORPHAN_MESSAGES_ADOPTED = "{count} orphan messages adopted by conversations {conversation_ids}"
+MSG_PENDING_BUFFER_UNAVAILABLE = "Pending buffer unavailable, {count} early messages stored as orphan rows. Error: {exc}"
+MSG_PENDING_ADOPTION_UNAVAILABLE = (
+    "Pending buffer unavailable, buffered messages of conversations {conversation_ids} not adopted. Error: {exc}"
+)
+
+
+class RedisPendingBuffer:
+    """
+    Holds messages that arrived before their conversation in a Redis sorted
+    set per expected conversation, scored by arrival time. Nothing is written
+    to Postgres until the conversation shows up; messages older than
+    ``ttl_seconds`` are ignored on adoption and the key itself expires.
+    While Redis is unreachable early messages are stored as orphan rows
+    instead, the way DatabasePendingBuffer keeps them, and adopted from there.
+    """
+
+    stores_orphan_rows = False
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.fallback = DatabasePendingBuffer(ttl_seconds)
+
+    def buffer(self, messages: list[Message]) -> None:
+        now_ms = int(time.time() * 1000)
+        ttl_ms = self.ttl_seconds * 1000
+        pipeline = get_redis_client().pipeline(transaction=False)
+        for message in messages:
+            key = PENDING_MESSAGES_KEY.format(message.expected_conversation_id)
+            member = json.dumps({
+                "id": str(message.id),
+                "content": message.content,
+                "timestamp": message.timestamp.isoformat(),
+            })
+            pipeline.zadd(key, {member: now_ms})
+            pipeline.zremrangebyscore(key, "-inf", now_ms - ttl_ms)
+            pipeline.pexpire(key, ttl_ms)
+        try:
+            pipeline.execute()
+        except redis.RedisError as exc:
+            logger.warning(MSG_PENDING_BUFFER_UNAVAILABLE, count=len(messages), exc=exc)
+            queries.insert_messages(messages)
+            self.fallback.buffer(messages)
+
+    def adopt(self, conversation_ids: list) -> int:
+        if not conversation_ids:
+            return 0
+        # Orphan rows left by buffer() while Redis was unreachable.
+        adopted = self.fallback.adopt(conversation_ids)
+        min_score = int(time.time() * 1000) - self.ttl_seconds * 1000
+        pipeline = get_redis_client().pipeline(transaction=False)
+        for conversation_id in conversation_ids:
+            pipeline.zrangebyscore(PENDING_MESSAGES_KEY.format(conversation_id), min_score, "+inf")
+        try:
+            replies = pipeline.execute()
+        except redis.RedisError as exc:
+            logger.warning(MSG_PENDING_ADOPTION_UNAVAILABLE, conversation_ids=conversation_ids, exc=exc)
+            return adopted
+
+        messages = []
+        adopted_members = {}
+        for conversation_id, members in zip(conversation_ids, replies):
+            if members:
+                adopted_members[PENDING_MESSAGES_KEY.format(conversation_id)] = members
+            for member in members:
+                data = json.loads(member)
+                messages.append(Message(
+                    id=data["id"],
+                    conversation_id_id=conversation_id,
+                    type=Message.MessageType.INBOUND,
+                    content=data["content"],
+                    timestamp=parse_datetime(data["timestamp"]),
+                ))
+        if not messages:
+            return adopted
+
+        with transaction.atomic():
+            # Ids already stored, by an earlier or concurrent adoption, are
+            # skipped, so only new rows reach the snapshots.
+            inserted_ids = queries.insert_messages(messages)
+            queries.apply_messages_to_snapshots(sorted(inserted_ids))
+            # The members stay buffered until the rows are committed, so a
+            # rollback of the caller's transaction doesn't lose them.
+            transaction.on_commit(lambda: self._remove(adopted_members), robust=True)
+
+        for conversation_id in conversation_ids:
+            count = sum(
+                1 for message in messages
+                if message.conversation_id_id == conversation_id and str(message.id) in inserted_ids
+            )
+            if count:
+                logger.info(MSG_PENDING_MESSAGES_ADOPTED, count=count, conversation_id=conversation_id)
+        return adopted + len(inserted_ids)
+
+    def _remove(self, members_by_key: dict) -> None:
+        pipeline = get_redis_client().pipeline(transaction=False)
+        for key, members in members_by_key.items():
+            pipeline.zrem(key, *members)
+        pipeline.execute()
+
+    def count(self) -> int:
+        """Buffered messages, expired ones included until their key expires."""
+        client = get_redis_client()
+        keys = list(client.scan_iter(match=PENDING_MESSAGES_KEY.format("*"), count=1000))
+        pipeline = client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.zcard(key)
+        return sum(pipeline.execute()) if keys else 0
+
+
+class DatabasePendingBuffer:
+    """
+    Keeps early messages as Message rows without a conversation. They are
+    adopted in bulk when the conversation is created; the ones that expire
+    first are removed by an expiry timer per expected conversation, with the
+    periodic sweep_expired_orphan_messages task as a safety net.
+    """
+
+    stores_orphan_rows = True
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+
+    def buffer(self, messages: list[Message]) -> None:
+        schedule_orphan_expiry({message.expected_conversation_id for message in messages})
+
+    def adopt(self, conversation_ids: list) -> int:
+        if not conversation_ids:
+            return 0
+        with transaction.atomic(savepoint=False):
+            adopted_ids = list(Message.objects.select_for_update().filter(
+                conversation_id__isnull=True,
+                expected_conversation_id__in=conversation_ids,
+                created_at__gte=timezone.now() - timedelta(seconds=self.ttl_seconds),
+            ).values_list("id", flat=True))
+            if not adopted_ids:
+                return 0
+            Message.objects.filter(id__in=adopted_ids).update(
+                conversation_id=F("expected_conversation_id"), expected_conversation_id=None
+            )
+            queries.apply_messages_to_snapshots(adopted_ids)
+        logger.info(MSG_ORPHAN_MESSAGES_ADOPTED, count=len(adopted_ids), conversation_ids=conversation_ids)
+        return len(adopted_ids)
+
+    def count(self) -> int:
+        return Message.objects.filter(conversation_id__isnull=True).count()
+
+
+def get_pending_buffer() -> RedisPendingBuffer | DatabasePendingBuffer:
+    if settings.PENDING_MESSAGES_BACKEND == "database":
+        return DatabasePendingBuffer(ttl_seconds=settings.PENDING_MESSAGES_TTL_SECONDS)
+    return RedisPendingBuffer(ttl_seconds=settings.PENDING_MESSAGES_TTL_SECONDS)
@@ -0,0 +1,189 @@
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+import orjson
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.urls import Resolver404, resolve
+
+from realmate_challenge.logger import logger
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_FILE_HEADER = "X-Profile-File"
+MSG_REQUEST_PROFILED = (
+    "Profiled {method} {path} ({view}, {status}): handler {handler_ms} ms, "
+    "{queries} queries in {query_ms} ms, serializers {serializer_ms} ms"
+)
+# Rendering and (de)serialisation code: the app's serializers and DRF's.
+SERIALIZER_PATHS = (
+    os.path.join("realmate_challenge_app", "serializers", ""),
+    os.path.join("rest_framework", "serializers.py"),
+    os.path.join("rest_framework", "renderers.py"),
+)
+
+# Only one profiler can be active per interpreter at a time, and it sees
+# every thread, the sync_to_async ones included.
+_profiler_lock = threading.Lock()
+
+
+class QueryTimer:
+    """``connection.execute_wrapper`` counting queries and the time spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class ProfilingMiddleware:
+    """
+    Runs a sampled fraction of the requests to the views in PROFILING_VIEWS,
+    and those whose X-Profile header matches PROFILING_TOKEN, under cProfile.
+    Each profiled request logs its handler time, ORM query count and time,
+    and time in serializers and renderers; the .prof file and a JSON summary
+    go to PROFILING_OUTPUT_DIR when set. Requests authorised by the header
+    get the timings back in Server-Timing. Without a sample rate or token
+    Django drops the middleware from the chain.
+
+    Works under WSGI and ASGI, with sync and async views. Under ASGI the
+    queries are counted on the request's thread-sensitive sync_to_async
+    thread, where the async views and the async ORM run them.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.PROFILING_SAMPLE_RATE <= 0 and not settings.PROFILING_TOKEN:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        view_name, authorised = self._select(request)
+        if view_name is None or not _profiler_lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profiler = cProfile.Profile()
+            query_timer = QueryTimer()
+            started = time.perf_counter()
+            with connection.execute_wrapper(query_timer):
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+            handler_seconds = time.perf_counter() - started
+            return self._report(request, response, view_name, authorised, profiler, query_timer, handler_seconds)
+        finally:
+            _profiler_lock.release()
+
+    async def __acall__(self, request):
+        view_name, authorised = self._select(request)
+        if view_name is None or not _profiler_lock.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            profiler = cProfile.Profile()
+            query_timer = QueryTimer()
+            wrappers = ExitStack()
+            await sync_to_async(lambda: wrappers.enter_context(connection.execute_wrapper(query_timer)))()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.disable()
+                await sync_to_async(wrappers.close)()
+            handler_seconds = time.perf_counter() - started
+            return await sync_to_async(self._report, thread_sensitive=False)(
+                request, response, view_name, authorised, profiler, query_timer, handler_seconds
+            )
+        finally:
+            _profiler_lock.release()
+
+    def _select(self, request) -> tuple[str | None, bool]:
+        """The name of the view to profile the request of, if any, and whether the header authorised it."""
+        authorised = self._is_authorised(request)
+        if not authorised and random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return None, False
+        try:
+            match = resolve(request.path_info, getattr(request, "urlconf", None))
+        except Resolver404:
+            return None, False
+        view_class = getattr(match.func, "view_class", None)
+        if view_class is None or view_class.__name__ not in settings.PROFILING_VIEWS:
+            return None, False
+        return view_class.__name__, authorised
+
+    def _is_authorised(self, request) -> bool:
+        token = request.headers.get(PROFILE_HEADER)
+        return bool(token and settings.PROFILING_TOKEN) and hmac.compare_digest(token, settings.PROFILING_TOKEN)
+
+    def _report(self, request, response, view_name, authorised, profiler, query_timer, handler_seconds):
+        summary = {
+            "method": request.method,
+            "path": request.path,
+            "view": view_name,
+            "status": response.status_code,
+            "handler_ms": round(handler_seconds * 1000, 2),
+            "queries": query_timer.count,
+            "query_ms": round(query_timer.seconds * 1000, 2),
+            "serializer_ms": round(serializer_seconds(pstats.Stats(profiler)) * 1000, 2),
+        }
+        logger.info(MSG_REQUEST_PROFILED, **summary)
+
+        profile_path = self._write_profile(profiler, summary) if settings.PROFILING_OUTPUT_DIR else None
+        if authorised:
+            response["Server-Timing"] = (
+                f"handler;dur={summary['handler_ms']}, "
+                f"db;dur={summary['query_ms']};desc=\"{summary['queries']} queries\", "
+                f"serializer;dur={summary['serializer_ms']}"
+            )
+            if profile_path is not None:
+                response[PROFILE_FILE_HEADER] = profile_path.name
+        return response
+
+    def _write_profile(self, profiler: cProfile.Profile, summary: dict) -> Path:
+        output_dir = Path(settings.PROFILING_OUTPUT_DIR)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{time.strftime('%Y%m%dT%H%M%S')}-{summary['view']}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        profile_path = output_dir / f"{stem}.prof"
+        profiler.dump_stats(profile_path)
+        (output_dir / f"{stem}.json").write_bytes(orjson.dumps(summary))
+        return profile_path
+
+
+def serializer_seconds(stats: pstats.Stats) -> float:
+    """
+    Cumulative time of the outermost serializer and renderer calls of a
+    profile, so nested serializer calls aren't counted twice.
+    """
+    total = 0.0
+    for (filename, _, _), (_, _, _, cumulative, callers) in stats.stats.items():
+        if is_serializer_code(filename) and not any(is_serializer_code(caller[0]) for caller in callers):
+            total += cumulative
+    return total
+
+
+def is_serializer_code(filename: str) -> bool:
+    return any(path in filename for path in SERIALIZER_PATHS)
@@ -0,0 +1,605 @@
+from django.conf import settings
+from django.db import connection
+
+from .models import Conversation, ConversationSnapshot, Message
+
+CONVERSATION_TABLE = Conversation._meta.db_table
+MESSAGE_TABLE = Message._meta.db_table
+SNAPSHOT_TABLE = ConversationSnapshot._meta.db_table
+MESSAGE_CONVERSATION_COLUMN = Message._meta.get_field("conversation_id").column
+
+# A message as MessageSerializer renders it in UTC: microseconds only when
+# non-zero and a Z suffix, like DRF's DateTimeField.
+SNAPSHOT_ENTRY_SQL = """
+    jsonb_build_object(
+        'id', {alias}.id,
+        'type', {alias}.type,
+        'content', {alias}.content,
+        'timestamp', to_char({alias}.timestamp AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS')
+            || CASE WHEN date_part('microseconds', {alias}.timestamp)::bigint %% 1000000 <> 0
+                    THEN to_char({alias}.timestamp AT TIME ZONE 'UTC', '.US') ELSE '' END
+            || 'Z'
+    )
+"""
+SNAPSHOT_ENTRY_KEY_SQL = "(({entry}->>'timestamp')::timestamptz, ({entry}->>'id')::uuid)"
+
+# Keeps the %(transcript_size)s most recent entries of a jsonb array, oldest first.
+RECENT_TRANSCRIPT_SQL = f"""
+    (
+        SELECT coalesce(jsonb_agg(entry ORDER BY {SNAPSHOT_ENTRY_KEY_SQL.format(entry="entry")}), '[]'::jsonb)
+        FROM (
+            SELECT entry FROM jsonb_array_elements({{entries}}) AS entry
+            ORDER BY {SNAPSHOT_ENTRY_KEY_SQL.format(entry="entry")} DESC
+            LIMIT %(transcript_size)s
+        ) AS recent
+    )
+"""
+
+# Folds the rows of a ``new_messages (id, conversation_id, type, content,
+# timestamp)`` CTE into the existing snapshots of their conversations.
+APPLY_NEW_MESSAGES_TO_SNAPSHOTS_SQL = f"""
+    snapshot_changes AS (
+        SELECT
+            conversation_id,
+            count(*) AS message_count,
+            max(timestamp) AS last_message_at,
+            (array_agg(entry ORDER BY timestamp DESC, id DESC) FILTER (WHERE type = %(outbound)s))[1] AS last_outbound,
+            jsonb_agg(entry) AS entries
+        FROM (
+            SELECT new_messages.*, {SNAPSHOT_ENTRY_SQL.format(alias="new_messages")} AS entry
+            FROM new_messages
+        ) AS new_entries
+        GROUP BY conversation_id
+    ),
+    snapshots_updated AS (
+        UPDATE {SNAPSHOT_TABLE} AS snapshot
+        SET
+            message_count = snapshot.message_count + snapshot_changes.message_count,
+            last_message_at = GREATEST(snapshot.last_message_at, snapshot_changes.last_message_at),
+            last_outbound = CASE
+                WHEN snapshot_changes.last_outbound IS NULL THEN snapshot.last_outbound
+                WHEN snapshot.last_outbound IS NULL
+                  OR {SNAPSHOT_ENTRY_KEY_SQL.format(entry="snapshot_changes.last_outbound")}
+                   > {SNAPSHOT_ENTRY_KEY_SQL.format(entry="snapshot.last_outbound")}
+                THEN snapshot_changes.last_outbound
+                ELSE snapshot.last_outbound
+            END,
+            transcript = {RECENT_TRANSCRIPT_SQL.format(entries="snapshot.transcript || snapshot_changes.entries")},
+            updated_at = now()
+        FROM snapshot_changes
+        WHERE snapshot.conversation_id = snapshot_changes.conversation_id
+        RETURNING snapshot.conversation_id
+    )
+"""
+
+INSERT_CONVERSATIONS_SQL = f"""
+    WITH inserted AS (
+        INSERT INTO {CONVERSATION_TABLE} (id, status, created_at, message_sequence)
+        SELECT id, %(open)s, now(), 0 FROM unnest(%(conversation_ids)s::uuid[]) AS id
+        ON CONFLICT (id) DO NOTHING
+        RETURNING id
+    ),
+    snapshot AS (
+        INSERT INTO {SNAPSHOT_TABLE} (conversation_id, message_count, transcript, updated_at)
+        SELECT id, 0, '[]'::jsonb, now() FROM inserted
+    )
+    SELECT id FROM inserted
+"""
+
+INSERT_MESSAGES_SQL = f"""
+    INSERT INTO {MESSAGE_TABLE} (
+        id, {MESSAGE_CONVERSATION_COLUMN}, type, content, timestamp,
+        expected_conversation_id, processed, created_at
+    )
+    SELECT id, conversation_id, type, content, timestamp, expected_conversation_id, false, now()
+    FROM unnest(
+        %(ids)s::uuid[], %(conversation_ids)s::uuid[], %(types)s::text[], %(contents)s::text[],
+        %(timestamps)s::timestamptz[], %(expected_conversation_ids)s::uuid[]
+    ) AS new_message (id, conversation_id, type, content, timestamp, expected_conversation_id)
+    ON CONFLICT (id) DO NOTHING
+    RETURNING id
+"""
+
+INSERT_INBOUND_MESSAGE_SQL = f"""
+    WITH target AS (
+        SELECT id, status FROM {CONVERSATION_TABLE}
+        WHERE id = %(conversation_id)s
+        FOR NO KEY UPDATE
+    ),
+    sequenced AS (
+        UPDATE {CONVERSATION_TABLE} AS conversation
+        SET message_sequence = conversation.message_sequence + 1
+        FROM target
+        WHERE conversation.id = target.id AND target.status = %(open)s
+        RETURNING conversation.message_sequence
+    ),
+    inserted AS (
+        INSERT INTO {MESSAGE_TABLE} (
+            id, {MESSAGE_CONVERSATION_COLUMN}, type, content, timestamp,
+            expected_conversation_id, processed, created_at, sequence
+        )
+        SELECT
+            %(message_id)s, target.id, %(inbound)s, %(content)s, %(timestamp)s,
+            CASE WHEN target.id IS NULL THEN %(conversation_id)s::uuid END, false, now(),
+            sequenced.message_sequence
+        FROM (SELECT 1) AS one
+        LEFT JOIN target ON true
+        LEFT JOIN sequenced ON true
+        WHERE target.status = %(open)s OR (target.status IS NULL AND %(keep_orphan)s)
+        ON CONFLICT (id) DO NOTHING
+        RETURNING id, {MESSAGE_CONVERSATION_COLUMN} AS conversation_id, type, content, timestamp
+    ),
+    new_messages AS (
+        SELECT * FROM inserted WHERE conversation_id IS NOT NULL
+    ),
+    {APPLY_NEW_MESSAGES_TO_SNAPSHOTS_SQL}
+    SELECT target.status, EXISTS (SELECT 1 FROM inserted)
+    FROM (SELECT 1) AS one
+    LEFT JOIN target ON true
+"""
+
+# Numbers the messages just attached to their conversations after the
+# conversation's message_sequence, in timestamp order. The conversation rows
+# are locked in id order and stay locked until the transaction commits, so a
+# conversation's sequences become visible in the order they were handed out.
+ASSIGN_MESSAGE_SEQUENCES_SQL = f"""
+    WITH new_messages AS (
+        SELECT
+            id,
+            {MESSAGE_CONVERSATION_COLUMN} AS conversation_id,
+            row_number() OVER (PARTITION BY {MESSAGE_CONVERSATION_COLUMN} ORDER BY timestamp, id) AS position
+        FROM {MESSAGE_TABLE}
+        WHERE id = ANY(%(message_ids)s::uuid[]) AND {MESSAGE_CONVERSATION_COLUMN} IS NOT NULL AND sequence IS NULL
+    ),
+    locked AS (
+        SELECT id FROM {CONVERSATION_TABLE}
+        WHERE id IN (SELECT conversation_id FROM new_messages)
+        ORDER BY id
+        FOR NO KEY UPDATE
+    ),
+    sequenced AS (
+        UPDATE {CONVERSATION_TABLE} AS conversation
+        SET message_sequence = conversation.message_sequence + counts.message_count
+        FROM (
+            SELECT conversation_id, count(*) AS message_count FROM new_messages GROUP BY conversation_id
+        ) AS counts
+        JOIN locked ON locked.id = counts.conversation_id
+        WHERE conversation.id = counts.conversation_id
+        RETURNING conversation.id, conversation.message_sequence - counts.message_count AS previous_sequence
+    )
+    UPDATE {MESSAGE_TABLE} AS message
+    SET sequence = sequenced.previous_sequence + new_messages.position
+    FROM new_messages
+    JOIN sequenced ON sequenced.id = new_messages.conversation_id
+    WHERE message.id = new_messages.id
+"""
+
+APPLY_MESSAGES_TO_SNAPSHOTS_SQL = f"""
+    WITH new_messages AS (
+        SELECT id, {MESSAGE_CONVERSATION_COLUMN} AS conversation_id, type, content, timestamp
+        FROM {MESSAGE_TABLE}
+        WHERE id = ANY(%(message_ids)s::uuid[]) AND {MESSAGE_CONVERSATION_COLUMN} IS NOT NULL
+    ),
+    {APPLY_NEW_MESSAGES_TO_SNAPSHOTS_SQL}
+    SELECT count(*) FROM snapshots_updated
+"""
+
+LOCK_CONVERSATIONS_FOR_SNAPSHOT_SQL = f"""
+    WITH conversations AS (
+        SELECT id FROM {CONVERSATION_TABLE}
+        WHERE id = ANY(%(conversation_ids)s::uuid[])
+        ORDER BY id
+        FOR UPDATE
+    ),
+    snapshots AS (
+        SELECT conversation_id FROM {SNAPSHOT_TABLE}
+        WHERE conversation_id = ANY(%(conversation_ids)s::uuid[])
+        ORDER BY conversation_id
+        FOR UPDATE
+    )
+    SELECT (SELECT count(*) FROM conversations), (SELECT count(*) FROM snapshots)
+"""
+
+REBUILD_CONVERSATION_SNAPSHOTS_SQL = f"""
+    INSERT INTO {SNAPSHOT_TABLE} (
+        conversation_id, message_count, last_message_at, last_outbound, transcript, updated_at
+    )
+    SELECT
+        conversation.id,
+        (SELECT count(*) FROM {MESSAGE_TABLE} AS message WHERE message.{MESSAGE_CONVERSATION_COLUMN} = conversation.id),
+        (
+            SELECT max(message.timestamp) FROM {MESSAGE_TABLE} AS message
+            WHERE message.{MESSAGE_CONVERSATION_COLUMN} = conversation.id
+        ),
+        (
+            SELECT {SNAPSHOT_ENTRY_SQL.format(alias="message")} FROM {MESSAGE_TABLE} AS message
+            WHERE message.{MESSAGE_CONVERSATION_COLUMN} = conversation.id AND message.type = %(outbound)s
+            ORDER BY message.timestamp DESC, message.id DESC
+            LIMIT 1
+        ),
+        (
+            SELECT coalesce(jsonb_agg(entry ORDER BY timestamp, id), '[]'::jsonb)
+            FROM (
+                SELECT message.timestamp, message.id, {SNAPSHOT_ENTRY_SQL.format(alias="message")} AS entry
+                FROM {MESSAGE_TABLE} AS message
+                WHERE message.{MESSAGE_CONVERSATION_COLUMN} = conversation.id
+                ORDER BY message.timestamp DESC, message.id DESC
+                LIMIT %(transcript_size)s
+            ) AS recent
+        ),
+        now()
+    FROM {CONVERSATION_TABLE} AS conversation
+    WHERE conversation.id = ANY(%(conversation_ids)s::uuid[])
+    ON CONFLICT (conversation_id) DO UPDATE SET
+        message_count = EXCLUDED.message_count,
+        last_message_at = EXCLUDED.last_message_at,
+        last_outbound = EXCLUDED.last_outbound,
+        transcript = EXCLUDED.transcript,
+        updated_at = EXCLUDED.updated_at
+"""
+
+CLOSE_CONVERSATION_SQL = f"""
+    WITH target AS (
+        SELECT id, status FROM {CONVERSATION_TABLE}
+        WHERE id = %(conversation_id)s
+        FOR UPDATE
+    ),
+    updated AS (
+        UPDATE {CONVERSATION_TABLE} AS conversation
+        SET status = %(closed)s
+        FROM target
+        WHERE conversation.id = target.id AND target.status = %(open)s
+        RETURNING conversation.id
+    )
+    SELECT target.status, EXISTS (SELECT 1 FROM updated)
+    FROM (SELECT 1) AS one
+    LEFT JOIN target ON true
+"""
+
+
+DELETE_EXPIRED_ORPHAN_MESSAGES_SQL = f"""
+    DELETE FROM {MESSAGE_TABLE}
+    WHERE id IN (
+        SELECT id FROM {MESSAGE_TABLE}
+        WHERE {MESSAGE_CONVERSATION_COLUMN} IS NULL
+          AND created_at < now() - make_interval(secs => %(ttl_seconds)s)
+          AND (%(expected_conversation_id)s::uuid IS NULL OR expected_conversation_id = %(expected_conversation_id)s::uuid)
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    )
+"""
+
+
+# Orphans that were committed only after their conversation's adoption ran,
+# recognised by the conversation having been created within their TTL.
+ADOPT_LATE_ORPHAN_MESSAGES_SQL = f"""
+    UPDATE {MESSAGE_TABLE} AS message
+    SET
+        {MESSAGE_CONVERSATION_COLUMN} = message.expected_conversation_id,
+        expected_conversation_id = NULL
+    WHERE message.id IN (
+        SELECT late.id
+        FROM {MESSAGE_TABLE} AS late
+        JOIN {CONVERSATION_TABLE} AS conversation ON conversation.id = late.expected_conversation_id
+        WHERE late.{MESSAGE_CONVERSATION_COLUMN} IS NULL
+          AND conversation.status = %(open)s
+          AND conversation.created_at <= late.created_at + make_interval(secs => %(ttl_seconds)s)
+          AND (%(expected_conversation_id)s::uuid IS NULL OR late.expected_conversation_id = %(expected_conversation_id)s::uuid)
+        LIMIT %(limit)s
+        FOR UPDATE OF late SKIP LOCKED
+    )
+    RETURNING message.id, message.{MESSAGE_CONVERSATION_COLUMN}
+"""
+
+
+SELECT_PENDING_MESSAGE_GROUPS_SQL = f"""
+    SELECT
+        conversation_id,
+        SUM(starts_group) OVER (PARTITION BY conversation_id ORDER BY timestamp, id) AS group_id,
+        id
+    FROM (
+        SELECT
+            id,
+            {MESSAGE_CONVERSATION_COLUMN} AS conversation_id,
+            timestamp,
+            CASE
+                WHEN timestamp - LAG(timestamp) OVER conversation_window <= make_interval(secs => %(gap_seconds)s)
+                THEN 0 ELSE 1
+            END AS starts_group
+        FROM {MESSAGE_TABLE}
+        WHERE {MESSAGE_CONVERSATION_COLUMN} IS NOT NULL
+          AND processed = false
+          AND type = %(inbound)s
+          AND (%(conversation_ids)s::uuid[] IS NULL OR {MESSAGE_CONVERSATION_COLUMN} = ANY(%(conversation_ids)s::uuid[]))
+        WINDOW conversation_window AS (PARTITION BY {MESSAGE_CONVERSATION_COLUMN} ORDER BY timestamp, id)
+    ) AS flagged
+    ORDER BY conversation_id, timestamp, id
+"""
+
+
+CLAIM_PENDING_CONVERSATIONS_SQL = f"""
+    WITH pending AS MATERIALIZED (
+        SELECT DISTINCT {MESSAGE_CONVERSATION_COLUMN} AS conversation_id
+        FROM {MESSAGE_TABLE}
+        WHERE {MESSAGE_CONVERSATION_COLUMN} IS NOT NULL
+          AND processed = false
+          AND type = %(inbound)s
+          -- Masking the sign bit instead of abs(), which overflows on -2147483648.
+          AND mod(hashtext({MESSAGE_CONVERSATION_COLUMN}::text) & 2147483647, %(shards)s) = %(shard)s
+    )
+    SELECT conversation_id
+    FROM pending
+    WHERE pg_try_advisory_xact_lock(%(lock_namespace)s, hashtext(conversation_id::text))
+"""
+
+
+CLAIM_CONVERSATIONS_SQL = """
+    SELECT conversation_id
+    FROM unnest(%(conversation_ids)s::uuid[]) AS conversation_id
+    WHERE pg_try_advisory_xact_lock(%(lock_namespace)s, hashtext(conversation_id::text))
+"""
+
+
+LOCK_CONVERSATION_SQL = """
+    SELECT pg_advisory_xact_lock(%(lock_namespace)s, hashtext(%(conversation_id)s))
+"""
+
+
+MARK_INBOUND_MESSAGES_PROCESSED_SQL = f"""
+    UPDATE {MESSAGE_TABLE}
+    SET processed = true
+    WHERE id = ANY(%(message_ids)s::uuid[])
+      AND {MESSAGE_CONVERSATION_COLUMN} = %(conversation_id)s
+      AND processed = false
+      AND type = %(inbound)s
+    RETURNING id, created_at
+"""
+
+
+MARK_MESSAGES_PROCESSED_SQL = f"""
+    UPDATE {MESSAGE_TABLE}
+    SET processed = true
+    WHERE id = ANY(%(message_ids)s::uuid[])
+    RETURNING id, created_at
+"""
+
+
+def insert_conversation(conversation_id) -> bool:
+    """
+    INSERT ... ON CONFLICT DO NOTHING, together with the conversation's empty
+    snapshot. Returns whether the row was created.
+    """
+    return bool(insert_conversations([conversation_id]))
+
+
+def insert_conversations(conversation_ids: list) -> set[str]:
+    """
+    insert_conversation for several ids in one statement. Returns the ids of
+    the conversations actually created; the others already existed.
+    """
+    if not conversation_ids:
+        return set()
+    with connection.cursor() as cursor:
+        cursor.execute(INSERT_CONVERSATIONS_SQL, {
+            "conversation_ids": [str(_id) for _id in conversation_ids],
+            "open": Conversation.Status.OPEN,
+        })
+        return {str(row[0]) for row in cursor.fetchall()}
+
+
+def insert_messages(messages: list[Message]) -> set[str]:
+    """
+    INSERT ... ON CONFLICT DO NOTHING of unsaved Message instances. Returns
+    the ids of the rows actually inserted, so messages a concurrent request
+    stored first are told apart instead of failing the whole statement.
+    Snapshots are left to apply_messages_to_snapshots.
+    """
+    if not messages:
+        return set()
+    with connection.cursor() as cursor:
+        cursor.execute(INSERT_MESSAGES_SQL, {
+            "ids": [str(message.id) for message in messages],
+            "conversation_ids": [
+                None if message.conversation_id_id is None else str(message.conversation_id_id) for message in messages
+            ],
+            "types": [message.type for message in messages],
+            "contents": [message.content for message in messages],
+            "timestamps": [message.timestamp for message in messages],
+            "expected_conversation_ids": [
+                None if message.expected_conversation_id is None else str(message.expected_conversation_id)
+                for message in messages
+            ],
+        })
+        return {str(row[0]) for row in cursor.fetchall()}
+
+
+def insert_inbound_message(message_id, conversation_id, content, timestamp, keep_orphan=True) -> tuple[str | None, bool]:
+    """
+    Inserts the message only while its conversation is OPEN, or as an orphan
+    when the conversation does not exist yet and ``keep_orphan`` is set. The
+    conversation row is locked, so a concurrent close can't slip in between
+    the check and the insert, and an already stored message id is skipped
+    instead of raising. The message's sequence and the conversation snapshot
+    are updated by the same statement.
+    Returns the conversation status seen (None if it doesn't exist) and
+    whether the message was inserted.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(INSERT_INBOUND_MESSAGE_SQL, {
+            "message_id": str(message_id),
+            "conversation_id": str(conversation_id),
+            "content": content,
+            "timestamp": timestamp,
+            "keep_orphan": keep_orphan,
+            "inbound": Message.MessageType.INBOUND,
+            "outbound": Message.MessageType.OUTBOUND,
+            "open": Conversation.Status.OPEN,
+            "transcript_size": settings.CONVERSATION_SNAPSHOT_TRANSCRIPT_SIZE,
+        })
+        return cursor.fetchone()
+
+
+def close_conversation(conversation_id) -> tuple[str | None, bool]:
+    """
+    UPDATE ... WHERE status = 'OPEN'. Returns the conversation status seen
+    before the update (None if it doesn't exist) and whether it was closed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(CLOSE_CONVERSATION_SQL, {
+            "conversation_id": str(conversation_id),
+            "open": Conversation.Status.OPEN,
+            "closed": Conversation.Status.CLOSED,
+        })
+        return cursor.fetchone()
+
+
+def delete_expired_orphan_messages(ttl_seconds: int, limit: int, expected_conversation_id=None) -> int:
+    """
+    Deletes up to ``limit`` orphan messages older than ``ttl_seconds``, only
+    the ones waiting for ``expected_conversation_id`` when it is given.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(DELETE_EXPIRED_ORPHAN_MESSAGES_SQL, {
+            "ttl_seconds": ttl_seconds,
+            "limit": limit,
+            "expected_conversation_id": None if expected_conversation_id is None else str(expected_conversation_id),
+        })
+        return cursor.rowcount
+
+
+def adopt_late_orphan_messages(ttl_seconds: int, limit: int, expected_conversation_id=None) -> list[tuple]:
+    """
+    Attaches up to ``limit`` orphan messages to their conversation when it
+    was created less than ``ttl_seconds`` after them, so an orphan that
+    committed after the conversation's adoption isn't expired. Only the ones
+    waiting for ``expected_conversation_id`` when it is given. Returns
+    ``(message_id, conversation_id)`` rows.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(ADOPT_LATE_ORPHAN_MESSAGES_SQL, {
+            "ttl_seconds": ttl_seconds,
+            "limit": limit,
+            "open": Conversation.Status.OPEN,
+            "expected_conversation_id": None if expected_conversation_id is None else str(expected_conversation_id),
+        })
+        return cursor.fetchall()
+
+
+def select_pending_message_groups(gap_seconds: int, conversation_ids: list | None = None) -> list[tuple]:
+    """
+    Splits the unprocessed INBOUND messages of every conversation (or only of
+    ``conversation_ids``) into bursts whose consecutive messages are at most
+    ``gap_seconds`` apart. Returns ``(conversation_id, group_id, message_id)``
+    rows ordered by conversation and timestamp.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(SELECT_PENDING_MESSAGE_GROUPS_SQL, {
+            "gap_seconds": gap_seconds,
+            "conversation_ids": None if conversation_ids is None else [str(_id) for _id in conversation_ids],
+            "inbound": Message.MessageType.INBOUND,
+        })
+        return cursor.fetchall()
+
+
+def claim_pending_conversations(shard: int, shards: int, lock_namespace: int) -> list:
+    """
+    Returns the conversations of ``shard`` (out of ``shards``, by hash of the
+    id) that have unprocessed INBOUND messages, taking a transaction-level
+    advisory lock on each one. Conversations already locked by another run
+    are skipped, so the caller must be inside a transaction and keeps the
+    claim until it commits.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(CLAIM_PENDING_CONVERSATIONS_SQL, {
+            "shard": shard,
+            "shards": shards,
+            "lock_namespace": lock_namespace,
+            "inbound": Message.MessageType.INBOUND,
+        })
+        return [row[0] for row in cursor.fetchall()]
+
+
+def claim_conversations(conversation_ids: list, lock_namespace: int) -> list:
+    """
+    Takes the same transaction-level advisory lock as
+    claim_pending_conversations on each of ``conversation_ids`` and returns
+    the ones that were not already claimed by another run.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(CLAIM_CONVERSATIONS_SQL, {
+            "conversation_ids": [str(_id) for _id in conversation_ids],
+            "lock_namespace": lock_namespace,
+        })
+        return [row[0] for row in cursor.fetchall()]
+
+
+def lock_conversation(conversation_id, lock_namespace: int) -> None:
+    """Waits for the advisory lock claim_conversations tries to take."""
+    with connection.cursor() as cursor:
+        cursor.execute(LOCK_CONVERSATION_SQL, {
+            "conversation_id": str(conversation_id),
+            "lock_namespace": lock_namespace,
+        })
+
+
+def mark_inbound_messages_processed(conversation_id, message_ids: list) -> dict:
+    """
+    Flags the still unprocessed INBOUND ``message_ids`` of the conversation
+    as processed. Returns the ``created_at`` of the messages that were
+    actually flagged, by id.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(MARK_INBOUND_MESSAGES_PROCESSED_SQL, {
+            "conversation_id": str(conversation_id),
+            "message_ids": [str(_id) for _id in message_ids],
+            "inbound": Message.MessageType.INBOUND,
+        })
+        return {str(row[0]): row[1] for row in cursor.fetchall()}
+
+
+def mark_messages_processed(message_ids: list) -> dict:
+    """Flags ``message_ids`` as processed and returns their ``created_at`` by id."""
+    with connection.cursor() as cursor:
+        cursor.execute(MARK_MESSAGES_PROCESSED_SQL, {"message_ids": [str(_id) for _id in message_ids]})
+        return {str(row[0]): row[1] for row in cursor.fetchall()}
+
+
+def apply_messages_to_snapshots(message_ids: list) -> int:
+    """
+    Numbers messages just attached to their conversations in the
+    conversation's message sequence, then adds them to the conversation
+    snapshots: count, last timestamps and transcript. Each message must be
+    applied once, right after the write that attached it, since the
+    conversation stays locked from then until commit. Conversations without a
+    snapshot are skipped until rebuild_conversation_snapshots builds one.
+    Returns the number of snapshots updated.
+    """
+    if not message_ids:
+        return 0
+    message_ids = [str(_id) for _id in message_ids]
+    with connection.cursor() as cursor:
+        cursor.execute(ASSIGN_MESSAGE_SEQUENCES_SQL, {"message_ids": message_ids})
+        cursor.execute(APPLY_MESSAGES_TO_SNAPSHOTS_SQL, {
+            "message_ids": message_ids,
+            "outbound": Message.MessageType.OUTBOUND,
+            "transcript_size": settings.CONVERSATION_SNAPSHOT_TRANSCRIPT_SIZE,
+        })
+        return cursor.fetchone()[0]
+
+
+def rebuild_conversation_snapshots(conversation_ids: list) -> None:
+    """
+    Recomputes the snapshots of ``conversation_ids`` from the Message table.
+    The conversations and their snapshots are locked first and the messages
+    read by a later statement, so writes that commit in the meantime are
+    either counted by the rebuild or applied on top of it. The caller must be
+    inside a transaction.
+    """
+    params = {
+        "conversation_ids": [str(_id) for _id in conversation_ids],
+        "outbound": Message.MessageType.OUTBOUND,
+        "transcript_size": settings.CONVERSATION_SNAPSHOT_TRANSCRIPT_SIZE,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(LOCK_CONVERSATIONS_FOR_SNAPSHOT_SQL, params)
+        cursor.execute(REBUILD_CONVERSATION_SNAPSHOTS_SQL, params)
@@ -0,0 +1,72 @@
+import orjson
+from django.db.models import QuerySet
+from django.utils import timezone
+
+MESSAGE_FIELDS = ("id", "type", "content", "timestamp")
+
+
+def message_rows(queryset: QuerySet, *extra_fields: str) -> QuerySet:
+    """
+    Named rows with the exposed message fields plus ``extra_fields``. The
+    render_* functions encode them straight to JSON, skipping the model and
+    DRF field objects per message, and produce the same bytes as the DRF
+    serializers in responses.py through JSONRenderer.
+    """
+    return queryset.values_list(*MESSAGE_FIELDS, *extra_fields, named=True)
+
+
+def render_conversation_detail(conversation, messages: list, next_url: str | None, previous_url: str | None) -> bytes:
+    return render_json({
+        "id": conversation.id,
+        "status": conversation.status,
+        "messages": _message_dicts(messages),
+        "next": next_url,
+        "previous": previous_url,
+    })
+
+
+def render_conversation_delta(conversation, messages: list, cursor: str, has_more: bool) -> bytes:
+    return render_json({
+        "id": conversation.id,
+        "status": conversation.status,
+        "messages": _message_dicts(messages),
+        "cursor": cursor,
+        "has_more": has_more,
+    })
+
+
+def render_conversation_snapshot(conversation, transcript: list) -> bytes:
+    """Detail body of a conversation whose messages all fit its snapshot transcript."""
+    return render_json({
+        "id": conversation.id,
+        "status": conversation.status,
+        "messages": [
+            {"id": entry["id"], "type": entry["type"], "content": entry["content"], "timestamp": entry["timestamp"]}
+            for entry in transcript
+        ],
+        "next": None,
+        "previous": None,
+    })
+
+
+def render_json(data) -> bytes:
+    # JSONRenderer escapes the JS line terminators, orjson leaves them raw.
+    return (
+        orjson.dumps(data, option=orjson.OPT_UTC_Z)
+        .replace(b"\xe2\x80\xa8", b"\\u2028")
+        .replace(b"\xe2\x80\xa9", b"\\u2029")
+    )
+
+
+def _message_dicts(messages: list) -> list[dict]:
+    # DRF renders datetimes in the current time zone, rows come back in UTC.
+    current_timezone = timezone.get_current_timezone()
+    if str(current_timezone) == "UTC":
+        return [
+            {"id": row.id, "type": row.type, "content": row.content, "timestamp": row.timestamp}
+            for row in messages
+        ]
+    return [
+        {"id": row.id, "type": row.type, "content": row.content, "timestamp": row.timestamp.astimezone(current_timezone)}
+        for row in messages
+    ]
@@ -0,0 +1,86 @@
+import uuid
+from typing import Annotated
+
+import msgspec
+from django.conf import settings
+from rest_framework import serializers
+
+
+class ConversationData(msgspec.Struct):
+    id: uuid.UUID
+
+
+class NewMessageData(msgspec.Struct):
+    id: uuid.UUID
+    content: Annotated[str, msgspec.Meta(max_length=500)]
+    conversation_id: uuid.UUID
+
+
+class NewConversationEvent(msgspec.Struct, tag_field="type", tag="NEW_CONVERSATION"):
+    timestamp: str
+    data: ConversationData
+
+
+class NewMessageEvent(msgspec.Struct, tag_field="type", tag="NEW_MESSAGE"):
+    timestamp: str
+    data: NewMessageData
+
+
+class CloseConversationEvent(msgspec.Struct, tag_field="type", tag="CLOSE_CONVERSATION"):
+    timestamp: str
+    data: ConversationData
+
+
+class WebhookEventDecoder:
+    """
+    Decodes and validates webhook events in a single pass with msgspec
+    schemas tagged on ``type``. decode() returns ``(payload_type,
+    validated_payload)`` shaped like the validated_data of the serializers in
+    payloads.py, or None when the event doesn't pass. Callers then run the
+    DRF serializers, so 400 bodies are unchanged and inputs DRF coerces
+    (integer UUIDs, numeric content) are still accepted.
+    """
+
+    def __init__(self):
+        self._event_decoder = msgspec.json.Decoder(NewConversationEvent | NewMessageEvent | CloseConversationEvent)
+        self._batch_decoder = msgspec.json.Decoder(list[msgspec.Raw])
+        self._raw_decoder = msgspec.json.Decoder(msgspec.Raw)
+        # Timestamps go through DRF's own parser and time zone handling.
+        self._timestamp_field = serializers.DateTimeField()
+
+    def decode(self, raw: bytes) -> tuple[str, dict] | None:
+        try:
+            event = self._event_decoder.decode(raw)
+            timestamp = self._timestamp_field.to_internal_value(event.timestamp)
+        except (msgspec.DecodeError, serializers.ValidationError):
+            return None
+
+        if isinstance(event, NewMessageEvent):
+            # Same rules as CharField: trimmed, not blank, no null characters.
+            content = event.data.content.strip()
+            if not content or "\x00" in content:
+                return None
+            data = {"id": event.data.id, "content": content, "conversation_id": event.data.conversation_id}
+        else:
+            data = {"id": event.data.id}
+
+        payload_type = event.__struct_config__.tag
+        return payload_type, {"type": payload_type, "timestamp": timestamp, "data": data}
+
+    def split_batch(self, body: bytes, ndjson: bool = False) -> list[msgspec.Raw] | None:
+        """Raw events of a JSON array or NDJSON body, None if it isn't valid JSON."""
+        try:
+            if ndjson:
+                return [self._raw_decoder.decode(line) for line in body.split(b"\n") if line.strip()]
+            return self._batch_decoder.decode(body)
+        except msgspec.DecodeError:
+            return None
+
+
+webhook_event_decoder = WebhookEventDecoder()
+
+
+def get_webhook_decoder() -> WebhookEventDecoder | None:
+    if settings.WEBHOOK_VALIDATION_BACKEND == "msgspec":
+        return webhook_event_decoder
+    return None
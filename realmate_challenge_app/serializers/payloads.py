@@ -1,5 +1,9 @@
 from rest_framework import serializers
 
+from ..models import Conversation
+
+ERROR_EMPTY_EXPORT_RANGE = "created_after must be earlier than created_before"
+
 
 class ConversationDataSerializer(serializers.Serializer):
     id = serializers.UUIDField()
@@ -26,4 +30,16 @@ class NewMessagePayloadSerializer(serializers.Serializer):
 class CloseConversationPayloadSerializer(serializers.Serializer):
     type = serializers.ChoiceField(choices=[("CLOSE_CONVERSATION", "CLOSE_CONVERSATION")])
     timestamp = serializers.DateTimeField()
-    data = ConversationDataSerializer()
\ No newline at end of file
+    data = ConversationDataSerializer()
+
+class ConversationExportFiltersSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Conversation.Status.choices, required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        created_after = attrs.get("created_after")
+        created_before = attrs.get("created_before")
+        if created_after and created_before and created_after >= created_before:
+            raise serializers.ValidationError(ERROR_EMPTY_EXPORT_RANGE)
+        return attrs
@@ -9,8 +9,38 @@ class MessageSerializer(serializers.ModelSerializer):
 
 
 class ConversationDetailSerializer(serializers.ModelSerializer):
-    messages = MessageSerializer(many=True, read_only=True)
+    messages = serializers.SerializerMethodField()
+    next = serializers.SerializerMethodField()
+    previous = serializers.SerializerMethodField()
 
     class Meta:
         model = Conversation
-        fields = ['id', 'status',  'messages']
+        fields = ['id', 'status',  'messages', 'next', 'previous']
+
+    def get_messages(self, conversation):
+        return MessageSerializer(self.context['messages'], many=True).data
+
+    def get_next(self, conversation):
+        return self.context['next']
+
+    def get_previous(self, conversation):
+        return self.context['previous']
+
+
+class ConversationDeltaSerializer(serializers.ModelSerializer):
+    messages = serializers.SerializerMethodField()
+    cursor = serializers.SerializerMethodField()
+    has_more = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Conversation
+        fields = ['id', 'status', 'messages', 'cursor', 'has_more']
+
+    def get_messages(self, conversation):
+        return MessageSerializer(self.context['messages'], many=True).data
+
+    def get_cursor(self, conversation):
+        return self.context['cursor']
+
+    def get_has_more(self, conversation):
+        return self.context['has_more']
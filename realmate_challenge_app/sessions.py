@@ -0,0 +1,119 @@
+import threading
+
+import redis
+from django.conf import settings
+
+from realmate_challenge.logger import logger
+from .redis_client import get_redis_client
+
+SESSION_LAST_TIMESTAMP_KEY = "session:{}:last"
+SESSION_BURST_KEY = "session:{}:burst"
+MSG_SESSION_WINDOWS_UNAVAILABLE = "Session windows unavailable for conversation {}. Error: {}"
+
+# Same rule as InMemorySessionWindows.observe, applied atomically in Redis.
+OBSERVE_SCRIPT = """
+local timestamp = tonumber(ARGV[1])
+local gap_ms = tonumber(ARGV[2])
+local last = tonumber(redis.call('GET', KEYS[1]))
+
+local closed = {}
+if last and timestamp - last > gap_ms then
+    closed = redis.call('LRANGE', KEYS[2], 0, -1)
+    redis.call('DEL', KEYS[2])
+end
+redis.call('RPUSH', KEYS[2], ARGV[3])
+if not last or timestamp > last or #closed > 0 then
+    last = timestamp
+end
+redis.call('SET', KEYS[1], last, 'PX', ARGV[4])
+redis.call('PEXPIRE', KEYS[2], ARGV[4])
+return closed
+"""
+
+
+def _to_ms(timestamp) -> int:
+    return int(timestamp.timestamp() * 1000)
+
+
+class InMemorySessionWindows:
+    """
+    Streaming burst detection. For each conversation only the latest message
+    timestamp and the ids of the open burst are kept; observing a message
+    more than ``gap_ms`` after the latest one closes the burst and returns
+    its ids. Older, out of order messages join the open burst.
+    """
+
+    def __init__(self, gap_ms: int):
+        self.gap_ms = gap_ms
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def observe(self, conversation_id, message_id, timestamp) -> list[str]:
+        timestamp_ms = _to_ms(timestamp)
+        with self._lock:
+            last_ms, burst = self._sessions.get(str(conversation_id), (None, []))
+            closed = []
+            if last_ms is not None and timestamp_ms - last_ms > self.gap_ms:
+                closed, burst = burst, []
+            burst.append(str(message_id))
+            if last_ms is None or timestamp_ms > last_ms or closed:
+                last_ms = timestamp_ms
+            self._sessions[str(conversation_id)] = (last_ms, burst)
+        return closed
+
+    def flush(self, conversation_id) -> list[str]:
+        with self._lock:
+            _, burst = self._sessions.pop(str(conversation_id), (None, []))
+        return burst
+
+
+class RedisSessionWindows:
+    """
+    Redis backed InMemorySessionWindows shared by every web and worker
+    process. Each conversation uses a timestamp key and a list with the open
+    burst, both dropped after ``idle_ttl_ms`` without messages.
+    """
+
+    def __init__(self, gap_ms: int, idle_ttl_ms: int):
+        self.gap_ms = gap_ms
+        self.idle_ttl_ms = idle_ttl_ms
+
+    def observe(self, conversation_id, message_id, timestamp) -> list[str]:
+        try:
+            closed = get_redis_client().eval(
+                OBSERVE_SCRIPT,
+                2,
+                SESSION_LAST_TIMESTAMP_KEY.format(conversation_id),
+                SESSION_BURST_KEY.format(conversation_id),
+                _to_ms(timestamp),
+                self.gap_ms,
+                str(message_id),
+                self.idle_ttl_ms,
+            )
+        except redis.RedisError as exc:
+            logger.warning(MSG_SESSION_WINDOWS_UNAVAILABLE, conversation_id, exc)
+            return []
+        return [message_id.decode() for message_id in closed]
+
+    def flush(self, conversation_id) -> list[str]:
+        try:
+            pipeline = get_redis_client().pipeline(transaction=True)
+            pipeline.lrange(SESSION_BURST_KEY.format(conversation_id), 0, -1)
+            pipeline.delete(SESSION_BURST_KEY.format(conversation_id), SESSION_LAST_TIMESTAMP_KEY.format(conversation_id))
+            burst, _ = pipeline.execute()
+        except redis.RedisError as exc:
+            logger.warning(MSG_SESSION_WINDOWS_UNAVAILABLE, conversation_id, exc)
+            return []
+        return [message_id.decode() for message_id in burst]
+
+
+memory_session_windows = InMemorySessionWindows(gap_ms=settings.SESSION_WINDOW_GAP_MS)
+
+
+def get_session_windows() -> InMemorySessionWindows | RedisSessionWindows:
+    if settings.SESSION_WINDOW_BACKEND == "memory":
+        return memory_session_windows
+    return RedisSessionWindows(
+        gap_ms=settings.SESSION_WINDOW_GAP_MS,
+        idle_ttl_ms=settings.SESSION_WINDOW_IDLE_TTL_SECONDS * 1000,
+    )
@@ -1,58 +1,105 @@
-from celery import shared_task
+import time
+
+from celery import group, shared_task
+from django.conf import settings
 from django.db import transaction
 from datetime import timedelta
 from django.utils import timezone
 
 
 from realmate_challenge.logger import logger
+from . import queries
 from .models import Message, Conversation
+from .events import notify_conversations_changed
+from .metrics import observe_reply_lag, observe_task
+from .sessions import get_session_windows
+from .timers import schedule_conversation_flush, timer_service
 
 
 INTERVAL_MINIMAL_EXPECTED = 5
+INBOUND_PROCESSING_LOCK_NAMESPACE = 5001
+TIMER_RETRY_DELAY_MS = 250
+# Celery task states, so timer runs and task runs share their labels.
+TIMER_STATE_SUCCESS = "SUCCESS"
+TIMER_STATE_RESCHEDULED = "RETRY"
+TIMER_STATE_FAILURE = "FAILURE"
 MSG_MESSAGE_ALREADY_HAS_CONVERSATION = "Message {message_id} already has a conversation ID. Skipping."
+MSG_MESSAGE_ALREADY_ADOPTED_OR_REMOVED = "Message {message_id} already adopted or removed. Skipping."
 MSG_MESSAGE_NO_CONVERSATION_OR_EXPECTED = "Message {message_id} has no conversation_id and no expected_conversation_id. Deleting."
 MSG_CONVERSATION_NOT_FOUND_FOR_MESSAGE_DELETING = "Conversation {conversation_id} not found for message {message_id}. Deleting message."
+MSG_CONVERSATION_NOT_OPEN_FOR_MESSAGE = "Conversation {conversation_id} of message {message_id} is not open. Leaving the message to expire."
 MSG_MESSAGE_SUCCESSFULLY_ASSIGNED = "Message {message_id} successfully assigned to conversation {conversation_id}."
 MSG_MESSAGE_NOT_FOUND = "Message {message_id} not found (might have been deleted by another process)."
 MSG_ERROR_PROCESSING_MESSAGE_CELERY = "Error processing message {message_id}. Error: {exc}"
+MSG_EXPIRED_ORPHAN_MESSAGES_SWEPT = "{count} expired orphan messages deleted."
+MSG_LATE_ORPHAN_MESSAGES_ADOPTED = "{count} orphan messages stored after their conversation adopted by conversations {conversation_ids}"
+MSG_INBOUND_PROCESSING_FANNED_OUT = "Inbound message processing fanned out to {shards} shards."
+MSG_UNKNOWN_TIMER = "Unknown timer {timer}. Dropping it."
+MSG_ERROR_FIRING_TIMER = "Error firing timer {timer}. Error: {exc}"
 
 
 @shared_task
 def check_and_assign_conversation(message_id: str):
+    """
+    Deprecated: nothing schedules it since early messages are adopted when
+    their conversation is created and expired by timers. Kept registered so
+    tasks queued by an older release still run, attaching the message only
+    to an OPEN conversation.
+    """
     try:
+        if not Message.objects.filter(id=message_id, conversation_id__isnull=True).exists():
+            logger.info(MSG_MESSAGE_ALREADY_ADOPTED_OR_REMOVED, message_id=message_id)
+            return
+
         with transaction.atomic():
             message = Message.objects.select_for_update().get(id=message_id)
             if message.conversation_id is not None:
-                logger.info(MSG_MESSAGE_ALREADY_HAS_CONVERSATION.format(message_id=message.id))
+                logger.info(MSG_MESSAGE_ALREADY_HAS_CONVERSATION, message_id=message.id)
                 return
 
             if message.expected_conversation_id is None:
-                logger.warning(MSG_MESSAGE_NO_CONVERSATION_OR_EXPECTED.format(message_id=message.id))
+                logger.warning(MSG_MESSAGE_NO_CONVERSATION_OR_EXPECTED, message_id=message.id)
                 message.delete()
                 return
 
             try:
                 conversation = Conversation.objects.get(id=message.expected_conversation_id)
+                if conversation.status != Conversation.Status.OPEN:
+                    logger.info(MSG_CONVERSATION_NOT_OPEN_FOR_MESSAGE, conversation_id=conversation.id, message_id=message.id)
+                    return
                 message.conversation_id = conversation
                 message.save()
-                logger.info(MSG_MESSAGE_SUCCESSFULLY_ASSIGNED.format(
-                    message_id=message.id, 
-                    conversation_id=conversation.id
-                    )
-                )
+                queries.apply_messages_to_snapshots([message.id])
+                transaction.on_commit(lambda: notify_conversations_changed([conversation.id]))
+                transaction.on_commit(lambda: schedule_conversation_flush([conversation.id]))
+                logger.info(MSG_MESSAGE_SUCCESSFULLY_ASSIGNED, message_id=message.id, conversation_id=conversation.id)
             except Conversation.DoesNotExist:
                 logger.warning(
-                    MSG_CONVERSATION_NOT_FOUND_FOR_MESSAGE_DELETING.format(
-                        conversation_id=message.expected_conversation_id, 
-                        message_id=message.id
-                    )
+                    MSG_CONVERSATION_NOT_FOUND_FOR_MESSAGE_DELETING,
+                    conversation_id=message.expected_conversation_id,
+                    message_id=message.id,
                 )
                 message.delete()
 
     except Message.DoesNotExist:
-        logger.info(MSG_MESSAGE_NOT_FOUND.format(message_id=message_id))
+        logger.info(MSG_MESSAGE_NOT_FOUND, message_id=message_id)
     except Exception as exc:
-        logger.error(MSG_ERROR_PROCESSING_MESSAGE_CELERY.format(message_id=message_id, exc=exc))
+        logger.error(MSG_ERROR_PROCESSING_MESSAGE_CELERY, message_id=message_id, exc=exc)
+
+
+@shared_task
+def sweep_expired_orphan_messages(batch_size: int = None):
+    batch_size = batch_size or settings.ORPHAN_SWEEP_BATCH_SIZE
+    _adopt_late_orphan_messages(batch_size=batch_size)
+    deleted = 0
+    while True:
+        batch_deleted = queries.delete_expired_orphan_messages(settings.PENDING_MESSAGES_TTL_SECONDS, batch_size)
+        deleted += batch_deleted
+        if batch_deleted < batch_size:
+            break
+    if deleted:
+        logger.info(MSG_EXPIRED_ORPHAN_MESSAGES_SWEPT, count=deleted)
+    return deleted
 
 
 def _get_single_and_grouped_messages(conversation_id):
@@ -90,12 +137,30 @@ def _get_single_and_grouped_messages(conversation_id):
 
     return messages_to_process_as_group, messages_to_process_individually
 
+def _get_single_and_grouped_message_ids(conversation_ids=None):
+    groups = {}
+    rows = queries.select_pending_message_groups(INTERVAL_MINIMAL_EXPECTED, conversation_ids)
+    for conversation_id, group_id, message_id in rows:
+        groups.setdefault(conversation_id, {}).setdefault(group_id, []).append(message_id)
+
+    message_ids = {}
+    for conversation_id, conversation_groups in groups.items():
+        messages_to_process_as_group = []
+        messages_to_process_individually = []
+        for message_group in conversation_groups.values():
+            if len(message_group) > 1:
+                messages_to_process_as_group.extend(message_group)
+            else:
+                messages_to_process_individually.extend(message_group)
+        message_ids[conversation_id] = (messages_to_process_as_group, messages_to_process_individually)
+    return message_ids
+
 def _build_message_summary(ids):
     return "Mensagens recebidas:\n" + "\n".join(str(_id) for _id in ids)
 
-def _create_new_outbound_message(conversation_id: str, content: str):
-    return Message.objects.create(
-        conversation_id=Conversation.objects.get(id=conversation_id),
+def _build_outbound_message(conversation_id, content: str):
+    return Message(
+        conversation_id_id=conversation_id,
         content=content,
         processed=True,
         type=Message.MessageType.OUTBOUND,
@@ -104,19 +169,164 @@ def _create_new_outbound_message(conversation_id: str, content: str):
 
 @shared_task
 def process_inbound_messages():
+    shards = settings.INBOUND_PROCESSING_SHARDS
+    if shards == 1:
+        return process_inbound_messages_shard(0, 1)
+
+    group(process_inbound_messages_shard.s(shard, shards) for shard in range(shards)).apply_async()
+    logger.info(MSG_INBOUND_PROCESSING_FANNED_OUT, shards=shards)
+    return []
+
+@shared_task
+def process_inbound_messages_shard(shard: int, shards: int):
+    with transaction.atomic():
+        conversation_ids = queries.claim_pending_conversations(shard, shards, INBOUND_PROCESSING_LOCK_NAMESPACE)
+        return _process_claimed_conversations(conversation_ids)
+
+@shared_task
+def flush_conversation(conversation_id: str):
+    with transaction.atomic():
+        if not queries.claim_conversations([conversation_id], INBOUND_PROCESSING_LOCK_NAMESPACE):
+            return None
+        outbound_result = []
+        burst_reply = _reply_to_burst(conversation_id, get_session_windows().flush(conversation_id))
+        if burst_reply:
+            outbound_result.append(burst_reply)
+        return outbound_result + _process_claimed_conversations([conversation_id])
+
+@shared_task
+def reply_to_burst(conversation_id: str, message_ids: list):
+    with transaction.atomic():
+        queries.lock_conversation(conversation_id, INBOUND_PROCESSING_LOCK_NAMESPACE)
+        return _reply_to_burst(conversation_id, message_ids)
+
+@shared_task
+def expire_orphan_messages(conversation_id: str):
+    _adopt_late_orphan_messages(conversation_id)
+    deleted = queries.delete_expired_orphan_messages(
+        settings.PENDING_MESSAGES_TTL_SECONDS, settings.ORPHAN_SWEEP_BATCH_SIZE, conversation_id
+    )
+    if deleted:
+        logger.info(MSG_EXPIRED_ORPHAN_MESSAGES_SWEPT, count=deleted)
+    return deleted
+
+def _adopt_late_orphan_messages(conversation_id=None, batch_size: int = None) -> int:
+    batch_size = batch_size or settings.ORPHAN_SWEEP_BATCH_SIZE
+    adopted = 0
+    while True:
+        batch_adopted = _adopt_late_orphan_message_batch(conversation_id, batch_size)
+        adopted += batch_adopted
+        if batch_adopted < batch_size:
+            return adopted
+
+def _adopt_late_orphan_message_batch(conversation_id, batch_size: int) -> int:
+    with transaction.atomic():
+        adopted = queries.adopt_late_orphan_messages(
+            settings.PENDING_MESSAGES_TTL_SECONDS, batch_size, conversation_id
+        )
+        if not adopted:
+            return 0
+        queries.apply_messages_to_snapshots([message_id for message_id, _ in adopted])
+        conversation_ids = {adopted_conversation_id for _, adopted_conversation_id in adopted}
+        transaction.on_commit(lambda: notify_conversations_changed(conversation_ids))
+        transaction.on_commit(lambda: schedule_conversation_flush(conversation_ids))
+    logger.info(MSG_LATE_ORPHAN_MESSAGES_ADOPTED, count=len(adopted), conversation_ids=conversation_ids)
+    return len(adopted)
+
+TIMER_HANDLERS = {
+    "flush": flush_conversation,
+    "expire": expire_orphan_messages,
+}
+
+def fire_due_timers(limit: int = None) -> int:
+    """
+    Runs the handler of every due timer and acks it. A flush whose
+    conversation is busy is rescheduled, and a timer whose handler fails is
+    left leased so it fires again once the lease expires. The handlers run
+    in this process rather than as Celery tasks, so their run time is
+    recorded here under the task duration metric.
+    """
+    timers = timer_service.claim(limit or settings.TIMERS_CLAIM_BATCH_SIZE)
+    handled = []
+    for timer in timers:
+        prefix, _, conversation_id = timer.partition(":")
+        handler = TIMER_HANDLERS.get(prefix)
+        if handler is None:
+            logger.warning(MSG_UNKNOWN_TIMER, timer=timer)
+            handled.append(timer)
+            continue
+        started = time.perf_counter()
+        try:
+            if handler(conversation_id) is None:
+                timer_service.schedule(timer, TIMER_RETRY_DELAY_MS)
+                state = TIMER_STATE_RESCHEDULED
+            else:
+                state = TIMER_STATE_SUCCESS
+            handled.append(timer)
+        except Exception as exc:
+            state = TIMER_STATE_FAILURE
+            logger.error(MSG_ERROR_FIRING_TIMER, timer=timer, exc=exc)
+        observe_task(handler.name, state, started)
+    timer_service.ack(handled)
+    return len(timers)
+
+def _reply_to_burst(conversation_id, message_ids):
+    """
+    Replies to one burst closed by the live session window with its own
+    OUTBOUND message. Unlike _process_claimed_conversations, which answers
+    all of a conversation's single messages together and all of its grouped
+    ones together, every burst gets a reply, so two bursts of a conversation
+    get two replies where the batch grouping would give them one.
+    """
+    if not message_ids:
+        return None
+    received_at = queries.mark_inbound_messages_processed(conversation_id, message_ids)
+    if not received_at:
+        return None
+
+    content = _build_message_summary([message_id for message_id in message_ids if message_id in received_at])
+    outbound_message = _build_outbound_message(conversation_id, content)
+    Message.objects.bulk_create([outbound_message])
+    queries.apply_messages_to_snapshots([outbound_message.id])
+    observe_reply_lag(outbound_message.timestamp, list(received_at.values()))
+    transaction.on_commit(lambda: notify_conversations_changed([conversation_id]))
+    logger.debug(content)
+    return content
+
+def _process_claimed_conversations(conversation_ids):
+    """
+    The original batch grouping, for INBOUND messages the session window
+    didn't hand over: per conversation, one reply for all messages that
+    arrived alone and one for all messages that arrived in bursts.
+    """
     outbound_result = []
-    for conversation_id in Conversation.objects.values_list("id", flat=True):
-        messages_to_group, single_messages = _get_single_and_grouped_messages(conversation_id)
+    outbound_messages = []
+    replied_messages_ids = []
+    processed_messages_ids = []
+    if not conversation_ids:
+        return outbound_result
 
-        for messages in [single_messages, messages_to_group]:
-            if messages:
-                messages_ids = [str(message.id) for message in messages]
+    for conversation_id, (messages_to_group, single_messages) in _get_single_and_grouped_message_ids(conversation_ids).items():
+        for messages_ids in [single_messages, messages_to_group]:
+            if messages_ids:
+                messages_ids = [str(message_id) for message_id in messages_ids]
                 content = _build_message_summary(messages_ids)
-                _create_new_outbound_message(conversation_id, content)
+                outbound_messages.append(_build_outbound_message(conversation_id, content))
+                replied_messages_ids.append(messages_ids)
 
-                logger.info(content)
+                logger.debug(content)
                 outbound_result.append(content)
+                processed_messages_ids.extend(messages_ids)
 
-                Message.objects.filter(id__in=messages_ids).update(processed=True)
+    if outbound_messages:
+        Message.objects.bulk_create(outbound_messages)
+        queries.apply_messages_to_snapshots([message.id for message in outbound_messages])
+        received_at = queries.mark_messages_processed(processed_messages_ids)
+        for outbound_message, messages_ids in zip(outbound_messages, replied_messages_ids):
+            observe_reply_lag(
+                outbound_message.timestamp,
+                [received_at[message_id] for message_id in messages_ids if message_id in received_at],
+            )
+        replied_conversation_ids = {message.conversation_id_id for message in outbound_messages}
+        transaction.on_commit(lambda: notify_conversations_changed(replied_conversation_ids))
     return outbound_result
-    
\ No newline at end of file
@@ -1,7 +1,7 @@
 import os
 import pytest
 import redis
-import psycopg2
+import psycopg
 import socket
 
 TIMEOUT = 30.0
@@ -35,7 +35,7 @@ def wait_for_redis_service(django_settings, docker_services):
 def wait_for_postgres_service(django_settings, docker_services):
     def is_responsive():
         try:
-            conn = psycopg2.connect(
+            conn = psycopg.connect(
                 dbname=django_settings.DATABASES['default']['NAME'],
                 user=django_settings.DATABASES['default']['USER'],
                 password=django_settings.DATABASES['default']['PASSWORD'],
@@ -44,7 +44,7 @@ def wait_for_postgres_service(django_settings, docker_services):
             )
             conn.close()
             return True
-        except psycopg2.OperationalError:
+        except psycopg.OperationalError:
             return False
 
     docker_services.wait_until_responsive(
@@ -1,15 +1,28 @@
 from datetime import datetime, timedelta, timezone
+import asyncio
+import json
 
 from unittest.mock import patch
-from uuid import uuid4
+from uuid import UUID, uuid4
 import random
 
+import redis
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError
+from django.test import AsyncRequestFactory, TestCase, override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from realmate_challenge_app.models import Conversation, Message
+from realmate_challenge_app import queries
+from realmate_challenge_app.conversation_cache import conversation_cache
+from realmate_challenge_app.events import notify_conversations_changed
+from realmate_challenge_app.idempotency import seen_events
+from realmate_challenge_app.models import Conversation, ConversationSnapshot, Message
+from realmate_challenge_app.pending import RedisPendingBuffer
 from realmate_challenge_app.tasks import process_inbound_messages, check_and_assign_conversation
 from realmate_challenge_app.views import (
+    AsyncConversationDetailView,
+    AsyncWebhookView,
     INVALID_PAYLOAD_MESSAGE,
     INTERNAL_SERVER_ERROR_MESSAGE,
     ERROR_CONVERSATION_ALREADY_EXISTS,
@@ -17,13 +30,26 @@ from realmate_challenge_app.views import (
     ERROR_CONVERSATION_CLOSED,
     ERROR_CONVERSATION_ALREADY_CLOSED,
     ERROR_CONVERSATION_NOT_FOUND,
+    ERROR_EVENTS_REQUIRE_ASGI,
     MESSAGE_CONVERSATION_CREATED,
     MESSAGE_PROCESSED,
     MESSAGE_CONVERSATION_CLOSED,
+    MESSAGE_ALREADY_RECEIVED,
+    ERROR_INVALID_PAGINATION,
 )
 
 UNEXPECTED_ERROR_EXCEPTION_MESSAGE = "Unexpected error message."
 
+
+def create_message(**fields):
+    """Message.objects.create numbered in its conversation, as the app's writes do."""
+    message = Message.objects.create(**fields)
+    queries.apply_messages_to_snapshots([message.id])
+    return message
+
+
+acreate_message = sync_to_async(create_message)
+
 class BaseWebhookTest(APITestCase):
     webhook_url = "/webhook/"
 
@@ -54,6 +80,16 @@ class TestWebhookPostNewConversation(BaseWebhookTest):
         self.assertEqual(response.json(), {"message": MESSAGE_CONVERSATION_CREATED.format(conversation_identifier)})
         self.assertTrue(Conversation.objects.filter(id=conversation_identifier).exists())
 
+    def test_new_conversation_runs_insert_and_orphan_check_only(self):
+        new_conversation_payload_data = self.get_new_conversation_payload()
+
+        # The insert, and the lookup of early messages stored as orphan rows
+        # while the Redis buffer was unavailable.
+        with self.assertNumQueries(2):
+            response = self.client.post(self.webhook_url, data=new_conversation_payload_data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
     def test_new_conversation_already_exists(self):
         new_conversation_payload_data = self.get_new_conversation_payload()
         conversation_identifier = new_conversation_payload_data['data']['id']
@@ -124,6 +160,7 @@ class TestWebhookPostNewMessage(BaseWebhookTest):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data['error'], ERROR_CONVERSATION_CLOSED.format(closed_conversation_object.id))
 
+    @override_settings(PENDING_MESSAGES_BACKEND="database")
     def test_new_message_conversation_not_found(self):
         new_message_conversation_not_found_payload_data = self.get_new_message_conversation_not_found_payload()
         message_identifier = new_message_conversation_not_found_payload_data["data"]["id"]
@@ -139,7 +176,172 @@ class TestWebhookPostNewMessage(BaseWebhookTest):
         check_and_assign_conversation(message_identifier)
         self.assertFalse(Message.objects.filter(id=message_identifier, conversation_id=None, expected_conversation_id=conversation_identifier).exists())
 
-    def test_many_messages_process(self):
+    def test_new_message_runs_single_statement(self):
+        new_message_payload_data = self.get_new_message_payload(conversation_id=str(self.open_conversation_object.id))
+
+        with self.assertNumQueries(1):
+            response = self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    @patch("realmate_challenge_app.views.schedule_conversation_flush")
+    def test_new_message_schedules_conversation_flush(self, mocked_schedule_flush):
+        new_message_payload_data = self.get_new_message_payload(conversation_id=str(self.open_conversation_object.id))
+
+        self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+        self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+
+        mocked_schedule_flush.assert_called_once_with([self.open_conversation_object.id])
+
+    @override_settings(PENDING_MESSAGES_BACKEND="database")
+    @patch("realmate_challenge_app.pending.schedule_orphan_expiry")
+    def test_orphan_message_schedules_expiry(self, mocked_schedule_expiry):
+        new_message_payload_data = self.get_new_message_conversation_not_found_payload()
+
+        self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+
+        mocked_schedule_expiry.assert_called_once_with({UUID(new_message_payload_data["data"]["conversation_id"])})
+
+    def test_new_message_conversation_closed_is_not_stored(self):
+        closed_conversation_object = Conversation.objects.create(id=uuid4(), status=Conversation.Status.CLOSED)
+        new_message_payload_data = self.get_new_message_payload(conversation_id=str(closed_conversation_object.id))
+
+        self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+
+        self.assertFalse(Message.objects.filter(id=new_message_payload_data['data']['id']).exists())
+
+    @override_settings(PENDING_MESSAGES_BACKEND="database")
+    def test_orphan_message_adopted_on_conversation_creation(self):
+        new_message_payload_data = self.get_new_message_conversation_not_found_payload()
+        message_identifier = new_message_payload_data["data"]["id"]
+        conversation_identifier = new_message_payload_data["data"]["conversation_id"]
+        self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+
+        response = self.client.post(
+            self.webhook_url,
+            data=self._get_payload_base("NEW_CONVERSATION", {"id": conversation_identifier}),
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Message.objects.filter(
+            id=message_identifier, conversation_id=conversation_identifier, expected_conversation_id=None
+        ).exists())
+
+    @override_settings(PENDING_MESSAGES_BACKEND="database")
+    def test_orphan_stored_after_its_conversation_is_adopted(self):
+        new_message_payload_data = self.get_new_message_conversation_not_found_payload()
+        conversation_identifier = new_message_payload_data["data"]["conversation_id"]
+        insert_inbound_message = queries.insert_inbound_message
+
+        def insert_then_create_conversation(*args, **kwargs):
+            # NEW_CONVERSATION commits, and adopts nothing, while the orphan is being stored.
+            result = insert_inbound_message(*args, **kwargs)
+            queries.insert_conversation(conversation_identifier)
+            return result
+
+        with patch('realmate_challenge_app.views.queries.insert_inbound_message', side_effect=insert_then_create_conversation):
+            response = self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(Message.objects.filter(
+            id=new_message_payload_data["data"]["id"], conversation_id=conversation_identifier
+        ).exists())
+
+    @override_settings(PENDING_MESSAGES_BACKEND="database")
+    def test_expired_orphan_message_is_not_adopted(self):
+        new_message_payload_data = self.get_new_message_conversation_not_found_payload()
+        message_identifier = new_message_payload_data["data"]["id"]
+        conversation_identifier = new_message_payload_data["data"]["conversation_id"]
+        self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+        Message.objects.filter(id=message_identifier).update(created_at=datetime.now(timezone.utc) - timedelta(seconds=7))
+
+        self.client.post(
+            self.webhook_url,
+            data=self._get_payload_base("NEW_CONVERSATION", {"id": conversation_identifier}),
+            format='json',
+        )
+
+        self.assertTrue(Message.objects.filter(id=message_identifier, conversation_id=None).exists())
+
+    def test_early_message_is_buffered_and_adopted(self):
+        new_message_payload_data = self.get_new_message_conversation_not_found_payload()
+        message_identifier = new_message_payload_data["data"]["id"]
+        conversation_identifier = new_message_payload_data["data"]["conversation_id"]
+
+        response = self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(Message.objects.filter(id=message_identifier).exists())
+
+        response = self.client.post(
+            self.webhook_url,
+            data=self._get_payload_base("NEW_CONVERSATION", {"id": conversation_identifier}),
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Message.objects.filter(id=message_identifier, conversation_id=conversation_identifier).exists())
+
+    def test_early_message_is_kept_as_orphan_row_while_redis_is_down(self):
+        new_message_payload_data = self.get_new_message_conversation_not_found_payload()
+        message_identifier = new_message_payload_data["data"]["id"]
+        conversation_identifier = new_message_payload_data["data"]["conversation_id"]
+
+        with patch('realmate_challenge_app.pending.get_redis_client') as mock_redis_client:
+            mock_redis_client.return_value.pipeline.return_value.execute.side_effect = redis.ConnectionError("down")
+            response = self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(Message.objects.filter(id=message_identifier, conversation_id=None).exists())
+
+        response = self.client.post(
+            self.webhook_url,
+            data=self._get_payload_base("NEW_CONVERSATION", {"id": conversation_identifier}),
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Message.objects.filter(id=message_identifier, conversation_id=conversation_identifier).exists())
+
+    @override_settings(PENDING_MESSAGES_TTL_SECONDS=0)
+    def test_expired_buffered_message_is_not_adopted(self):
+        new_message_payload_data = self.get_new_message_conversation_not_found_payload()
+        conversation_identifier = new_message_payload_data["data"]["conversation_id"]
+
+        self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+        self.client.post(
+            self.webhook_url,
+            data=self._get_payload_base("NEW_CONVERSATION", {"id": conversation_identifier}),
+            format='json',
+        )
+
+        self.assertFalse(Message.objects.filter(id=new_message_payload_data["data"]["id"]).exists())
+
+    def test_retried_message_replays_original_outcome(self):
+        new_message_payload_data = self.get_new_message_payload(conversation_id=str(self.open_conversation_object.id))
+
+        first_response = self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+        with self.assertNumQueries(0):
+            retried_response = self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+
+        self.assertEqual(retried_response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(retried_response.json(), first_response.json())
+        self.assertEqual(Message.objects.filter(id=new_message_payload_data['data']['id']).count(), 1)
+
+    def test_retried_message_unknown_to_index_is_accepted(self):
+        new_message_payload_data = self.get_new_message_payload(conversation_id=str(self.open_conversation_object.id))
+        message_identifier = new_message_payload_data['data']['id']
+
+        self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+        with patch("realmate_challenge_app.views.seen_events.get", return_value=None):
+            response = self.client.post(self.webhook_url, data=new_message_payload_data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.json(), {"message": MESSAGE_ALREADY_RECEIVED.format(message_identifier)})
+
+    @patch("realmate_challenge_app.views.reply_to_burst")
+    def test_many_messages_process(self, mocked_reply_to_burst):
         conversation_one_id = str(self.open_conversation_object.id)
         conversation_two_object = Conversation.objects.create(id=uuid4(), status=Conversation.Status.OPEN)
         conversation_two_id = str(conversation_two_object.id)
@@ -185,6 +387,7 @@ class TestWebhookPostNewMessage(BaseWebhookTest):
         sent_message_identifiers.append(payload['data']['id'])
         
         self.assertEqual(len(sent_message_identifiers), 7)
+        mocked_reply_to_burst.delay.assert_called_once_with(conversation_one_id, sent_message_identifiers[:3])
         for message_identifier in sent_message_identifiers:
             self.assertTrue(Message.objects.filter(id=message_identifier).exists())
         
@@ -213,6 +416,15 @@ class TestWebhookPostCloseConversation(BaseWebhookTest):
         conversation = Conversation.objects.get(id=conversation_identifier)
         self.assertEqual(conversation.status, Conversation.Status.CLOSED)
 
+    def test_close_conversation_runs_single_statement(self):
+        conversation_to_close = Conversation.objects.create(id=uuid4(), status=Conversation.Status.OPEN)
+        close_conversation_payload_data = self.get_close_conversation_payload(conversation_id=str(conversation_to_close.id))
+
+        with self.assertNumQueries(1):
+            response = self.client.post(self.webhook_url, data=close_conversation_payload_data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_close_conversation_already_closed(self):
         closed_conversation = Conversation.objects.create(id=uuid4(), status=Conversation.Status.CLOSED)
         close_conversation_payload_data = self.get_close_conversation_payload(conversation_id=str(closed_conversation.id))
@@ -262,12 +474,58 @@ class TestWebhookPostInvalidPayloads(BaseWebhookTest):
         self.assertEqual(response.data['error'], INVALID_PAYLOAD_MESSAGE)
         self.assertIn('details', response.data)
 
+class TestWebhookValidationBackends(BaseWebhookTest):
+    def get_invalid_payloads(self):
+        message_data = {"id": str(uuid4()), "content": "Oi", "conversation_id": str(uuid4())}
+        return [
+            self._get_payload_base("NEW_MESSAGE", {**message_data, "content": ""}),
+            self._get_payload_base("NEW_MESSAGE", {**message_data, "content": "   "}),
+            self._get_payload_base("NEW_MESSAGE", {**message_data, "content": "a" * 501}),
+            self._get_payload_base("NEW_MESSAGE", {**message_data, "content": "a\x00b"}),
+            self._get_payload_base("NEW_MESSAGE", {**message_data, "content": None}),
+            self._get_payload_base("NEW_MESSAGE", {**message_data, "id": "not-a-uuid", "conversation_id": 1.5}),
+            self._get_payload_base("NEW_MESSAGE", {"id": str(uuid4())}),
+            {**self._get_payload_base("NEW_CONVERSATION", {"id": str(uuid4())}), "timestamp": "yesterday"},
+            {"type": "CLOSE_CONVERSATION", "data": "not-a-dict"},
+            {"type": "CLOSE_CONVERSATION", "timestamp": None, "data": None},
+        ]
+
+    def _post_with_backend(self, backend, url, payload):
+        with override_settings(WEBHOOK_VALIDATION_BACKEND=backend):
+            return self.client.post(url, data=payload, format='json')
+
+    def test_invalid_payloads_return_the_same_400_with_both_backends(self):
+        for payload in self.get_invalid_payloads():
+            with self.subTest(payload=payload):
+                drf_response = self._post_with_backend("drf", self.webhook_url, payload)
+                msgspec_response = self._post_with_backend("msgspec", self.webhook_url, payload)
+
+                self.assertEqual(msgspec_response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(msgspec_response.json(), drf_response.json())
+
+    def test_invalid_batch_events_return_the_same_results_with_both_backends(self):
+        payloads = self.get_invalid_payloads()
+
+        drf_response = self._post_with_backend("drf", "/webhook/batch/", payloads)
+        msgspec_response = self._post_with_backend("msgspec", "/webhook/batch/", payloads)
+
+        self.assertEqual(msgspec_response.json(), drf_response.json())
+
+    def test_valid_payload_skips_serializers(self):
+        payload = self._get_payload_base("NEW_CONVERSATION", {"id": str(uuid4())})
+
+        with patch("realmate_challenge_app.views.NewConversationPayloadSerializer") as mocked_serializer:
+            response = self._post_with_backend("msgspec", self.webhook_url, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        mocked_serializer.assert_not_called()
+
 class TestWebhookPostErrorHandling(BaseWebhookTest):
     def test_unhandled_exception_returns_500(self):
         new_conversation_payload_data = TestWebhookPostNewConversation().get_new_conversation_payload()
 
         with patch(
-            "realmate_challenge_app.models.Conversation.objects.get_or_create"
+            "realmate_challenge_app.views.queries.insert_conversation"
         ) as mocked_handler:
             mocked_handler.side_effect = Exception(UNEXPECTED_ERROR_EXCEPTION_MESSAGE)
 
@@ -276,12 +534,251 @@ class TestWebhookPostErrorHandling(BaseWebhookTest):
         self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
         self.assertEqual(response.data["error"], INTERNAL_SERVER_ERROR_MESSAGE.format(UNEXPECTED_ERROR_EXCEPTION_MESSAGE))
 
+class TestWebhookPostBatch(BaseWebhookTest):
+    batch_url = "/webhook/batch/"
+
+    def _new_message_data(self, conversation_id, message_id=None):
+        return {
+            "id": message_id or str(uuid4()),
+            "content": "Olá",
+            "conversation_id": conversation_id,
+        }
+
+    def test_mixed_batch_returns_status_per_event(self):
+        conversation_id = str(uuid4())
+        closed_conversation = Conversation.objects.create(id=uuid4(), status=Conversation.Status.CLOSED)
+        message_data = self._new_message_data(conversation_id)
+        events = [
+            self._get_payload_base("NEW_CONVERSATION", {"id": conversation_id}),
+            self._get_payload_base("NEW_MESSAGE", message_data),
+            self._get_payload_base("NEW_MESSAGE", self._new_message_data(str(closed_conversation.id))),
+            self._get_payload_base("NEW_CONVERSATION", {"id": conversation_id}),
+            self._get_payload_base("INVALID_TYPE", {"id": conversation_id}),
+            self._get_payload_base("CLOSE_CONVERSATION", {"id": conversation_id}),
+            self._get_payload_base("CLOSE_CONVERSATION", {"id": conversation_id}),
+        ]
+
+        response = self.client.post(self.batch_url, data=events, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertEqual(
+            [result["status"] for result in results],
+            [201, 202, 400, 400, 400, 200, 400],
+        )
+        self.assertEqual(results[2]["error"], ERROR_CONVERSATION_CLOSED.format(closed_conversation.id))
+        self.assertEqual(results[3]["error"], ERROR_CONVERSATION_ALREADY_EXISTS.format(conversation_id))
+        self.assertEqual(results[4]["error"], INVALID_PAYLOAD_MESSAGE)
+        self.assertEqual(results[6]["error"], ERROR_CONVERSATION_ALREADY_CLOSED.format(conversation_id))
+        self.assertEqual(Conversation.objects.get(id=conversation_id).status, Conversation.Status.CLOSED)
+        self.assertTrue(Message.objects.filter(id=message_data["id"], conversation_id=conversation_id).exists())
+        self.assertEqual(Message.objects.count(), 1)
+
+    def test_ndjson_batch_adopts_early_message(self):
+        conversation_id = str(uuid4())
+        message_data = self._new_message_data(conversation_id)
+        body = "\n".join(json.dumps(event) for event in [
+            self._get_payload_base("NEW_MESSAGE", message_data),
+            self._get_payload_base("NEW_CONVERSATION", {"id": conversation_id}),
+        ])
+
+        with patch("realmate_challenge_app.pending.RedisPendingBuffer.buffer") as mocked_buffer:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    self.batch_url, data=body, content_type="application/x-ndjson"
+                )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result["status"] for result in response.json()["results"]], [202, 201])
+        self.assertTrue(Message.objects.filter(
+            id=message_data["id"], conversation_id=conversation_id, expected_conversation_id=None
+        ).exists())
+        mocked_buffer.assert_not_called()
+
+    def test_early_message_is_buffered_and_adopted(self):
+        conversation_id = str(uuid4())
+        message_data = self._new_message_data(conversation_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                self.batch_url, data=[self._get_payload_base("NEW_MESSAGE", message_data)], format='json'
+            )
+
+        self.assertFalse(Message.objects.filter(id=message_data["id"]).exists())
+
+        self.client.post(
+            self.batch_url, data=[self._get_payload_base("NEW_CONVERSATION", {"id": conversation_id})], format='json'
+        )
+
+        self.assertTrue(Message.objects.filter(id=message_data["id"], conversation_id=conversation_id).exists())
+
+    def test_early_message_is_adopted_when_its_conversation_commits_before_the_buffer_write(self):
+        conversation_id = str(uuid4())
+        message_data = self._new_message_data(conversation_id)
+        original_buffer = RedisPendingBuffer.buffer
+
+        def create_conversation_then_buffer(pending_buffer, messages):
+            # The conversation, and its adoption of an empty buffer, win the race.
+            queries.insert_conversation(conversation_id)
+            original_buffer(pending_buffer, messages)
+
+        with patch.object(RedisPendingBuffer, "buffer", autospec=True, side_effect=create_conversation_then_buffer):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    self.batch_url, data=[self._get_payload_base("NEW_MESSAGE", message_data)], format='json'
+                )
+
+        self.assertTrue(Message.objects.filter(id=message_data["id"], conversation_id=conversation_id).exists())
+
+    def test_failing_post_commit_step_does_not_skip_the_others(self):
+        conversation_id = str(uuid4())
+        message_data = self._new_message_data(conversation_id)
+
+        with (
+            patch("realmate_challenge_app.views.get_session_windows", side_effect=redis.ConnectionError("down")),
+            patch("realmate_challenge_app.views.schedule_conversation_flush") as mocked_schedule_flush,
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.batch_url, data=[
+                    self._get_payload_base("NEW_CONVERSATION", {"id": conversation_id}),
+                    self._get_payload_base("NEW_MESSAGE", message_data),
+                ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mocked_schedule_flush.assert_called_once_with({UUID(conversation_id)})
+        self.assertIsNotNone(seen_events.get(message_data["id"]))
+
+    def test_buffered_message_survives_a_batch_that_rolls_back(self):
+        conversation_id = str(uuid4())
+        message_data = self._new_message_data(conversation_id)
+        self.client.post(self.webhook_url, data=self._get_payload_base("NEW_MESSAGE", message_data), format='json')
+        events = [
+            self._get_payload_base("NEW_CONVERSATION", {"id": conversation_id}),
+            self._get_payload_base("CLOSE_CONVERSATION", {"id": conversation_id}),
+        ]
+
+        # The close runs after the adoption, inside the same transaction.
+        with patch.object(Conversation.objects, "filter", side_effect=DatabaseError("connection lost")):
+            response = self.client.post(self.batch_url, data=events, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertFalse(Message.objects.filter(id=message_data["id"]).exists())
+
+        self.client.post(self.batch_url, data=events[:1], format='json')
+
+        self.assertTrue(Message.objects.filter(id=message_data["id"], conversation_id=conversation_id).exists())
+
+    def test_batch_schedules_flush_for_conversations_with_new_messages(self):
+        conversation_id = str(uuid4())
+        early_conversation_id = str(uuid4())
+
+        with patch("realmate_challenge_app.views.schedule_conversation_flush") as mocked_schedule_flush:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(self.batch_url, data=[
+                    self._get_payload_base("NEW_CONVERSATION", {"id": conversation_id}),
+                    self._get_payload_base("NEW_MESSAGE", self._new_message_data(conversation_id)),
+                    self._get_payload_base("NEW_MESSAGE", self._new_message_data(early_conversation_id)),
+                ], format='json')
+
+        mocked_schedule_flush.assert_called_once_with({UUID(conversation_id)})
+
+    @override_settings(PENDING_MESSAGES_BACKEND="database")
+    def test_orphan_message_is_stored_without_conversation(self):
+        conversation_id = str(uuid4())
+        message_data = self._new_message_data(conversation_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.batch_url,
+                data=[self._get_payload_base("NEW_MESSAGE", message_data)],
+                format='json',
+            )
+
+        self.assertEqual(response.json()["results"][0]["status"], status.HTTP_202_ACCEPTED)
+        self.assertTrue(Message.objects.filter(
+            id=message_data["id"], conversation_id=None, expected_conversation_id=conversation_id
+        ).exists())
+
+    def test_duplicated_message_replays_original_outcome(self):
+        conversation = Conversation.objects.create(id=uuid4(), status=Conversation.Status.OPEN)
+        message_data = self._new_message_data(str(conversation.id))
+        event = self._get_payload_base("NEW_MESSAGE", message_data)
+
+        response = self.client.post(self.batch_url, data=[event, event], format='json')
+
+        results = response.json()["results"]
+        self.assertEqual([result["status"] for result in results], [202, 202])
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(Message.objects.filter(id=message_data["id"]).count(), 1)
+
+    def test_message_already_stored_is_accepted(self):
+        conversation = Conversation.objects.create(id=uuid4(), status=Conversation.Status.OPEN)
+        message = Message.objects.create(
+            id=uuid4(),
+            conversation_id=conversation,
+            content="Olá",
+            timestamp=datetime.now(timezone.utc),
+        )
+        event = self._get_payload_base("NEW_MESSAGE", self._new_message_data(str(conversation.id), str(message.id)))
+
+        response = self.client.post(self.batch_url, data=[event], format='json')
+
+        result = response.json()["results"][0]
+        self.assertEqual(result["status"], status.HTTP_202_ACCEPTED)
+        self.assertEqual(result["message"], MESSAGE_ALREADY_RECEIVED.format(message.id))
+
+    def test_rows_inserted_concurrently_are_reported_per_event(self):
+        conversation_id = str(uuid4())
+        other_conversation_id = str(uuid4())
+        queries.insert_conversation(uuid4())
+        existing_conversation = Conversation.objects.get()
+        raced_message_data = self._new_message_data(str(existing_conversation.id))
+        message_data = self._new_message_data(str(existing_conversation.id))
+
+        def insert_concurrently(message_ids):
+            # A single webhook storing the same ids after the batch read them.
+            Conversation.objects.create(id=conversation_id)
+            Message.objects.create(
+                id=raced_message_data["id"], conversation_id=existing_conversation,
+                content="Olá", timestamp=datetime.now(timezone.utc),
+            )
+            return {}
+
+        with patch('realmate_challenge_app.views.seen_events.get_many', side_effect=insert_concurrently):
+            response = self.client.post(self.batch_url, data=[
+                self._get_payload_base("NEW_CONVERSATION", {"id": conversation_id}),
+                self._get_payload_base("NEW_CONVERSATION", {"id": other_conversation_id}),
+                self._get_payload_base("NEW_MESSAGE", raced_message_data),
+                self._get_payload_base("NEW_MESSAGE", message_data),
+            ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertEqual([result["status"] for result in results], [400, 201, 202, 202])
+        self.assertEqual(results[0]["error"], ERROR_CONVERSATION_ALREADY_EXISTS.format(conversation_id))
+        self.assertEqual(results[2]["message"], MESSAGE_ALREADY_RECEIVED.format(raced_message_data["id"]))
+        self.assertTrue(Conversation.objects.filter(id=other_conversation_id).exists())
+        self.assertTrue(Message.objects.filter(id=message_data["id"]).exists())
+        self.assertEqual(ConversationSnapshot.objects.get(conversation_id=existing_conversation.id).message_count, 1)
+
+    def test_empty_or_non_list_batch_returns_400(self):
+        for body in ([], {"type": "NEW_CONVERSATION"}):
+            response = self.client.post(self.batch_url, data=body, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data['error'], INVALID_PAYLOAD_MESSAGE)
+
+    def test_invalid_ndjson_returns_400(self):
+        response = self.client.post(
+            self.batch_url, data='{"type": "NEW_CONVERSATION"}\n{not json', content_type="application/x-ndjson"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 class TestConversationDetailView(APITestCase):
     conversation_base_url = "/conversations/"
 
     def setUp(self):
         self.new_conversation_object = Conversation.objects.create(id=uuid4(), status=Conversation.Status.OPEN)
-        self.new_message_object = Message.objects.create(
+        self.new_message_object = create_message(
             id=uuid4(),
             conversation_id=self.new_conversation_object,
             content="Mensagem de teste",
@@ -311,3 +808,469 @@ class TestConversationDetailView(APITestCase):
         conversation_url_non_existent = f"{self.conversation_base_url}{uuid4()}/"
         response = self.client.get(conversation_url_non_existent)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unknown_conversation_leaves_no_cache_version(self):
+        conversation_id = uuid4()
+
+        self.client.get(f"{self.conversation_base_url}{conversation_id}/")
+
+        self.assertIsNone(conversation_cache.get_version(conversation_id, create=False))
+
+    def _create_messages(self, count):
+        base_timestamp = datetime.now(timezone.utc)
+        return [
+            create_message(
+                conversation_id=self.new_conversation_object,
+                content=f"Mensagem {index}",
+                timestamp=base_timestamp + timedelta(seconds=index // 2),
+            )
+            for index in range(count)
+        ]
+
+    def test_messages_are_ordered_and_limited_by_default(self):
+        self._create_messages(4)
+        messages = Message.objects.filter(conversation_id=self.new_conversation_object)
+        expected_ids = [str(message.id) for message in sorted(messages, key=lambda message: (message.timestamp, str(message.id)))]
+
+        with override_settings(CONVERSATION_MESSAGES_DEFAULT_LIMIT=3):
+            response = self.client.get(self.conversation_url_specific)
+
+        returned_data = response.json()
+        self.assertEqual([message['id'] for message in returned_data['messages']], expected_ids[:3])
+        self.assertIsNotNone(returned_data['next'])
+        self.assertIsNone(returned_data['previous'])
+
+    def test_after_and_before_cursors_walk_all_pages(self):
+        self._create_messages(6)
+        messages = Message.objects.filter(conversation_id=self.new_conversation_object)
+        expected_ids = [str(message.id) for message in sorted(messages, key=lambda message: (message.timestamp, str(message.id)))]
+
+        pages = []
+        url = f"{self.conversation_url_specific}?limit=3"
+        while url:
+            returned_data = self.client.get(url).json()
+            pages.append([message['id'] for message in returned_data['messages']])
+            url = returned_data['next']
+
+        self.assertEqual(pages, [expected_ids[0:3], expected_ids[3:6], expected_ids[6:7]])
+
+        returned_data = self.client.get(returned_data['previous']).json()
+        self.assertEqual([message['id'] for message in returned_data['messages']], expected_ids[3:6])
+        returned_data = self.client.get(returned_data['previous']).json()
+        self.assertEqual([message['id'] for message in returned_data['messages']], expected_ids[0:3])
+        self.assertIsNone(returned_data['previous'])
+
+    def test_page_query_count_does_not_grow_with_conversation(self):
+        self._create_messages(50)
+
+        # The page, its conversation, and the existence check that creates
+        # the conversation's cache version.
+        with self.assertNumQueries(3):
+            response = self.client.get(f"{self.conversation_url_specific}?limit=10")
+
+        self.assertEqual(len(response.json()['messages']), 10)
+
+    def test_invalid_pagination_parameters_return_400(self):
+        for query in ["limit=0", "limit=abc", "limit=100000", "after=not-a-cursor", "after=a&before=b"]:
+            response = self.client.get(f"{self.conversation_url_specific}?{query}")
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+            self.assertEqual(response.json()['error'], ERROR_INVALID_PAGINATION)
+
+    def test_repeated_get_is_served_from_cache(self):
+        first_response = self.client.get(self.conversation_url_specific)
+
+        with self.assertNumQueries(0):
+            second_response = self.client.get(self.conversation_url_specific)
+
+        self.assertEqual(second_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(second_response.content, first_response.content)
+        self.assertEqual(second_response["ETag"], first_response["ETag"])
+        self.assertEqual(second_response["Cache-Control"], "no-cache")
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.conversation_url_specific)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.conversation_url_specific, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_new_message_invalidates_cached_detail(self):
+        etag = self.client.get(self.conversation_url_specific)["ETag"]
+        message_id = str(uuid4())
+
+        self.client.post("/webhook/", data={
+            "type": "NEW_MESSAGE",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "data": {"id": message_id, "conversation_id": str(self.new_conversation_object.id), "content": "Oi"},
+        }, format='json')
+        response = self.client.get(self.conversation_url_specific, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn(message_id, [message['id'] for message in response.json()['messages']])
+
+    def test_closed_conversation_without_pending_messages_is_immutable(self):
+        Message.objects.filter(id=self.new_message_object.id).update(processed=True)
+        self.client.post("/webhook/", data={
+            "type": "CLOSE_CONVERSATION",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "data": {"id": str(self.new_conversation_object.id)},
+        }, format='json')
+
+        response = self.client.get(self.conversation_url_specific)
+
+        self.assertEqual(response.json()['status'], Conversation.Status.CLOSED)
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_closed_conversation_with_pending_messages_is_revalidated(self):
+        Conversation.objects.filter(id=self.new_conversation_object.id).update(status=Conversation.Status.CLOSED)
+        self.conversation_url_specific = f"{self.conversation_url_specific}?limit=5"
+
+        response = self.client.get(self.conversation_url_specific)
+
+        self.assertEqual(response["Cache-Control"], "no-cache")
+
+    def test_since_returns_only_messages_stored_after_cursor(self):
+        returned_data = self.client.get(f"{self.conversation_url_specific}?since=").json()
+
+        self.assertEqual([message['id'] for message in returned_data['messages']], [str(self.new_message_object.id)])
+        self.assertFalse(returned_data['has_more'])
+
+        newer_message = create_message(
+            conversation_id=self.new_conversation_object,
+            content="Resposta",
+            type=Message.MessageType.OUTBOUND,
+            timestamp=datetime.now(timezone.utc) - timedelta(days=1),
+        )
+        delta_data = self.client.get(f"{self.conversation_url_specific}?since={returned_data['cursor']}").json()
+
+        self.assertEqual([message['id'] for message in delta_data['messages']], [str(newer_message.id)])
+        self.assertEqual(delta_data['status'], Conversation.Status.OPEN)
+
+        empty_data = self.client.get(f"{self.conversation_url_specific}?since={delta_data['cursor']}").json()
+        self.assertEqual(empty_data['messages'], [])
+        self.assertEqual(empty_data['cursor'], delta_data['cursor'])
+
+    def test_since_returns_messages_committed_after_a_newer_one(self):
+        cursor = self.client.get(f"{self.conversation_url_specific}?since=").json()['cursor']
+        # Stored by a transaction that began before the cursor was handed out.
+        late_message = create_message(
+            conversation_id=self.new_conversation_object, content="Atrasada", timestamp=datetime.now(timezone.utc)
+        )
+        Message.objects.filter(id=late_message.id).update(created_at=datetime.now(timezone.utc) - timedelta(minutes=5))
+
+        returned_data = self.client.get(f"{self.conversation_url_specific}?since={cursor}").json()
+
+        self.assertEqual([message['id'] for message in returned_data['messages']], [str(late_message.id)])
+
+    def test_since_respects_limit(self):
+        self._create_messages(3)
+
+        returned_data = self.client.get(f"{self.conversation_url_specific}?since=&limit=2").json()
+
+        self.assertEqual(len(returned_data['messages']), 2)
+        self.assertTrue(returned_data['has_more'])
+
+    @override_settings(CONVERSATION_LONG_POLL_INTERVAL_MS=10)
+    def test_long_poll_returns_once_a_message_arrives(self):
+        cursor = self.client.get(f"{self.conversation_url_specific}?since=").json()['cursor']
+        new_message_ids = []
+
+        def add_message_while_waiting(conversation_id, version, deadline):
+            message = create_message(
+                conversation_id=self.new_conversation_object, content="Oi", timestamp=datetime.now(timezone.utc)
+            )
+            new_message_ids.append(str(message.id))
+            return True
+
+        with patch("realmate_challenge_app.views.ConversationDetailView._wait_for_change", side_effect=add_message_while_waiting):
+            returned_data = self.client.get(f"{self.conversation_url_specific}?since={cursor}&wait=5").json()
+
+        self.assertEqual([message['id'] for message in returned_data['messages']], new_message_ids)
+
+    @override_settings(CONVERSATION_LONG_POLL_INTERVAL_MS=10)
+    def test_long_poll_times_out_with_no_messages(self):
+        cursor = self.client.get(f"{self.conversation_url_specific}?since=").json()['cursor']
+
+        returned_data = self.client.get(f"{self.conversation_url_specific}?since={cursor}&wait=0.05").json()
+
+        self.assertEqual(returned_data['messages'], [])
+        self.assertEqual(returned_data['cursor'], cursor)
+
+    def test_invalid_delta_parameters_return_400(self):
+        for query in ["since=bad", "since=&wait=-1", "since=&wait=abc", "since=&wait=3600", "since=&after=x"]:
+            response = self.client.get(f"{self.conversation_url_specific}?{query}")
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+    def _create_conversation_through_webhook(self, message_count):
+        conversation_id = str(uuid4())
+        self.client.post("/webhook/", data={
+            "type": "NEW_CONVERSATION",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "data": {"id": conversation_id},
+        }, format='json')
+        for index in range(message_count):
+            self.client.post("/webhook/", data={
+                "type": "NEW_MESSAGE",
+                "timestamp": (datetime.now(timezone.utc) + timedelta(seconds=index)).isoformat(),
+                "data": {"id": str(uuid4()), "conversation_id": conversation_id, "content": f"Mensagem {index}"},
+            }, format='json')
+        return conversation_id
+
+    def test_conversation_detail_is_read_from_snapshot(self):
+        conversation_id = self._create_conversation_through_webhook(3)
+        conversation_url = f"{self.conversation_base_url}{conversation_id}/"
+
+        with self.assertNumQueries(1):
+            snapshot_response = self.client.get(conversation_url)
+
+        ConversationSnapshot.objects.filter(conversation_id=conversation_id).delete()
+        conversation_cache.invalidate([conversation_id])
+        with self.assertNumQueries(2):
+            fallback_response = self.client.get(conversation_url)
+
+        self.assertEqual(len(snapshot_response.json()['messages']), 3)
+        self.assertEqual(snapshot_response.content, fallback_response.content)
+
+    @override_settings(CONVERSATION_MESSAGES_DEFAULT_LIMIT=2)
+    def test_conversation_larger_than_page_is_paginated(self):
+        conversation_id = self._create_conversation_through_webhook(3)
+
+        with self.assertNumQueries(2):
+            returned_data = self.client.get(f"{self.conversation_base_url}{conversation_id}/").json()
+
+        self.assertEqual(len(returned_data['messages']), 2)
+        self.assertIsNotNone(returned_data['next'])
+
+
+class TestAsyncViews(TestCase):
+    """The async views answer like the sync ones routed by default."""
+
+    def setUp(self):
+        self.request_factory = AsyncRequestFactory()
+        self.conversation = Conversation.objects.create(id=uuid4(), status=Conversation.Status.OPEN)
+        self.messages = [
+            create_message(
+                conversation_id=self.conversation,
+                content=f"Mensagem {index}",
+                timestamp=datetime.now(timezone.utc) + timedelta(seconds=index),
+            )
+            for index in range(3)
+        ]
+        self.conversation_url = f"/conversations/{self.conversation.id}/"
+
+    async def _post_async(self, payload, content_type="application/json"):
+        body = payload if isinstance(payload, str) else json.dumps(payload)
+        request = self.request_factory.post("/webhook/", data=body, content_type=content_type)
+        return await AsyncWebhookView.as_view()(request)
+
+    async def _get_async(self, url, conversation_id, **headers):
+        request = self.request_factory.get(url, headers=headers)
+        return await AsyncConversationDetailView.as_view()(request, id=conversation_id)
+
+    async def test_webhook_events_are_processed(self):
+        conversation_id = str(uuid4())
+        created = await self._post_async({
+            "type": "NEW_CONVERSATION", "timestamp": "2025-01-01T12:00:00Z", "data": {"id": conversation_id},
+        })
+        message_id = str(uuid4())
+        accepted = await self._post_async({
+            "type": "NEW_MESSAGE",
+            "timestamp": "2025-01-01T12:00:01Z",
+            "data": {"id": message_id, "conversation_id": conversation_id, "content": "Olá"},
+        })
+
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(json.loads(created.content), {"message": MESSAGE_CONVERSATION_CREATED.format(conversation_id)})
+        self.assertEqual(accepted.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(await Message.objects.filter(id=message_id, conversation_id=conversation_id).aexists())
+
+    async def test_invalid_webhook_payloads_match_sync_view(self):
+        for payload, content_type in [
+            ({"type": "NEW_CONVERSATION", "timestamp": "2025-01-01T12:00:00Z", "data": {"id": "bad"}}, "application/json"),
+            ({"type": "UNKNOWN"}, "application/json"),
+            ("{not json", "application/json"),
+            ("type=NEW_CONVERSATION", "text/plain"),
+        ]:
+            body = payload if isinstance(payload, str) else json.dumps(payload)
+            expected = await self.async_client.post("/webhook/", data=body, content_type=content_type)
+            response = await self._post_async(payload, content_type)
+
+            self.assertEqual(response.status_code, expected.status_code, payload)
+            self.assertEqual(json.loads(response.content), expected.json(), payload)
+
+    @patch("realmate_challenge_app.views.queries.insert_conversation", side_effect=Exception(UNEXPECTED_ERROR_EXCEPTION_MESSAGE))
+    async def test_webhook_unhandled_exception_returns_500(self, mocked_insert_conversation):
+        response = await self._post_async({
+            "type": "NEW_CONVERSATION", "timestamp": "2025-01-01T12:00:00Z", "data": {"id": str(uuid4())},
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(
+            json.loads(response.content), {"error": INTERNAL_SERVER_ERROR_MESSAGE.format(UNEXPECTED_ERROR_EXCEPTION_MESSAGE)}
+        )
+
+    async def test_conversation_detail_matches_sync_view(self):
+        for query in ["", "?limit=2", "?limit=abc", "?since=", "?since=&limit=1", "?since=bad"]:
+            expected = await self.async_client.get(f"{self.conversation_url}{query}")
+            response = await self._get_async(f"{self.conversation_url}{query}", self.conversation.id)
+
+            self.assertEqual(response.status_code, expected.status_code, query)
+            self.assertEqual(json.loads(response.content), expected.json(), query)
+            self.assertEqual(response.get("ETag"), expected.get("ETag"), query)
+
+    async def test_missing_conversation_matches_sync_view(self):
+        conversation_id = uuid4()
+        for query in ["", "?since="]:
+            expected = await self.async_client.get(f"/conversations/{conversation_id}/{query}")
+            response = await self._get_async(f"/conversations/{conversation_id}/{query}", conversation_id)
+
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(json.loads(response.content), expected.json())
+        self.assertIsNone(conversation_cache.get_version(conversation_id, create=False))
+
+    async def test_if_none_match_returns_304(self):
+        etag = (await self._get_async(self.conversation_url, self.conversation.id))["ETag"]
+
+        response = await self._get_async(self.conversation_url, self.conversation.id, if_none_match=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(CONVERSATION_LONG_POLL_INTERVAL_MS=10)
+    async def test_long_poll_returns_once_a_message_arrives(self):
+        cursor = json.loads((await self._get_async(f"{self.conversation_url}?since=", self.conversation.id)).content)['cursor']
+
+        async def add_message_later():
+            await asyncio.sleep(0.05)
+            message = await acreate_message(
+                conversation_id=self.conversation, content="Oi", timestamp=datetime.now(timezone.utc)
+            )
+            await asyncio.to_thread(notify_conversations_changed, [self.conversation.id])
+            return str(message.id)
+
+        response, message_id = await asyncio.gather(
+            self._get_async(f"{self.conversation_url}?since={cursor}&wait=5", self.conversation.id),
+            add_message_later(),
+        )
+
+        self.assertEqual([message['id'] for message in json.loads(response.content)['messages']], [message_id])
+
+
+@override_settings(CONVERSATION_EVENTS_KEEPALIVE_SECONDS=1)
+class TestConversationEventsView(TestCase):
+    def setUp(self):
+        self.conversation = Conversation.objects.create(id=uuid4(), status=Conversation.Status.OPEN)
+        self.message = create_message(
+            conversation_id=self.conversation, content="Oi", timestamp=datetime.now(timezone.utc)
+        )
+        self.events_url = f"/conversations/{self.conversation.id}/events/"
+
+    async def _open_stream(self, **kwargs):
+        response = await self.async_client.get(self.events_url, **kwargs)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b"retry:"))
+        return stream
+
+    def _parse_event(self, chunk):
+        fields = dict(line.split(": ", 1) for line in chunk.decode().strip().split("\n"))
+        return fields.get("id"), fields["event"], json.loads(fields["data"])
+
+    async def test_since_replays_stored_messages(self):
+        stream = await self._open_stream(data={"since": ""})
+
+        self.assertEqual(self._parse_event(await anext(stream))[1:], ("status", {"status": Conversation.Status.OPEN}))
+        event_id, event, data = self._parse_event(await anext(stream))
+        self.assertEqual((event, data["id"], data["content"]), ("message", str(self.message.id), "Oi"))
+        self.assertIsNotNone(event_id)
+
+    async def test_new_message_is_pushed_after_notification(self):
+        stream = await self._open_stream()
+        await anext(stream)
+
+        pending_chunk = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.1)
+        self.assertFalse(pending_chunk.done())
+        new_message = await acreate_message(
+            conversation_id=self.conversation, content="Resposta", timestamp=datetime.now(timezone.utc)
+        )
+        notify_conversations_changed([self.conversation.id])
+
+        _, event, data = self._parse_event(await asyncio.wait_for(pending_chunk, timeout=2))
+        self.assertEqual((event, data["id"]), ("message", str(new_message.id)))
+
+    async def test_last_event_id_resumes_after_that_message(self):
+        stream = await self._open_stream(data={"since": ""})
+        await anext(stream)
+        event_id, _, _ = self._parse_event(await anext(stream))
+        newer_message = await acreate_message(
+            conversation_id=self.conversation, content="Resposta", timestamp=datetime.now(timezone.utc)
+        )
+
+        resumed_stream = await self._open_stream(headers={"Last-Event-ID": event_id})
+        await anext(resumed_stream)
+
+        _, _, data = self._parse_event(await anext(resumed_stream))
+        self.assertEqual(data["id"], str(newer_message.id))
+
+    async def test_status_change_is_pushed(self):
+        stream = await self._open_stream()
+        await anext(stream)
+
+        await Conversation.objects.filter(id=self.conversation.id).aupdate(status=Conversation.Status.CLOSED)
+        notify_conversations_changed([self.conversation.id])
+
+        self.assertEqual(self._parse_event(await anext(stream))[1:], ("status", {"status": Conversation.Status.CLOSED}))
+
+    async def test_keepalive_is_sent_when_idle(self):
+        stream = await self._open_stream()
+        await anext(stream)
+
+        self.assertEqual(await anext(stream), b": keepalive\n\n")
+
+    async def test_unknown_conversation_returns_404(self):
+        response = await self.async_client.get(f"/conversations/{uuid4()}/events/")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_invalid_last_event_id_returns_400(self):
+        response = await self.async_client.get(self.events_url, headers={"Last-Event-ID": "bad"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_wsgi_request_returns_421(self):
+        response = self.client.get(self.events_url)
+
+        self.assertEqual(response.status_code, status.HTTP_421_MISDIRECTED_REQUEST)
+        self.assertEqual(response.json(), {"error": ERROR_EVENTS_REQUIRE_ASGI})
+
+
+class TestConversationExportView(APITestCase):
+    export_url = "/conversations/export/"
+
+    def setUp(self):
+        self.open_conversation = Conversation.objects.create()
+        self.closed_conversation = Conversation.objects.create(status=Conversation.Status.CLOSED)
+        self.message = Message.objects.create(
+            conversation_id=self.open_conversation, content="Oi", timestamp=datetime.now(timezone.utc)
+        )
+
+    def test_export_streams_ndjson(self):
+        response = self.client.get(f"{self.export_url}?status=OPEN")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([line['id'] for line in lines], [str(self.open_conversation.id)])
+        self.assertEqual([message['id'] for message in lines[0]['messages']], [str(self.message.id)])
+
+    def test_invalid_filters_return_400(self):
+        for query in ["status=PENDING", "created_after=yesterday", "created_after=2025-01-02&created_before=2025-01-01"]:
+            response = self.client.get(f"{self.export_url}?{query}")
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
@@ -0,0 +1,63 @@
+import uuid
+from unittest.mock import patch
+
+import redis
+from django.test import SimpleTestCase
+
+from realmate_challenge_app.conversation_cache import (
+    ConversationDetailCache,
+    MSG_CONVERSATION_CACHE_UNAVAILABLE,
+)
+
+
+class TestConversationDetailCache(SimpleTestCase):
+    def setUp(self):
+        self.cache = ConversationDetailCache(max_entries=10, ttl_seconds=60, version_ttl_seconds=600)
+        self.conversation_id = uuid.uuid4()
+        self.request_key = self.cache.request_key("http://testserver/conversations/")
+
+    def test_version_is_stable_until_invalidated(self):
+        version = self.cache.get_version(self.conversation_id)
+
+        self.assertEqual(self.cache.get_version(self.conversation_id), version)
+        self.cache.invalidate([self.conversation_id])
+        self.assertNotEqual(self.cache.get_version(self.conversation_id), version)
+
+    def test_version_is_only_created_when_asked(self):
+        self.assertIsNone(self.cache.get_version(self.conversation_id, create=False))
+
+        version = self.cache.get_version(self.conversation_id)
+
+        self.assertEqual(self.cache.get_version(self.conversation_id, create=False), version)
+
+    def test_entry_is_shared_through_redis(self):
+        version = self.cache.get_version(self.conversation_id)
+        self.cache.set(self.conversation_id, version, self.request_key, b'{"id": 1}', immutable=True)
+        other_process_cache = ConversationDetailCache(max_entries=10, ttl_seconds=60, version_ttl_seconds=600)
+
+        self.assertEqual(
+            other_process_cache.get(self.conversation_id, version, self.request_key), (b'{"id": 1}', True)
+        )
+
+    def test_invalidated_entry_is_not_found_under_new_version(self):
+        version = self.cache.get_version(self.conversation_id)
+        self.cache.set(self.conversation_id, version, self.request_key, b"{}", immutable=False)
+
+        self.cache.invalidate([self.conversation_id])
+
+        self.assertIsNone(self.cache.get(self.conversation_id, self.cache.get_version(self.conversation_id), self.request_key))
+
+    def test_etag_depends_on_version_and_request(self):
+        other_request_key = self.cache.request_key("http://testserver/conversations/?limit=1")
+
+        self.assertNotEqual(self.cache.etag("a", self.request_key), self.cache.etag("b", self.request_key))
+        self.assertNotEqual(self.cache.etag("a", self.request_key), self.cache.etag("a", other_request_key))
+
+    @patch('realmate_challenge_app.conversation_cache.logger')
+    @patch('realmate_challenge_app.conversation_cache.get_redis_client')
+    def test_redis_errors_disable_caching(self, mock_get_redis_client, mock_logger):
+        error = redis.ConnectionError("down")
+        mock_get_redis_client.return_value.get.side_effect = error
+
+        self.assertIsNone(self.cache.get_version(self.conversation_id))
+        mock_logger.warning.assert_called_once_with(MSG_CONVERSATION_CACHE_UNAVAILABLE, error)
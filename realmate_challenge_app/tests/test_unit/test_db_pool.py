@@ -0,0 +1,67 @@
+from unittest import skipUnless
+from unittest.mock import patch, MagicMock
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from realmate_challenge_app.db_pool import MSG_DATABASE_POOL_STATS, PoolStatsReporter, get_pool_stats
+from realmate_challenge_app.models import Conversation
+
+
+@skipUnless(settings.DATABASE_CONNECTIONS == 'pool', "Postgres connections aren't pooled")
+class TestPoolStats(TestCase):
+    def test_stats_of_the_open_pool(self):
+        Conversation.objects.exists()
+
+        stats = get_pool_stats()
+
+        min_size, max_size = settings.DATABASE_POOL_SIZES[settings.DATABASE_POOL_ROLE]
+        self.assertEqual((stats["min_size"], stats["max_size"]), (min_size, max_size))
+        # The test case holds its connection for the whole transaction.
+        self.assertGreaterEqual(stats["in_use"], 1)
+        self.assertEqual(stats["waiting"], 0)
+
+    def test_reset_clears_the_counters(self):
+        connection.pool.putconn(connection.pool.getconn())
+
+        self.assertGreaterEqual(get_pool_stats(reset=True)["requests"], 1)
+        self.assertEqual(get_pool_stats()["requests"], 0)
+
+
+class TestPoolStatsReporter(SimpleTestCase):
+    @patch('realmate_challenge_app.db_pool.connections')
+    def test_no_stats_without_a_pool(self, mock_connections):
+        mock_connections.__getitem__.return_value.pool = None
+
+        self.assertIsNone(get_pool_stats())
+
+    @patch('realmate_challenge_app.db_pool.logger')
+    @patch('realmate_challenge_app.db_pool.get_pool_stats', MagicMock(return_value={"in_use": 1, "waiting": 0}))
+    @patch('realmate_challenge_app.db_pool.time.monotonic')
+    def test_reports_at_most_once_per_interval(self, mock_monotonic, mock_logger):
+        mock_monotonic.return_value = 1000.0
+        reporter = PoolStatsReporter(interval_seconds=60)
+
+        reporter.maybe_report()
+        mock_monotonic.return_value = 1060.0
+        reporter.maybe_report()
+        reporter.maybe_report()
+
+        mock_logger.info.assert_called_once_with(MSG_DATABASE_POOL_STATS, "default", "web", "in_use=1 waiting=0")
+
+    @patch('realmate_challenge_app.db_pool.get_pool_stats')
+    def test_disabled_with_a_zero_interval(self, mock_get_pool_stats):
+        reporter = PoolStatsReporter(interval_seconds=0)
+
+        reporter.maybe_report()
+
+        mock_get_pool_stats.assert_not_called()
+
+    @patch('realmate_challenge_app.db_pool.logger')
+    @patch('realmate_challenge_app.db_pool.get_pool_stats', MagicMock(return_value=None))
+    @patch('realmate_challenge_app.db_pool.time.monotonic', MagicMock(return_value=1e9))
+    def test_quiet_without_a_pool(self, mock_logger):
+        PoolStatsReporter(interval_seconds=1).maybe_report()
+
+        mock_logger.info.assert_not_called()
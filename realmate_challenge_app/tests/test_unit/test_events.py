@@ -0,0 +1,43 @@
+import uuid
+from unittest.mock import patch
+
+import redis
+from django.test import SimpleTestCase
+
+from realmate_challenge_app.events import (
+    CONVERSATION_EVENTS_CHANNEL,
+    MSG_CONVERSATION_EVENTS_UNAVAILABLE,
+    notify_conversations_changed,
+)
+
+
+@patch('realmate_challenge_app.events.conversation_cache')
+@patch('realmate_challenge_app.events.get_redis_client')
+class TestNotifyConversationsChanged(SimpleTestCase):
+    def test_invalidates_cache_and_publishes_each_conversation(self, mock_get_redis_client, mock_cache):
+        conversation_ids = [uuid.uuid4(), uuid.uuid4()]
+
+        notify_conversations_changed(conversation_ids)
+
+        mock_cache.invalidate.assert_called_once_with(conversation_ids)
+        pipeline = mock_get_redis_client.return_value.pipeline.return_value
+        self.assertEqual(
+            [call.args[0] for call in pipeline.publish.call_args_list],
+            [CONVERSATION_EVENTS_CHANNEL.format(conversation_id) for conversation_id in conversation_ids],
+        )
+        pipeline.execute.assert_called_once()
+
+    def test_nothing_to_notify(self, mock_get_redis_client, mock_cache):
+        notify_conversations_changed([])
+
+        mock_cache.invalidate.assert_not_called()
+        mock_get_redis_client.assert_not_called()
+
+    @patch('realmate_challenge_app.events.logger')
+    def test_redis_errors_are_logged(self, mock_logger, mock_get_redis_client, mock_cache):
+        error = redis.ConnectionError("down")
+        mock_get_redis_client.return_value.pipeline.return_value.execute.side_effect = error
+
+        notify_conversations_changed([uuid.uuid4()])
+
+        mock_logger.warning.assert_called_once_with(MSG_CONVERSATION_EVENTS_UNAVAILABLE, error)
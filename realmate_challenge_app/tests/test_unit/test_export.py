@@ -0,0 +1,84 @@
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from realmate_challenge_app.export import export_conversations
+from realmate_challenge_app.management.commands.export_conversations import MSG_CONVERSATIONS_EXPORTED
+from realmate_challenge_app.models import Conversation, Message
+from realmate_challenge_app.serializers.responses import MessageSerializer
+
+BASE_TIMESTAMP = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class TestExportConversations(TestCase):
+    def setUp(self):
+        self.conversations = [Conversation.objects.create() for _ in range(4)]
+        Conversation.objects.filter(id=self.conversations[0].id).update(status=Conversation.Status.CLOSED)
+        for index, conversation in enumerate(self.conversations[:3]):
+            for offset in range(index + 2):
+                Message.objects.create(
+                    conversation_id=conversation,
+                    content=f"Mensagem {offset}\n ",
+                    timestamp=BASE_TIMESTAMP - timedelta(seconds=offset),
+                )
+        Message.objects.create(content="Sem conversa", timestamp=BASE_TIMESTAMP, expected_conversation_id=self.conversations[3].id)
+
+    def _export(self, **filters):
+        body = b"".join(export_conversations(2, **filters))
+        return [json.loads(line) for line in body.splitlines()]
+
+    def _expected_line(self, conversation):
+        conversation.refresh_from_db()
+        messages = Message.objects.filter(conversation_id=conversation).order_by("timestamp", "id")
+        return {
+            "id": str(conversation.id),
+            "status": conversation.status,
+            "created_at": conversation.created_at.isoformat().replace("+00:00", "Z"),
+            "messages": [json.loads(json.dumps(MessageSerializer(message).data)) for message in messages],
+        }
+
+    def test_exports_every_conversation_with_its_messages(self):
+        with self.assertNumQueries(2):
+            lines = self._export()
+
+        expected = sorted(self.conversations, key=lambda conversation: conversation.id)
+        self.assertEqual(lines, [self._expected_line(conversation) for conversation in expected])
+        orphan_owner = next(line for line in lines if line["id"] == str(self.conversations[3].id))
+        self.assertEqual(orphan_owner["messages"], [])
+
+    def test_filters_by_status_and_creation_range(self):
+        Conversation.objects.filter(id=self.conversations[1].id).update(created_at=BASE_TIMESTAMP)
+        Conversation.objects.filter(id=self.conversations[2].id).update(created_at=BASE_TIMESTAMP + timedelta(hours=1))
+
+        closed_ids = [line["id"] for line in self._export(status=Conversation.Status.CLOSED)]
+        ranged_lines = self._export(created_after=BASE_TIMESTAMP, created_before=BASE_TIMESTAMP + timedelta(hours=1))
+
+        self.assertEqual(closed_ids, [str(self.conversations[0].id)])
+        self.assertEqual(ranged_lines, [self._expected_line(self.conversations[1])])
+
+    @patch('realmate_challenge_app.export.EXPORT_BUFFER_BYTES', 64)
+    def test_long_conversations_are_streamed_in_pieces(self):
+        chunks = list(export_conversations(2))
+
+        self.assertGreater(len(chunks), len(self.conversations))
+        self.assertEqual(len(b"".join(chunks).splitlines()), len(self.conversations))
+
+    def test_command_writes_the_same_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "export.ndjson"
+            with patch('realmate_challenge_app.management.commands.export_conversations.logger') as mock_logger:
+                call_command("export_conversations", "--status", "OPEN", "--chunk-size", "1", "--output", str(output))
+
+            self.assertEqual(
+                output.read_bytes(), b"".join(export_conversations(100, status=Conversation.Status.OPEN))
+            )
+        mock_logger.info.assert_called_once_with(MSG_CONVERSATIONS_EXPORTED, count=3, output=str(output))
+
+    def test_command_rejects_invalid_filters(self):
+        with self.assertRaises(CommandError):
+            call_command("export_conversations", "--created-after", "2025-01-02", "--created-before", "2025-01-01")
@@ -0,0 +1,118 @@
+import json
+import uuid
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone as django_timezone
+
+from realmate_challenge_app.serializers.fast_payloads import (
+    WebhookEventDecoder,
+    get_webhook_decoder,
+    webhook_event_decoder,
+)
+from realmate_challenge_app.serializers.payloads import (
+    CloseConversationPayloadSerializer,
+    NewConversationPayloadSerializer,
+    NewMessagePayloadSerializer,
+)
+
+SERIALIZER_CLASSES = {
+    "NEW_CONVERSATION": NewConversationPayloadSerializer,
+    "NEW_MESSAGE": NewMessagePayloadSerializer,
+    "CLOSE_CONVERSATION": CloseConversationPayloadSerializer,
+}
+TIMESTAMP = "2025-02-21T10:20:42.123456Z"
+
+
+def new_message(**data):
+    return {
+        "type": "NEW_MESSAGE",
+        "timestamp": TIMESTAMP,
+        "data": {"id": str(uuid.uuid4()), "content": "Oi", "conversation_id": str(uuid.uuid4()), **data},
+    }
+
+
+class TestWebhookEventDecoder(SimpleTestCase):
+    def setUp(self):
+        self.decoder = WebhookEventDecoder()
+
+    def _drf_validate(self, payload):
+        serializer = SERIALIZER_CLASSES[payload["type"]](data=payload)
+        return serializer.validated_data if serializer.is_valid() else None
+
+    def assert_matches_serializers(self, payload):
+        decoded = self.decoder.decode(json.dumps(payload).encode())
+        if decoded is None:
+            return
+        self.assertEqual(decoded[0], payload["type"])
+        self.assertEqual(decoded[1], self._drf_validate(payload))
+
+    def test_valid_events_match_serializer_validated_data(self):
+        conversation_id = str(uuid.uuid4())
+        payloads = [
+            {"type": "NEW_CONVERSATION", "timestamp": TIMESTAMP, "data": {"id": conversation_id}},
+            {"type": "CLOSE_CONVERSATION", "timestamp": "2025-02-21 10:20:42-03:00", "data": {"id": conversation_id}},
+            {"type": "NEW_MESSAGE", "timestamp": "2025-02-21T10:20", "data": {
+                "id": str(uuid.uuid4()).upper(), "content": "  Olá   tudo bem?  ", "conversation_id": conversation_id,
+            }},
+            new_message(content="a" * 500, extra="ignored"),
+        ]
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                self.assertIsNotNone(self.decoder.decode(json.dumps(payload).encode()))
+                self.assert_matches_serializers(payload)
+
+    def test_valid_events_match_serializers_in_other_time_zone(self):
+        with django_timezone.override("America/Sao_Paulo"):
+            self.assert_matches_serializers(new_message())
+
+    def test_events_the_serializers_reject_are_not_decoded(self):
+        payloads = [
+            new_message(content=""),
+            new_message(content=" \n "),
+            new_message(content="a" * 501),
+            new_message(content="a\x00"),
+            new_message(content=["Oi"]),
+            new_message(id="not-a-uuid"),
+            {**new_message(), "timestamp": "21/02/2025"},
+            {**new_message(), "data": None},
+            {"type": "NEW_MESSAGE", "timestamp": TIMESTAMP},
+            {"type": "UNKNOWN", "timestamp": TIMESTAMP, "data": {"id": str(uuid.uuid4())}},
+        ]
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                self.assertIsNone(self.decoder.decode(json.dumps(payload).encode()))
+
+    def test_inputs_only_drf_coerces_are_left_to_serializers(self):
+        for payload in (new_message(content=123), new_message(id=uuid.uuid4().int), new_message(content=" " + "a" * 500)):
+            with self.subTest(payload=payload):
+                self.assertIsNone(self.decoder.decode(json.dumps(payload).encode()))
+                self.assertIsNotNone(self._drf_validate(payload))
+
+    def test_invalid_json_is_not_decoded(self):
+        for body in (b"{not json", b'{"type": "NEW_MESSAGE", "timestamp": NaN}', b"\xff", b'"\\ud800"'):
+            with self.subTest(body=body):
+                self.assertIsNone(self.decoder.decode(body))
+
+    def test_split_batch(self):
+        events = [new_message(), {"type": "UNKNOWN"}, "not an event"]
+
+        self.assertEqual(
+            [json.loads(bytes(raw)) for raw in self.decoder.split_batch(json.dumps(events).encode())], events
+        )
+        ndjson = "\n".join(json.dumps(event) for event in events) + "\n\n"
+        self.assertEqual(
+            [json.loads(bytes(raw)) for raw in self.decoder.split_batch(ndjson.encode(), ndjson=True)], events
+        )
+        self.assertIsNone(self.decoder.split_batch(b'[{"type": "NEW_MESSAGE"}'))
+        self.assertIsNone(self.decoder.split_batch(b'{"type": "NEW_MESSAGE"}'))
+        self.assertIsNone(self.decoder.split_batch(b'{}\n{not json', ndjson=True))
+
+
+class TestGetWebhookDecoder(SimpleTestCase):
+    @override_settings(WEBHOOK_VALIDATION_BACKEND="msgspec")
+    def test_msgspec_backend(self):
+        self.assertIs(get_webhook_decoder(), webhook_event_decoder)
+
+    @override_settings(WEBHOOK_VALIDATION_BACKEND="drf")
+    def test_drf_backend(self):
+        self.assertIsNone(get_webhook_decoder())
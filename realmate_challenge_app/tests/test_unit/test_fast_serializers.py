@@ -0,0 +1,64 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.test import TestCase
+from django.utils import timezone as django_timezone
+from rest_framework.renderers import JSONRenderer
+
+from realmate_challenge_app.models import Conversation, Message
+from realmate_challenge_app.serializers.fast import (
+    message_rows,
+    render_conversation_delta,
+    render_conversation_detail,
+)
+from realmate_challenge_app.serializers.responses import ConversationDeltaSerializer, ConversationDetailSerializer
+
+TRICKY_CONTENTS = [
+    "Olá, tudo bem? 😀",
+    'aspas " e barra \\ e </script>',
+    "quebra\nlinha\ttab\r\x01\x1f\x7f",
+    "separadores \u2028 e \u2029",
+    "",
+]
+
+
+class TestFastConversationRendering(TestCase):
+    def setUp(self):
+        self.conversation = Conversation.objects.create(id=uuid.uuid4(), status=Conversation.Status.CLOSED)
+        base_timestamp = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+        for index, content in enumerate(TRICKY_CONTENTS):
+            Message.objects.create(
+                conversation_id=self.conversation,
+                type=Message.MessageType.OUTBOUND if index % 2 else Message.MessageType.INBOUND,
+                content=content,
+                timestamp=base_timestamp + timedelta(seconds=index, microseconds=index * 1500),
+            )
+        self.queryset = Message.objects.filter(conversation_id=self.conversation).order_by("timestamp", "id")
+
+    def _drf_detail(self):
+        context = {"messages": list(self.queryset), "next": "http://testserver/next", "previous": None}
+        return JSONRenderer().render(ConversationDetailSerializer(self.conversation, context=context).data)
+
+    def _fast_detail(self):
+        rows = list(message_rows(self.queryset))
+        return render_conversation_detail(self.conversation, rows, "http://testserver/next", None)
+
+    def test_detail_matches_drf_bytes(self):
+        self.assertEqual(self._fast_detail(), self._drf_detail())
+
+    def test_delta_matches_drf_bytes(self):
+        context = {"messages": list(self.queryset), "cursor": "abc", "has_more": True}
+        expected = JSONRenderer().render(ConversationDeltaSerializer(self.conversation, context=context).data)
+
+        rows = list(message_rows(self.queryset, "created_at"))
+
+        self.assertEqual(render_conversation_delta(self.conversation, rows, "abc", True), expected)
+
+    def test_matches_drf_bytes_in_other_time_zone(self):
+        with django_timezone.override("America/Sao_Paulo"):
+            self.assertEqual(self._fast_detail(), self._drf_detail())
+
+    def test_rows_expose_extra_fields(self):
+        row = message_rows(self.queryset, "created_at").first()
+
+        self.assertEqual(row._fields, ("id", "type", "content", "timestamp", "created_at"))
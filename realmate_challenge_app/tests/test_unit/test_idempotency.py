@@ -0,0 +1,57 @@
+import json
+import uuid
+from unittest.mock import patch, MagicMock
+
+import redis
+from django.test import SimpleTestCase
+
+from realmate_challenge_app.idempotency import SeenEventIndex, SEEN_EVENT_KEY
+
+
+class TestSeenEventIndex(SimpleTestCase):
+    def setUp(self):
+        self.redis_client = MagicMock()
+        self.redis_client.mget.side_effect = lambda keys: [None] * len(keys)
+        patcher = patch('realmate_challenge_app.idempotency.get_redis_client', return_value=self.redis_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = SeenEventIndex(max_entries=2, ttl_seconds=60)
+
+    def test_unknown_event_returns_none(self):
+        self.assertIsNone(self.index.get(uuid.uuid4()))
+
+    def test_remembered_event_is_served_from_local_cache(self):
+        event_id = uuid.uuid4()
+        self.index.remember(event_id, {"message": "ok"}, 202)
+
+        self.assertEqual(self.index.get(event_id), ({"message": "ok"}, 202))
+        self.redis_client.mget.assert_not_called()
+        self.redis_client.pipeline.return_value.set.assert_called_once_with(
+            SEEN_EVENT_KEY.format(event_id), json.dumps(({"message": "ok"}, 202)), ex=60
+        )
+
+    def test_event_is_loaded_from_redis_on_local_miss(self):
+        event_id = uuid.uuid4()
+        self.redis_client.mget.side_effect = None
+        self.redis_client.mget.return_value = [json.dumps(({"message": "ok"}, 202))]
+
+        self.assertEqual(self.index.get(event_id), ({"message": "ok"}, 202))
+        self.assertEqual(self.index.get(event_id), ({"message": "ok"}, 202))
+        self.redis_client.mget.assert_called_once_with([SEEN_EVENT_KEY.format(event_id)])
+
+    def test_least_recently_used_event_is_evicted(self):
+        first, second, third = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        for event_id in (first, second, third):
+            self.index.remember(event_id, {"message": "ok"}, 202)
+
+        self.assertIsNone(self.index.get(first))
+        self.assertIsNotNone(self.index.get(third))
+
+    def test_redis_errors_fall_back_to_a_miss(self):
+        self.redis_client.mget.side_effect = redis.ConnectionError("down")
+        self.redis_client.pipeline.return_value.execute.side_effect = redis.ConnectionError("down")
+        event_id = uuid.uuid4()
+
+        self.assertIsNone(self.index.get(event_id))
+        self.index.remember(event_id, {"message": "ok"}, 202)
+        self.assertEqual(self.index.get(event_id), ({"message": "ok"}, 202))
@@ -0,0 +1,104 @@
+import io
+import json
+import threading
+import uuid
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+from django.test import SimpleTestCase
+from loguru import logger
+
+from realmate_challenge.logger import MSG_LOG_RECORDS_DROPPED, BackgroundWriter, LogFilter, format_json, parse_sample_rates
+
+
+class BlockingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writing = threading.Event()
+        self.unblocked = threading.Event()
+
+    def write(self, text):
+        self.writing.set()
+        self.unblocked.wait(5)
+        return super().write(text)
+
+
+class TestBackgroundWriter(SimpleTestCase):
+    def test_records_are_written_in_order_by_the_writer_thread(self):
+        stream = io.StringIO()
+        writer = BackgroundWriter(stream, max_queued=100)
+
+        for index in range(5):
+            writer.write(f"line {index}\n")
+        writer.stop()
+
+        self.assertEqual(stream.getvalue(), "".join(f"line {index}\n" for index in range(5)))
+
+    @patch('realmate_challenge.logger.logger')
+    def test_records_past_the_queue_size_are_dropped_and_counted(self, mock_logger):
+        stream = BlockingStream()
+        writer = BackgroundWriter(stream, max_queued=2)
+        writer.write("first\n")
+        # The writer thread holds the first record until the stream unblocks.
+        stream.writing.wait(5)
+
+        for index in range(4):
+            writer.write(f"queued {index}\n")
+        stream.unblocked.set()
+        writer.stop()
+
+        self.assertEqual(stream.getvalue(), "first\nqueued 0\nqueued 1\n")
+        mock_logger.warning.assert_called_once_with(MSG_LOG_RECORDS_DROPPED, 2)
+
+
+class TestLogFilter(SimpleTestCase):
+    def _record(self, level="INFO", line=10):
+        return {"level": SimpleNamespace(name=level), "name": "realmate_challenge_app.views", "line": line, "extra": {}}
+
+    @patch('realmate_challenge.logger.random.random', MagicMock(return_value=0.5))
+    def test_levels_are_sampled_at_their_rate(self):
+        log_filter = LogFilter({"DEBUG": 0.1, "INFO": 0.9}, rate_limit=0, window_seconds=60)
+
+        self.assertFalse(log_filter(self._record("DEBUG")))
+        self.assertTrue(log_filter(self._record("INFO")))
+        self.assertTrue(log_filter(self._record("WARNING")))
+
+    @patch('realmate_challenge.logger.time.monotonic')
+    def test_call_sites_are_rate_limited_per_window(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        log_filter = LogFilter({}, rate_limit=2, window_seconds=60)
+
+        kept = [log_filter(self._record()) for _ in range(5)]
+        other_call_site = log_filter(self._record(line=20))
+        mock_monotonic.return_value = 160.0
+        next_window_record = self._record()
+        next_window = log_filter(next_window_record)
+
+        self.assertEqual(kept, [True, True, False, False, False])
+        self.assertTrue(other_call_site)
+        self.assertTrue(next_window)
+        self.assertEqual(next_window_record["extra"], {"suppressed": 3})
+
+
+class TestLogFormat(SimpleTestCase):
+    def test_sample_rates_are_parsed_per_level(self):
+        self.assertEqual(parse_sample_rates("debug=0.01, INFO=0.5"), {"DEBUG": 0.01, "INFO": 0.5})
+        self.assertEqual(parse_sample_rates(""), {})
+
+    def test_json_lines_carry_the_keyword_arguments_as_fields(self):
+        stream = io.StringIO()
+        handler_id = logger.add(stream, format=format_json)
+        self.addCleanup(logger.remove, handler_id)
+        message_id = uuid.uuid4()
+
+        logger.info("Message {message_id} not found", message_id=message_id)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Failed")
+
+        info, error = map(json.loads, stream.getvalue().splitlines())
+        self.assertEqual(info["message"], f"Message {message_id} not found")
+        self.assertEqual(info["message_id"], str(message_id))
+        self.assertEqual((info["level"], info["function"]), ("INFO", "test_json_lines_carry_the_keyword_arguments_as_fields"))
+        self.assertIn("ValueError: boom", error["exception"])
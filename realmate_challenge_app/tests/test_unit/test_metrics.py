@@ -0,0 +1,128 @@
+import os
+import tempfile
+import time
+from datetime import timedelta
+from unittest.mock import patch, MagicMock
+from uuid import uuid4
+
+import redis
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, values
+
+from realmate_challenge_app.metrics import (
+    MSG_ORPHAN_COUNT_UNAVAILABLE,
+    observe_reply_lag,
+    observe_webhook_batch,
+    registry,
+    render_metrics,
+    task_finished,
+    task_started,
+)
+from realmate_challenge_app.models import Conversation, Message
+
+
+def sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0
+
+
+@override_settings(PENDING_MESSAGES_BACKEND='database')
+class TestBacklogGauges(TestCase):
+    def test_scrape_reports_orphans_and_unprocessed_inbound(self):
+        conversation = Conversation.objects.create()
+        now = timezone.now()
+        Message.objects.create(conversation_id=conversation, content="waiting", timestamp=now)
+        Message.objects.create(conversation_id=conversation, content="replied", timestamp=now, processed=True)
+        Message.objects.create(content="orphan", timestamp=now, expected_conversation_id=uuid4())
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], CONTENT_TYPE_LATEST)
+        body = response.content.decode()
+        self.assertIn("realmate_orphan_messages 1.0", body)
+        self.assertIn("realmate_unprocessed_inbound_messages 1.0", body)
+        self.assertIn("realmate_unprocessed_inbound_oldest_age_seconds", body)
+
+    @patch('realmate_challenge_app.metrics.logger')
+    @patch('realmate_challenge_app.metrics.get_pending_buffer')
+    def test_orphan_gauge_left_out_when_redis_is_down(self, mock_get_pending_buffer, mock_logger):
+        error = redis.ConnectionError("down")
+        mock_get_pending_buffer.return_value.count.side_effect = error
+
+        body = render_metrics().decode()
+
+        self.assertNotIn("realmate_orphan_messages ", body)
+        self.assertIn("realmate_unprocessed_inbound_messages 0.0", body)
+        mock_logger.warning.assert_called_once_with(MSG_ORPHAN_COUNT_UNAVAILABLE, error)
+
+
+@override_settings(PENDING_MESSAGES_BACKEND='database')
+class TestMultiProcessScrape(TestCase):
+    def test_scrape_adds_up_the_directory_of_every_container(self):
+        with tempfile.TemporaryDirectory() as root:
+            for hostname in ("web", "worker"):
+                directory = os.path.join(root, hostname)
+                os.makedirs(directory)
+                # A process of each container, both with the same pid.
+                with (
+                    patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory),
+                    patch.object(values, "ValueClass", values.MultiProcessValue()),
+                ):
+                    Counter("realmate_test_events", "Events of the test processes.", registry=None).inc()
+
+            with override_settings(METRICS_MULTIPROC_ROOT=root):
+                body = render_metrics().decode()
+
+        self.assertIn("realmate_test_events_total 2.0", body)
+
+
+class TestWebhookMetrics(TestCase):
+    def test_events_are_counted_by_type_and_status(self):
+        created = sample('realmate_webhook_events_total', event_type="NEW_CONVERSATION", status="201")
+        observed = sample('realmate_webhook_request_duration_seconds_count', event_type="NEW_CONVERSATION")
+        payload = {"type": "NEW_CONVERSATION", "timestamp": timezone.now().isoformat(), "data": {"id": str(uuid4())}}
+
+        self.client.post("/webhook/", data=payload, content_type="application/json")
+
+        self.assertEqual(sample('realmate_webhook_events_total', event_type="NEW_CONVERSATION", status="201"), created + 1)
+        self.assertEqual(
+            sample('realmate_webhook_request_duration_seconds_count', event_type="NEW_CONVERSATION"), observed + 1
+        )
+
+    def test_batches_count_each_event(self):
+        batches = sample('realmate_webhook_request_duration_seconds_count', event_type="BATCH")
+        closed = sample('realmate_webhook_events_total', event_type="CLOSE_CONVERSATION", status="200")
+        invalid = sample('realmate_webhook_events_total', event_type="INVALID", status="400")
+
+        observe_webhook_batch(["CLOSE_CONVERSATION", None], [200, 400], time.perf_counter())
+
+        self.assertEqual(sample('realmate_webhook_request_duration_seconds_count', event_type="BATCH"), batches + 1)
+        self.assertEqual(sample('realmate_webhook_events_total', event_type="CLOSE_CONVERSATION", status="200"), closed + 1)
+        self.assertEqual(sample('realmate_webhook_events_total', event_type="INVALID", status="400"), invalid + 1)
+
+
+class TestReplyAndTaskMetrics(TestCase):
+    def test_reply_lag_is_measured_from_the_last_message_of_the_group(self):
+        within_sla = sample('realmate_inbound_reply_lag_seconds_bucket', le="6.0")
+        within_gap = sample('realmate_inbound_reply_lag_seconds_bucket', le="5.0")
+        replied_at = timezone.now()
+
+        observe_reply_lag(replied_at, [replied_at - timedelta(seconds=9), replied_at - timedelta(seconds=5.2)])
+        observe_reply_lag(replied_at, [])
+
+        self.assertEqual(sample('realmate_inbound_reply_lag_seconds_bucket', le="6.0"), within_sla + 1)
+        self.assertEqual(sample('realmate_inbound_reply_lag_seconds_bucket', le="5.0"), within_gap)
+
+    def test_task_duration_is_labelled_by_task_and_state(self):
+        task = MagicMock()
+        task.name = "realmate_challenge_app.tasks.process_inbound_messages"
+        observed = sample('realmate_task_duration_seconds_count', task="process_inbound_messages", state="SUCCESS")
+
+        task_started(task_id="task-1", task=task)
+        task_finished(task_id="task-1", task=task, state="SUCCESS")
+        task_finished(task_id="task-1", task=task, state="SUCCESS")
+
+        self.assertEqual(
+            sample('realmate_task_duration_seconds_count', task="process_inbound_messages", state="SUCCESS"), observed + 1
+        )
@@ -0,0 +1,123 @@
+import json
+import uuid
+from unittest.mock import patch, MagicMock
+
+import redis
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from realmate_challenge_app.models import Message
+from realmate_challenge_app.pending import (
+    RedisPendingBuffer,
+    DatabasePendingBuffer,
+    get_pending_buffer,
+    PENDING_MESSAGES_KEY,
+)
+
+
+class TestRedisPendingBuffer(SimpleTestCase):
+    def setUp(self):
+        self.redis_client = MagicMock()
+        patcher = patch('realmate_challenge_app.pending.get_redis_client', return_value=self.redis_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = RedisPendingBuffer(ttl_seconds=6)
+        self.buffer.fallback = MagicMock()
+        self.buffer.fallback.adopt.return_value = 0
+
+    @patch('realmate_challenge_app.pending.time.time', return_value=100.0)
+    def test_buffer_adds_message_to_conversation_set_with_ttl(self, mock_time):
+        conversation_id = uuid.uuid4()
+        message = Message(id=uuid.uuid4(), content="Oi", timestamp=timezone.now(), expected_conversation_id=conversation_id)
+
+        self.buffer.buffer([message])
+
+        pipeline = self.redis_client.pipeline.return_value
+        key = PENDING_MESSAGES_KEY.format(conversation_id)
+        member = json.dumps({"id": str(message.id), "content": "Oi", "timestamp": message.timestamp.isoformat()})
+        pipeline.zadd.assert_called_once_with(key, {member: 100000})
+        pipeline.zremrangebyscore.assert_called_once_with(key, "-inf", 94000)
+        pipeline.pexpire.assert_called_once_with(key, 6000)
+        pipeline.execute.assert_called_once()
+
+    @patch('realmate_challenge_app.pending.queries')
+    def test_buffer_stores_orphan_rows_when_redis_is_unavailable(self, mock_queries):
+        message = Message(id=uuid.uuid4(), content="Oi", timestamp=timezone.now(), expected_conversation_id=uuid.uuid4())
+        self.redis_client.pipeline.return_value.execute.side_effect = redis.ConnectionError("down")
+
+        self.buffer.buffer([message])
+
+        mock_queries.insert_messages.assert_called_once_with([message])
+        self.buffer.fallback.buffer.assert_called_once_with([message])
+
+    @patch('realmate_challenge_app.pending.queries')
+    def test_adopt_takes_orphan_rows_when_redis_is_unavailable(self, mock_queries):
+        conversation_id = uuid.uuid4()
+        self.buffer.fallback.adopt.return_value = 2
+        self.redis_client.pipeline.return_value.execute.side_effect = redis.ConnectionError("down")
+
+        self.assertEqual(self.buffer.adopt([conversation_id]), 2)
+
+        self.buffer.fallback.adopt.assert_called_once_with([conversation_id])
+        mock_queries.insert_messages.assert_not_called()
+
+    @patch('realmate_challenge_app.pending.transaction')
+    @patch('realmate_challenge_app.pending.queries')
+    @patch('realmate_challenge_app.pending.time.time', return_value=100.0)
+    def test_adopt_inserts_unexpired_messages_and_unbuffers_them_on_commit(self, mock_time, mock_queries, mock_transaction):
+        conversation_id = uuid.uuid4()
+        message_id = uuid.uuid4()
+        timestamp = timezone.now()
+        member = json.dumps({"id": str(message_id), "content": "Oi", "timestamp": timestamp.isoformat()})
+        pipeline = self.redis_client.pipeline.return_value
+        pipeline.execute.return_value = [[member]]
+        mock_queries.insert_messages.return_value = {str(message_id)}
+
+        adopted = self.buffer.adopt([conversation_id])
+
+        self.assertEqual(adopted, 1)
+        key = PENDING_MESSAGES_KEY.format(conversation_id)
+        pipeline.zrangebyscore.assert_called_once_with(key, 94000, "+inf")
+        (messages,), _ = mock_queries.insert_messages.call_args
+        self.assertEqual(messages[0].conversation_id_id, conversation_id)
+        self.assertEqual(str(messages[0].id), str(message_id))
+        self.assertEqual(messages[0].timestamp, timestamp)
+        mock_queries.apply_messages_to_snapshots.assert_called_once_with([str(message_id)])
+        # Nothing leaves the buffer until the adoption commits.
+        pipeline.delete.assert_not_called()
+        pipeline.zrem.assert_not_called()
+
+        (on_commit,), kwargs = mock_transaction.on_commit.call_args
+        self.assertEqual(kwargs, {"robust": True})
+        on_commit()
+        pipeline.zrem.assert_called_once_with(key, member)
+
+    @patch('realmate_challenge_app.pending.transaction', MagicMock())
+    @patch('realmate_challenge_app.pending.queries')
+    @patch('realmate_challenge_app.pending.time.time', return_value=100.0)
+    def test_adopt_applies_only_the_messages_inserted(self, mock_time, mock_queries):
+        stored_id, new_id = uuid.uuid4(), uuid.uuid4()
+        timestamp = timezone.now().isoformat()
+        self.redis_client.pipeline.return_value.execute.return_value = [[
+            json.dumps({"id": str(stored_id), "content": "Oi", "timestamp": timestamp}),
+            json.dumps({"id": str(new_id), "content": "Tudo bem?", "timestamp": timestamp}),
+        ]]
+        mock_queries.insert_messages.return_value = {str(new_id)}
+
+        self.assertEqual(self.buffer.adopt([uuid.uuid4()]), 1)
+
+        mock_queries.apply_messages_to_snapshots.assert_called_once_with([str(new_id)])
+
+    def test_adopt_without_conversations_skips_redis(self):
+        self.assertEqual(self.buffer.adopt([]), 0)
+        self.redis_client.pipeline.assert_not_called()
+
+
+class TestGetPendingBuffer(SimpleTestCase):
+    @override_settings(PENDING_MESSAGES_BACKEND="redis")
+    def test_redis_backend(self):
+        self.assertIsInstance(get_pending_buffer(), RedisPendingBuffer)
+
+    @override_settings(PENDING_MESSAGES_BACKEND="database")
+    def test_database_backend(self):
+        self.assertIsInstance(get_pending_buffer(), DatabasePendingBuffer)
@@ -0,0 +1,90 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from uuid import uuid4
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import TestCase, override_settings
+from django.urls import path
+from django.utils import timezone
+
+from realmate_challenge_app.models import Conversation
+from realmate_challenge_app.profiling import PROFILE_FILE_HEADER, ProfilingMiddleware
+from realmate_challenge_app.views import AsyncConversationDetailView, AsyncWebhookView
+
+# The async views, routed like settings.API_VIEWS = 'async' does.
+urlpatterns = [
+    path('webhook/', AsyncWebhookView.as_view()),
+    path('conversations/<uuid:id>/', AsyncConversationDetailView.as_view()),
+]
+SERVER_TIMING_PATTERN = r'^handler;dur=[\d.]+, db;dur=[\d.]+;desc="[1-9]\d* queries", serializer;dur=[\d.]+$'
+
+
+@override_settings(PROFILING_TOKEN='secret', PROFILING_SAMPLE_RATE=0)
+class TestProfilingMiddleware(TestCase):
+    def _post_new_conversation(self, **headers):
+        payload = {"type": "NEW_CONVERSATION", "timestamp": timezone.now().isoformat(), "data": {"id": str(uuid4())}}
+        return self.client.post("/webhook/", data=payload, content_type="application/json", headers=headers)
+
+    @override_settings(PROFILING_TOKEN='', PROFILING_SAMPLE_RATE=0)
+    def test_not_loaded_when_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(MagicMock())
+
+    @patch('realmate_challenge_app.profiling.logger')
+    def test_authorised_requests_get_their_timings_back(self, mock_logger):
+        response = self._post_new_conversation(**{"X-Profile": "secret"})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertRegex(response["Server-Timing"], SERVER_TIMING_PATTERN)
+        summary = mock_logger.info.call_args.kwargs
+        self.assertEqual((summary["view"], summary["status"]), ("WebhookView", 201))
+        self.assertGreater(summary["serializer_ms"], 0)
+
+    @patch('realmate_challenge_app.profiling.logger')
+    def test_unauthorised_and_unlisted_requests_are_not_profiled(self, mock_logger):
+        response = self._post_new_conversation(**{"X-Profile": "wrong"})
+        export_response = self.client.get("/conversations/export/", headers={"X-Profile": "secret"})
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertNotIn("Server-Timing", export_response)
+        mock_logger.info.assert_not_called()
+
+    @patch('realmate_challenge_app.profiling.logger', MagicMock())
+    def test_sampled_requests_are_written_to_the_output_directory(self):
+        conversation = Conversation.objects.create()
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+
+        with override_settings(PROFILING_TOKEN='', PROFILING_SAMPLE_RATE=1.0, PROFILING_OUTPUT_DIR=output_dir.name):
+            response = self.client.get(f"/conversations/{conversation.id}/")
+
+        self.assertEqual(response.status_code, 200)
+        # Only requests authorised by the header get the debug headers.
+        self.assertNotIn("Server-Timing", response)
+        self.assertNotIn(PROFILE_FILE_HEADER, response)
+        profile_file, = Path(output_dir.name).glob("*-ConversationDetailView-*.prof")
+        summary = json.loads(profile_file.with_suffix(".json").read_text())
+        self.assertEqual((summary["path"], summary["status"]), (f"/conversations/{conversation.id}/", 200))
+
+    @override_settings(ROOT_URLCONF=__name__, PROFILING_VIEWS=['AsyncWebhookView', 'AsyncConversationDetailView'])
+    @patch('realmate_challenge_app.profiling.logger')
+    def test_async_views_are_profiled_under_wsgi(self, mock_logger):
+        response = self._post_new_conversation(**{"X-Profile": "secret"})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertRegex(response["Server-Timing"], SERVER_TIMING_PATTERN)
+        self.assertEqual(mock_logger.info.call_args.kwargs["view"], "AsyncWebhookView")
+
+    @override_settings(ROOT_URLCONF=__name__, PROFILING_VIEWS=['AsyncWebhookView', 'AsyncConversationDetailView'])
+    @patch('realmate_challenge_app.profiling.logger')
+    async def test_async_views_are_profiled_under_asgi(self, mock_logger):
+        conversation = await Conversation.objects.acreate()
+
+        response = await self.async_client.get(f"/conversations/{conversation.id}/", headers={"X-Profile": "secret"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], SERVER_TIMING_PATTERN)
+        summary = mock_logger.info.call_args.kwargs
+        self.assertEqual((summary["view"], summary["status"]), ("AsyncConversationDetailView", 200))
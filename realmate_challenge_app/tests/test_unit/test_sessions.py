@@ -0,0 +1,109 @@
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import redis
+from django.test import SimpleTestCase, override_settings
+
+from realmate_challenge_app.sessions import (
+    InMemorySessionWindows,
+    RedisSessionWindows,
+    get_session_windows,
+    memory_session_windows,
+    MSG_SESSION_WINDOWS_UNAVAILABLE,
+)
+
+BASE_TIMESTAMP = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class TestInMemorySessionWindows(SimpleTestCase):
+    def setUp(self):
+        self.windows = InMemorySessionWindows(gap_ms=5000)
+        self.conversation_id = uuid.uuid4()
+
+    def _observe(self, message_id, offset_seconds):
+        return self.windows.observe(self.conversation_id, message_id, BASE_TIMESTAMP + timedelta(seconds=offset_seconds))
+
+    def test_messages_within_gap_stay_in_open_burst(self):
+        self.assertEqual(self._observe("a", 0), [])
+        self.assertEqual(self._observe("b", 5), [])
+        self.assertEqual(self._observe("c", 10), [])
+
+        self.assertEqual(self.windows.flush(self.conversation_id), ["a", "b", "c"])
+
+    def test_gap_larger_than_window_closes_burst(self):
+        self._observe("a", 0)
+        self._observe("b", 3)
+
+        self.assertEqual(self._observe("c", 8.001), ["a", "b"])
+        self.assertEqual(self.windows.flush(self.conversation_id), ["c"])
+
+    def test_out_of_order_message_joins_open_burst(self):
+        self._observe("a", 10)
+
+        self.assertEqual(self._observe("b", 0), [])
+        self.assertEqual(self._observe("c", 14), [])
+        self.assertEqual(self.windows.flush(self.conversation_id), ["a", "b", "c"])
+
+    def test_flush_forgets_conversation(self):
+        self._observe("a", 0)
+        self.windows.flush(self.conversation_id)
+
+        self.assertEqual(self.windows.flush(self.conversation_id), [])
+        self.assertEqual(self._observe("b", 100), [])
+
+    def test_conversations_are_independent(self):
+        other_conversation_id = uuid.uuid4()
+        self._observe("a", 0)
+        self.windows.observe(other_conversation_id, "b", BASE_TIMESTAMP + timedelta(seconds=60))
+
+        self.assertEqual(self.windows.flush(self.conversation_id), ["a"])
+        self.assertEqual(self.windows.flush(other_conversation_id), ["b"])
+
+
+class TestRedisSessionWindows(SimpleTestCase):
+    def setUp(self):
+        self.windows = RedisSessionWindows(gap_ms=5000, idle_ttl_ms=60000)
+
+    def test_matches_in_memory_windows(self):
+        reference = InMemorySessionWindows(gap_ms=5000)
+        conversation_id = uuid.uuid4()
+        self.addCleanup(self.windows.flush, conversation_id)
+        offset = 0
+        for index in range(50):
+            offset += random.choice([0.5, 2, 5, 5.001, 7, -3])
+            timestamp = BASE_TIMESTAMP + timedelta(seconds=offset)
+            message_id = str(uuid.uuid4())
+
+            self.assertEqual(
+                self.windows.observe(conversation_id, message_id, timestamp),
+                reference.observe(conversation_id, message_id, timestamp),
+            )
+
+        self.assertEqual(self.windows.flush(conversation_id), reference.flush(conversation_id))
+
+    @patch('realmate_challenge_app.sessions.logger')
+    @patch('realmate_challenge_app.sessions.get_redis_client')
+    def test_redis_errors_are_logged_and_ignored(self, mock_get_redis_client, mock_logger):
+        error = redis.ConnectionError("down")
+        mock_get_redis_client.return_value.eval.side_effect = error
+        mock_get_redis_client.return_value.pipeline.return_value.execute.side_effect = error
+        conversation_id = uuid.uuid4()
+
+        self.assertEqual(self.windows.observe(conversation_id, "a", BASE_TIMESTAMP), [])
+        self.assertEqual(self.windows.flush(conversation_id), [])
+        mock_logger.warning.assert_called_with(MSG_SESSION_WINDOWS_UNAVAILABLE, conversation_id, error)
+
+
+class TestGetSessionWindows(SimpleTestCase):
+    @override_settings(SESSION_WINDOW_BACKEND="memory")
+    def test_memory_backend_is_shared_in_process(self):
+        self.assertIs(get_session_windows(), memory_session_windows)
+
+    @override_settings(SESSION_WINDOW_BACKEND="redis", SESSION_WINDOW_IDLE_TTL_SECONDS=10)
+    def test_redis_backend(self):
+        windows = get_session_windows()
+
+        self.assertIsInstance(windows, RedisSessionWindows)
+        self.assertEqual(windows.idle_ttl_ms, 10000)
@@ -0,0 +1,118 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from realmate_challenge_app import queries
+from realmate_challenge_app.management.commands.rebuild_conversation_snapshots import MSG_SNAPSHOTS_REBUILT
+from realmate_challenge_app.models import Conversation, ConversationSnapshot, Message
+from realmate_challenge_app.serializers.responses import MessageSerializer
+
+BASE_TIMESTAMP = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@override_settings(CONVERSATION_SNAPSHOT_TRANSCRIPT_SIZE=3)
+class TestConversationSnapshots(TestCase):
+    def setUp(self):
+        self.conversation_id = uuid.uuid4()
+        queries.insert_conversation(self.conversation_id)
+
+    def _insert_inbound(self, offset_seconds, content="Oi"):
+        message_id = uuid.uuid4()
+        queries.insert_inbound_message(
+            message_id, self.conversation_id, content, BASE_TIMESTAMP + timedelta(seconds=offset_seconds)
+        )
+        return message_id
+
+    def _create_outbound(self, offset_seconds):
+        message = Message.objects.create(
+            conversation_id_id=self.conversation_id,
+            type=Message.MessageType.OUTBOUND,
+            content="Resposta",
+            timestamp=BASE_TIMESTAMP + timedelta(seconds=offset_seconds),
+        )
+        queries.apply_messages_to_snapshots([message.id])
+        return message
+
+    def _snapshot(self):
+        return ConversationSnapshot.objects.get(conversation_id=self.conversation_id)
+
+    def _expected_transcript(self):
+        messages = Message.objects.filter(conversation_id=self.conversation_id).order_by("-timestamp", "-id")[:3]
+        return [dict(MessageSerializer(message).data) for message in reversed(messages)]
+
+    def test_new_conversation_starts_with_empty_snapshot(self):
+        snapshot = self._snapshot()
+
+        self.assertEqual((snapshot.message_count, snapshot.transcript), (0, []))
+        self.assertIsNone(snapshot.last_message_at)
+        self.assertIsNone(snapshot.last_outbound)
+
+    def test_inbound_message_is_applied_by_the_insert(self):
+        self._insert_inbound(1.5, content="Olá   \"mundo\"")
+
+        snapshot = self._snapshot()
+        self.assertEqual(snapshot.message_count, 1)
+        self.assertEqual(snapshot.last_message_at, BASE_TIMESTAMP + timedelta(seconds=1.5))
+        self.assertEqual(snapshot.transcript, self._expected_transcript())
+
+    def test_transcript_keeps_most_recent_messages_in_order(self):
+        for offset in (10, 0, 30, 20, 5):
+            self._insert_inbound(offset)
+        outbound = self._create_outbound(25)
+        self._create_outbound(2)
+
+        snapshot = self._snapshot()
+        self.assertEqual(snapshot.message_count, 7)
+        self.assertEqual(snapshot.last_message_at, BASE_TIMESTAMP + timedelta(seconds=30))
+        self.assertEqual(snapshot.last_outbound, dict(MessageSerializer(outbound).data))
+        self.assertEqual(snapshot.transcript, self._expected_transcript())
+
+    def test_duplicated_or_rejected_messages_are_not_applied(self):
+        message_id = self._insert_inbound(0)
+        queries.insert_inbound_message(message_id, self.conversation_id, "Oi", BASE_TIMESTAMP)
+        queries.close_conversation(self.conversation_id)
+        self._insert_inbound(1)
+
+        self.assertEqual(self._snapshot().message_count, 1)
+
+    def test_orphan_adoption_is_applied(self):
+        orphan_conversation_id = uuid.uuid4()
+        queries.insert_inbound_message(uuid.uuid4(), orphan_conversation_id, "Cheguei antes", BASE_TIMESTAMP)
+        queries.insert_conversation(orphan_conversation_id)
+
+        with override_settings(PENDING_MESSAGES_BACKEND="database"):
+            from realmate_challenge_app.pending import get_pending_buffer
+            get_pending_buffer().adopt([orphan_conversation_id])
+
+        snapshot = ConversationSnapshot.objects.get(conversation_id=orphan_conversation_id)
+        self.assertEqual(snapshot.message_count, 1)
+        self.assertEqual(snapshot.transcript[0]["content"], "Cheguei antes")
+
+    def test_rebuild_matches_incremental_snapshot(self):
+        for offset in (3, 1, 2.000001, 4):
+            self._insert_inbound(offset)
+        self._create_outbound(3.5)
+        incremental = self._snapshot()
+
+        ConversationSnapshot.objects.all().delete()
+        call_command("rebuild_conversation_snapshots", batch_size=1)
+
+        rebuilt = self._snapshot()
+        for field in ("message_count", "last_message_at", "last_outbound", "transcript"):
+            self.assertEqual(getattr(rebuilt, field), getattr(incremental, field), field)
+
+    @patch('realmate_challenge_app.management.commands.rebuild_conversation_snapshots.logger')
+    def test_rebuild_command_covers_every_conversation(self, mock_logger):
+        legacy_conversation = Conversation.objects.create()
+        Message.objects.create(conversation_id=legacy_conversation, content="Antiga", timestamp=BASE_TIMESTAMP)
+        self._insert_inbound(0)
+        ConversationSnapshot.objects.filter(conversation_id=self.conversation_id).update(message_count=42)
+
+        call_command("rebuild_conversation_snapshots", batch_size=1)
+
+        self.assertEqual(ConversationSnapshot.objects.get(conversation_id=legacy_conversation.id).message_count, 1)
+        self.assertEqual(self._snapshot().message_count, 1)
+        mock_logger.info.assert_called_once_with(MSG_SNAPSHOTS_REBUILT, count=2)
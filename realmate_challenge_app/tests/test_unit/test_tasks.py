@@ -1,25 +1,43 @@
 import uuid
-from datetime import datetime, timedelta
-from unittest.mock import patch, MagicMock, call
+from datetime import timedelta
+from unittest.mock import ANY, patch, MagicMock, call
 
-from django.test import TestCase
+import psycopg
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
 from realmate_challenge_app.tasks import (
     check_and_assign_conversation,
+    _get_single_and_grouped_message_ids,
     _get_single_and_grouped_messages,
     _build_message_summary,
-    _create_new_outbound_message,
+    _build_outbound_message,
     process_inbound_messages,
+    sweep_expired_orphan_messages,
+    flush_conversation,
+    reply_to_burst,
+    expire_orphan_messages,
+    fire_due_timers,
     INTERVAL_MINIMAL_EXPECTED,
+    TIMER_RETRY_DELAY_MS,
+    INBOUND_PROCESSING_LOCK_NAMESPACE,
     MSG_MESSAGE_ALREADY_HAS_CONVERSATION,
+    MSG_MESSAGE_ALREADY_ADOPTED_OR_REMOVED,
     MSG_MESSAGE_NO_CONVERSATION_OR_EXPECTED,
     MSG_CONVERSATION_NOT_FOUND_FOR_MESSAGE_DELETING,
+    MSG_CONVERSATION_NOT_OPEN_FOR_MESSAGE,
     MSG_MESSAGE_SUCCESSFULLY_ASSIGNED,
     MSG_MESSAGE_NOT_FOUND,
     MSG_ERROR_PROCESSING_MESSAGE_CELERY,
+    MSG_EXPIRED_ORPHAN_MESSAGES_SWEPT,
+    MSG_LATE_ORPHAN_MESSAGES_ADOPTED,
+    MSG_UNKNOWN_TIMER,
 )
 
+from realmate_challenge_app import queries
+from realmate_challenge_app.sessions import memory_session_windows
 from realmate_challenge_app.models import Message, Conversation
 
 
@@ -64,7 +82,7 @@ class TestCheckAndAssignConversation(MessageGroupingBaseTest):
 
         mock_atomic.assert_called_once()
         mock_logger.info.assert_called_once_with(
-            MSG_MESSAGE_ALREADY_HAS_CONVERSATION.format(message_id=mock_msg_instance.id)
+            MSG_MESSAGE_ALREADY_HAS_CONVERSATION, message_id=mock_msg_instance.id
         )
         mock_msg_instance.save.assert_not_called()
         mock_msg_instance.delete.assert_not_called()
@@ -80,7 +98,7 @@ class TestCheckAndAssignConversation(MessageGroupingBaseTest):
 
         mock_atomic.assert_called_once()
         mock_logger.warning.assert_called_once_with(
-            MSG_MESSAGE_NO_CONVERSATION_OR_EXPECTED.format(message_id=mock_msg_instance.id)
+            MSG_MESSAGE_NO_CONVERSATION_OR_EXPECTED, message_id=mock_msg_instance.id
         )
         mock_msg_instance.delete.assert_called_once()
         mock_msg_instance.save.assert_not_called()
@@ -104,13 +122,31 @@ class TestCheckAndAssignConversation(MessageGroupingBaseTest):
         self.assertEqual(mock_msg_instance.conversation_id, mock_conv_instance)
         mock_msg_instance.save.assert_called_once()
         mock_logger.info.assert_called_once_with(
-            MSG_MESSAGE_SUCCESSFULLY_ASSIGNED.format(
-                message_id=mock_msg_instance.id,
-                conversation_id=mock_expected_conv_id
-            )
+            MSG_MESSAGE_SUCCESSFULLY_ASSIGNED, message_id=mock_msg_instance.id, conversation_id=mock_expected_conv_id
         )
         mock_msg_instance.delete.assert_not_called()
 
+    @patch('realmate_challenge_app.tasks.transaction.atomic')
+    @patch('realmate_challenge_app.tasks.logger')
+    @patch('realmate_challenge_app.tasks.Conversation.objects')
+    @patch('realmate_challenge_app.tasks.Message.objects')
+    def test_closed_conversation_leaves_message(self, mock_message_objects, mock_conversation_objects, mock_logger, mock_atomic):
+        mock_expected_conv_id = uuid.uuid4()
+        mock_msg_instance = self._create_mock_message(conversation_id=None, expected_conversation_id=mock_expected_conv_id)
+        mock_conv_instance = self._create_mock_conversation(conv_id=mock_expected_conv_id, status="CLOSED")
+
+        mock_message_objects.select_for_update.return_value.get.return_value = mock_msg_instance
+        mock_conversation_objects.get.return_value = mock_conv_instance
+
+        check_and_assign_conversation(str(mock_msg_instance.id))
+
+        self.assertIsNone(mock_msg_instance.conversation_id)
+        mock_msg_instance.save.assert_not_called()
+        mock_msg_instance.delete.assert_not_called()
+        mock_logger.info.assert_called_once_with(
+            MSG_CONVERSATION_NOT_OPEN_FOR_MESSAGE, conversation_id=mock_expected_conv_id, message_id=mock_msg_instance.id
+        )
+
     @patch('realmate_challenge_app.tasks.transaction.atomic')
     @patch('realmate_challenge_app.tasks.logger')
     @patch('realmate_challenge_app.tasks.Conversation.objects')
@@ -129,10 +165,7 @@ class TestCheckAndAssignConversation(MessageGroupingBaseTest):
         mock_msg_instance.delete.assert_called_once()
         mock_msg_instance.save.assert_not_called()
         mock_logger.warning.assert_called_once_with(
-            MSG_CONVERSATION_NOT_FOUND_FOR_MESSAGE_DELETING.format(
-                conversation_id=non_existent_conversation_id,
-                message_id=mock_msg_instance.id
-            )
+            MSG_CONVERSATION_NOT_FOUND_FOR_MESSAGE_DELETING, conversation_id=non_existent_conversation_id, message_id=mock_msg_instance.id
         )
 
     @patch('realmate_challenge_app.tasks.transaction.atomic')
@@ -146,24 +179,142 @@ class TestCheckAndAssignConversation(MessageGroupingBaseTest):
 
         mock_atomic.assert_called_once()
         mock_logger.info.assert_called_once_with(
-            MSG_MESSAGE_NOT_FOUND.format(message_id=non_existent_message_id)
+            MSG_MESSAGE_NOT_FOUND, message_id=str(non_existent_message_id)
         )
 
     @patch('realmate_challenge_app.tasks.transaction.atomic')
     @patch('realmate_challenge_app.tasks.logger')
-    @patch('realmate_challenge_app.tasks.Message.objects.select_for_update')
-    def test_unexpected_exception_handling(self, mock_select_for_update, mock_logger, mock_atomic):
+    @patch('realmate_challenge_app.tasks.Message.objects')
+    def test_unexpected_exception_handling(self, mock_message_objects, mock_logger, mock_atomic):
         mock_message_id = uuid.uuid4()
-        mock_select_for_update.side_effect = Exception("Simulated DB Error")
+        mock_message_objects.select_for_update.side_effect = Exception("Simulated DB Error")
 
         check_and_assign_conversation(str(mock_message_id))
 
         mock_atomic.assert_called_once()
         mock_logger.error.assert_called_once_with(
-            MSG_ERROR_PROCESSING_MESSAGE_CELERY.format(message_id=mock_message_id, exc="Simulated DB Error")
+            MSG_ERROR_PROCESSING_MESSAGE_CELERY, message_id=str(mock_message_id), exc=ANY
+        )
+        self.assertEqual(str(mock_logger.error.call_args.kwargs["exc"]), "Simulated DB Error")
+
+
+    @patch('realmate_challenge_app.tasks.transaction.atomic')
+    @patch('realmate_challenge_app.tasks.logger')
+    @patch('realmate_challenge_app.tasks.Message.objects')
+    def test_message_already_adopted_skips_locking(self, mock_message_objects, mock_logger, mock_atomic):
+        mock_message_id = uuid.uuid4()
+        mock_message_objects.filter.return_value.exists.return_value = False
+
+        check_and_assign_conversation(str(mock_message_id))
+
+        mock_message_objects.filter.assert_called_once_with(id=str(mock_message_id), conversation_id__isnull=True)
+        mock_atomic.assert_not_called()
+        mock_message_objects.select_for_update.assert_not_called()
+        mock_logger.info.assert_called_once_with(
+            MSG_MESSAGE_ALREADY_ADOPTED_OR_REMOVED, message_id=str(mock_message_id)
         )
 
 
+class TestSweepExpiredOrphanMessages(MessageGroupingBaseTest):
+
+    def _create_orphan_message(self, age_seconds):
+        message = Message.objects.create(
+            content="test",
+            timestamp=self.now,
+            expected_conversation_id=uuid.uuid4(),
+        )
+        Message.objects.filter(id=message.id).update(created_at=self.now - timedelta(seconds=age_seconds))
+        return message
+
+    @patch('realmate_challenge_app.tasks.logger')
+    def test_deletes_only_expired_orphans_in_batches(self, mock_logger):
+        expired_messages = [self._create_orphan_message(age_seconds=10) for _ in range(3)]
+        recent_message = self._create_orphan_message(age_seconds=1)
+        conversation = Conversation.objects.create()
+        adopted_message = Message.objects.create(conversation_id=conversation, content="test", timestamp=self.now)
+        Message.objects.filter(id=adopted_message.id).update(created_at=self.now - timedelta(seconds=10))
+
+        deleted = sweep_expired_orphan_messages(batch_size=2)
+
+        self.assertEqual(deleted, 3)
+        self.assertFalse(Message.objects.filter(id__in=[message.id for message in expired_messages]).exists())
+        self.assertTrue(Message.objects.filter(id=recent_message.id).exists())
+        self.assertTrue(Message.objects.filter(id=adopted_message.id).exists())
+        mock_logger.info.assert_called_once_with(MSG_EXPIRED_ORPHAN_MESSAGES_SWEPT, count=3)
+
+    @patch('realmate_challenge_app.tasks.schedule_conversation_flush', MagicMock())
+    @patch('realmate_challenge_app.tasks.logger')
+    def test_adopts_late_orphans_in_batches(self, mock_logger):
+        conversation = Conversation.objects.create()
+        late_messages = [
+            Message.objects.create(content="test", timestamp=self.now, expected_conversation_id=conversation.id)
+            for _ in range(3)
+        ]
+
+        sweep_expired_orphan_messages(batch_size=2)
+
+        self.assertEqual(Message.objects.filter(conversation_id=conversation).count(), 3)
+        self.assertEqual(
+            [logged.kwargs["count"] for logged in mock_logger.info.call_args_list
+             if logged.args == (MSG_LATE_ORPHAN_MESSAGES_ADOPTED,)],
+            [2, 1],
+        )
+        self.assertFalse(Message.objects.filter(
+            id__in=[message.id for message in late_messages], expected_conversation_id__isnull=False
+        ).exists())
+
+    @patch('realmate_challenge_app.tasks.logger')
+    def test_nothing_to_sweep(self, mock_logger):
+        self.assertEqual(sweep_expired_orphan_messages(), 0)
+        mock_logger.info.assert_not_called()
+
+
+class TestGetSingleAndGroupedMessageIds(MessageGroupingBaseTest):
+
+    def _create_messages(self, conversation, offsets_seconds, **kwargs):
+        return [
+            Message.objects.create(
+                conversation_id=conversation,
+                content="test",
+                timestamp=self.now + timedelta(seconds=offset),
+                **kwargs
+            )
+            for offset in offsets_seconds
+        ]
+
+    def test_matches_python_reference_implementation(self):
+        offsets_by_conversation = [
+            [0],
+            [0, 2, 4],
+            [0, INTERVAL_MINIMAL_EXPECTED, INTERVAL_MINIMAL_EXPECTED * 2 + 1, 30, 31, 60],
+            [0, 10, 20, 30],
+        ]
+        conversations = []
+        for offsets in offsets_by_conversation:
+            conversation = Conversation.objects.create()
+            self._create_messages(conversation, offsets)
+            conversations.append(conversation)
+
+        message_ids = _get_single_and_grouped_message_ids()
+
+        self.assertEqual(set(message_ids), {conversation.id for conversation in conversations})
+        for conversation in conversations:
+            grouped, individual = _get_single_and_grouped_messages(conversation.id)
+            self.assertEqual(
+                message_ids[conversation.id],
+                ([message.id for message in grouped], [message.id for message in individual]),
+            )
+
+    def test_ignores_processed_outbound_and_orphan_messages(self):
+        conversation = Conversation.objects.create()
+        pending = self._create_messages(conversation, [0])
+        self._create_messages(conversation, [1], processed=True)
+        self._create_messages(conversation, [2], type=Message.MessageType.OUTBOUND)
+        Message.objects.create(content="test", timestamp=self.now, expected_conversation_id=uuid.uuid4())
+
+        self.assertEqual(_get_single_and_grouped_message_ids(), {conversation.id: ([], [pending[0].id])})
+
+
 class TestGetSingleAndGroupedMessages(MessageGroupingBaseTest):
 
     @patch('realmate_challenge_app.tasks.Message.objects')
@@ -225,176 +376,417 @@ class TestBuildMessageSummary(TestCase):
         self.assertEqual(result, expected)
 
 
-class TestCreateNewOutboundMessage(MessageGroupingBaseTest):
+class TestBuildOutboundMessage(MessageGroupingBaseTest):
 
-    @patch('realmate_challenge_app.tasks.Message.objects')
     @patch('realmate_challenge_app.tasks.Conversation.objects')
     @patch('realmate_challenge_app.tasks.timezone.now')
-    def test_create_outbound_message_success(self, mock_timezone_now, mock_conversation_objects, mock_message_objects):
-        mock_conv = self._create_mock_conversation(conv_id=self.conversation_id)
-        mock_conversation_objects.get.return_value = mock_conv
+    def test_build_outbound_message_without_fetching_conversation(self, mock_timezone_now, mock_conversation_objects):
         mock_timezone_now.return_value = self.now
-        
-        mock_created_message = self._create_mock_message(
-            conversation_id=mock_conv.id, content="Summary", processed=True, type="OUTBOUND"
-        )
-        mock_message_objects.create.return_value = mock_created_message
 
         content = "Test summary content"
-        result = _create_new_outbound_message(str(self.conversation_id), content)
-
-        mock_conversation_objects.get.assert_called_once_with(id=str(self.conversation_id))
-        mock_message_objects.create.assert_called_once_with(
-            conversation_id=mock_conv,
-            content=content,
-            processed=True,
-            type=Message.MessageType.OUTBOUND,
-            timestamp=self.now,
-        )
-        self.assertEqual(result, mock_created_message)
+        result = _build_outbound_message(self.conversation_id, content)
 
-    @patch('realmate_challenge_app.tasks.Message.objects')
-    @patch('realmate_challenge_app.tasks.Conversation.objects')
-    @patch('realmate_challenge_app.tasks.timezone.now')
-    def test_create_outbound_message_conversation_not_found(self, mock_timezone_now, mock_conversation_objects, mock_message_objects):
-        mock_conversation_objects.get.side_effect = Conversation.DoesNotExist
-
-        content = "Test summary content"
-        
-        with self.assertRaises(Conversation.DoesNotExist):
-            _create_new_outbound_message(str(self.conversation_id), content)
-
-        mock_conversation_objects.get.assert_called_once_with(id=str(self.conversation_id))
-        mock_message_objects.create.assert_not_called()
+        mock_conversation_objects.get.assert_not_called()
+        self.assertFalse(Message.objects.filter(pk=result.pk).exists())
+        self.assertEqual(result.conversation_id_id, self.conversation_id)
+        self.assertEqual(result.content, content)
+        self.assertTrue(result.processed)
+        self.assertEqual(result.type, Message.MessageType.OUTBOUND)
+        self.assertEqual(result.timestamp, self.now)
 
 
 class TestProcessInboundMessages(MessageGroupingBaseTest):
 
+    @patch('realmate_challenge_app.tasks.queries.claim_pending_conversations')
     @patch('realmate_challenge_app.tasks.logger')
-    @patch('realmate_challenge_app.tasks._create_new_outbound_message')
+    @patch('realmate_challenge_app.tasks._build_outbound_message')
     @patch('realmate_challenge_app.tasks._build_message_summary')
-    @patch('realmate_challenge_app.tasks._get_single_and_grouped_messages')
+    @patch('realmate_challenge_app.tasks._get_single_and_grouped_message_ids')
     @patch('realmate_challenge_app.tasks.Message.objects')
-    @patch('realmate_challenge_app.tasks.Conversation.objects')
-    def test_no_conversations(self, mock_conversation_objects, mock_message_objects,
-                               mock_get_messages, mock_build_summary, mock_create_outbound, mock_logger):
-        mock_conversation_objects.values_list.return_value = []
+    def test_no_conversations(self, mock_message_objects,
+                               mock_get_messages, mock_build_summary, mock_build_outbound, mock_logger,
+                               mock_claim):
+        mock_claim.return_value = []
         result = process_inbound_messages()
         self.assertEqual(result, [])
+        mock_claim.assert_called_once_with(0, 1, INBOUND_PROCESSING_LOCK_NAMESPACE)
         mock_get_messages.assert_not_called()
         mock_build_summary.assert_not_called()
-        mock_create_outbound.assert_not_called()
+        mock_build_outbound.assert_not_called()
+        mock_message_objects.bulk_create.assert_not_called()
         mock_message_objects.filter.assert_not_called()
 
+    @patch('realmate_challenge_app.tasks.queries.mark_messages_processed', return_value={})
+    @patch('realmate_challenge_app.tasks.queries.claim_pending_conversations')
     @patch('realmate_challenge_app.tasks.logger')
-    @patch('realmate_challenge_app.tasks._create_new_outbound_message')
+    @patch('realmate_challenge_app.tasks._build_outbound_message')
     @patch('realmate_challenge_app.tasks._build_message_summary')
-    @patch('realmate_challenge_app.tasks._get_single_and_grouped_messages')
+    @patch('realmate_challenge_app.tasks._get_single_and_grouped_message_ids')
     @patch('realmate_challenge_app.tasks.Message.objects')
-    @patch('realmate_challenge_app.tasks.Conversation.objects')
-    def test_only_single_messages_processed(self, mock_conversation_objects, mock_message_objects,
-                                            mock_get_messages, mock_build_summary, mock_create_outbound, mock_logger):
+    def test_only_single_messages_processed(self, mock_message_objects,
+                                            mock_get_messages, mock_build_summary, mock_build_outbound, mock_logger,
+                               mock_claim, mock_mark_processed):
         conv_id = self.conversation_id
-        mock_conversation_objects.values_list.return_value = [conv_id]
 
         msg1 = self._create_mock_message(0, message_id=uuid.uuid4())
         msg2 = self._create_mock_message(INTERVAL_MINIMAL_EXPECTED + 10, message_id=uuid.uuid4())
-        
-        mock_get_messages.return_value = ([], [msg1, msg2])
+
+        mock_claim.return_value = [conv_id]
+        mock_get_messages.return_value = {conv_id: ([], [msg1.id, msg2.id])}
 
         mock_build_summary.return_value = "Summary for individual messages"
-        mock_create_outbound.return_value = self._create_mock_message(type="OUTBOUND", processed=True)
-        
-        mock_message_objects.filter.return_value.update.return_value = 2
+        outbound_message = self._create_mock_message(type="OUTBOUND", processed=True)
+        mock_build_outbound.return_value = outbound_message
 
         result = process_inbound_messages()
 
-        mock_conversation_objects.values_list.assert_called_once_with("id", flat=True)
-        mock_get_messages.assert_called_once_with(conv_id)
-        
+        mock_get_messages.assert_called_once_with([conv_id])
         mock_build_summary.assert_called_once_with([str(msg1.id), str(msg2.id)])
-        mock_create_outbound.assert_called_once_with(conv_id, "Summary for individual messages")
-        mock_logger.info.assert_called_once_with("Summary for individual messages")
-        mock_message_objects.filter.assert_called_once_with(id__in=[str(msg1.id), str(msg2.id)])
-        mock_message_objects.filter.return_value.update.assert_called_once_with(processed=True)
+        mock_build_outbound.assert_called_once_with(conv_id, "Summary for individual messages")
+        mock_logger.debug.assert_called_once_with("Summary for individual messages")
+        mock_message_objects.bulk_create.assert_called_once_with([outbound_message])
+        mock_mark_processed.assert_called_once_with([str(msg1.id), str(msg2.id)])
         self.assertEqual(result, ["Summary for individual messages"])
 
+    @patch('realmate_challenge_app.tasks.queries.mark_messages_processed', return_value={})
+    @patch('realmate_challenge_app.tasks.queries.claim_pending_conversations')
     @patch('realmate_challenge_app.tasks.logger')
-    @patch('realmate_challenge_app.tasks._create_new_outbound_message')
+    @patch('realmate_challenge_app.tasks._build_outbound_message')
     @patch('realmate_challenge_app.tasks._build_message_summary')
-    @patch('realmate_challenge_app.tasks._get_single_and_grouped_messages')
+    @patch('realmate_challenge_app.tasks._get_single_and_grouped_message_ids')
     @patch('realmate_challenge_app.tasks.Message.objects')
-    @patch('realmate_challenge_app.tasks.Conversation.objects')
-    def test_only_grouped_messages_processed(self, mock_conversation_objects, mock_message_objects,
-                                             mock_get_messages, mock_build_summary, mock_create_outbound, mock_logger):
+    def test_only_grouped_messages_processed(self, mock_message_objects,
+                                             mock_get_messages, mock_build_summary, mock_build_outbound, mock_logger,
+                               mock_claim, mock_mark_processed):
         conv_id = self.conversation_id
-        mock_conversation_objects.values_list.return_value = [conv_id]
 
         msg1 = self._create_mock_message(0, message_id=uuid.uuid4())
         msg2 = self._create_mock_message(INTERVAL_MINIMAL_EXPECTED - 1, message_id=uuid.uuid4())
-        
-        mock_get_messages.return_value = ([msg1, msg2], [])
+
+        mock_claim.return_value = [conv_id]
+        mock_get_messages.return_value = {conv_id: ([msg1.id, msg2.id], [])}
 
         mock_build_summary.return_value = "Summary for grouped messages"
-        mock_create_outbound.return_value = self._create_mock_message(type="OUTBOUND", processed=True)
-        mock_message_objects.filter.return_value.update.return_value = 2
+        outbound_message = self._create_mock_message(type="OUTBOUND", processed=True)
+        mock_build_outbound.return_value = outbound_message
 
         result = process_inbound_messages()
 
-        mock_get_messages.assert_called_once_with(conv_id)
+        mock_get_messages.assert_called_once_with([conv_id])
         mock_build_summary.assert_called_once_with([str(msg1.id), str(msg2.id)])
-        mock_create_outbound.assert_called_once_with(conv_id, "Summary for grouped messages")
-        mock_logger.info.assert_called_once_with("Summary for grouped messages")
-        mock_message_objects.filter.assert_called_once_with(id__in=[str(msg1.id), str(msg2.id)])
-        mock_message_objects.filter.return_value.update.assert_called_once_with(processed=True)
+        mock_build_outbound.assert_called_once_with(conv_id, "Summary for grouped messages")
+        mock_logger.debug.assert_called_once_with("Summary for grouped messages")
+        mock_message_objects.bulk_create.assert_called_once_with([outbound_message])
+        mock_mark_processed.assert_called_once_with([str(msg1.id), str(msg2.id)])
         self.assertEqual(result, ["Summary for grouped messages"])
 
+    @patch('realmate_challenge_app.tasks.queries.mark_messages_processed', return_value={})
+    @patch('realmate_challenge_app.tasks.queries.claim_pending_conversations')
     @patch('realmate_challenge_app.tasks.logger')
-    @patch('realmate_challenge_app.tasks._create_new_outbound_message')
+    @patch('realmate_challenge_app.tasks._build_outbound_message')
     @patch('realmate_challenge_app.tasks._build_message_summary')
-    @patch('realmate_challenge_app.tasks._get_single_and_grouped_messages')
+    @patch('realmate_challenge_app.tasks._get_single_and_grouped_message_ids')
     @patch('realmate_challenge_app.tasks.Message.objects')
-    @patch('realmate_challenge_app.tasks.Conversation.objects')
-    def test_both_single_and_grouped_messages_processed(self, mock_conversation_objects, mock_message_objects,
-                                                        mock_get_messages, mock_build_summary, mock_create_outbound, mock_logger):
+    def test_both_single_and_grouped_messages_processed(self, mock_message_objects,
+                                                        mock_get_messages, mock_build_summary, mock_build_outbound, mock_logger,
+                               mock_claim, mock_mark_processed):
         conv_id = self.conversation_id
-        mock_conversation_objects.values_list.return_value = [conv_id]
+        other_conv_id = uuid.uuid4()
 
         msg_ind = self._create_mock_message(0, message_id=uuid.uuid4())
         msg_g1 = self._create_mock_message(INTERVAL_MINIMAL_EXPECTED + 10, message_id=uuid.uuid4())
         msg_g2 = self._create_mock_message(INTERVAL_MINIMAL_EXPECTED + 12, message_id=uuid.uuid4())
-        
-        mock_get_messages.return_value = ([msg_g1, msg_g2], [msg_ind])
+        msg_other = self._create_mock_message(0, message_id=uuid.uuid4())
+
+        mock_claim.return_value = [conv_id, other_conv_id]
+        mock_get_messages.return_value = {
+            conv_id: ([msg_g1.id, msg_g2.id], [msg_ind.id]),
+            other_conv_id: ([], [msg_other.id]),
+        }
 
         mock_build_summary.side_effect = [
             "Summary for individual",
-            "Summary for grouped"
+            "Summary for grouped",
+            "Summary for other conversation",
         ]
-        mock_create_outbound.side_effect = [
+        outbound_messages = [
             self._create_mock_message(type="OUTBOUND", processed=True, content="Summary for individual"),
-            self._create_mock_message(type="OUTBOUND", processed=True, content="Summary for grouped")
+            self._create_mock_message(type="OUTBOUND", processed=True, content="Summary for grouped"),
+            self._create_mock_message(type="OUTBOUND", processed=True, content="Summary for other conversation"),
         ]
-        mock_message_objects.filter.return_value.update.side_effect = [1, 2]
+        mock_build_outbound.side_effect = outbound_messages
 
         result = process_inbound_messages()
 
-        mock_get_messages.assert_called_once_with(conv_id)
+        mock_get_messages.assert_called_once_with([conv_id, other_conv_id])
 
         mock_build_summary.assert_any_call([str(msg_ind.id)])
-        mock_create_outbound.assert_any_call(conv_id, "Summary for individual")
-        mock_logger.info.assert_any_call("Summary for individual")
-        mock_message_objects.filter.assert_any_call(id__in=[str(msg_ind.id)])
-        mock_message_objects.filter.return_value.update.assert_any_call(processed=True)
+        mock_build_outbound.assert_any_call(conv_id, "Summary for individual")
+        mock_logger.debug.assert_any_call("Summary for individual")
 
         mock_build_summary.assert_any_call([str(msg_g1.id), str(msg_g2.id)])
-        mock_create_outbound.assert_any_call(conv_id, "Summary for grouped")
-        mock_logger.info.assert_any_call("Summary for grouped")
-        mock_message_objects.filter.assert_any_call(id__in=[str(msg_g1.id), str(msg_g2.id)])
-        
-        self.assertEqual(mock_build_summary.call_count, 2)
-        self.assertEqual(mock_create_outbound.call_count, 2)
-        self.assertEqual(mock_logger.info.call_count, 2)
-        self.assertEqual(mock_message_objects.filter.call_count, 2)
-        self.assertEqual(mock_message_objects.filter.return_value.update.call_count, 2)
-
-        self.assertEqual(result, ["Summary for individual", "Summary for grouped"])
+        mock_build_outbound.assert_any_call(conv_id, "Summary for grouped")
+        mock_logger.debug.assert_any_call("Summary for grouped")
+
+        mock_build_summary.assert_any_call([str(msg_other.id)])
+        mock_build_outbound.assert_any_call(other_conv_id, "Summary for other conversation")
+
+        self.assertEqual(mock_build_summary.call_count, 3)
+        self.assertEqual(mock_build_outbound.call_count, 3)
+        self.assertEqual(mock_logger.debug.call_count, 3)
+        mock_message_objects.bulk_create.assert_called_once_with(outbound_messages)
+        mock_mark_processed.assert_called_once_with(
+            [str(msg_ind.id), str(msg_g1.id), str(msg_g2.id), str(msg_other.id)]
+        )
+
+        self.assertEqual(result, ["Summary for individual", "Summary for grouped", "Summary for other conversation"])
+
+    def test_outbound_messages_and_processed_flags_written_together(self):
+        conversation = Conversation.objects.create()
+        inbound = Message.objects.create(conversation_id=conversation, content="test", timestamp=self.now)
+
+        with self.assertNumQueries(8):
+            result = process_inbound_messages()
+
+        self.assertEqual(result, [_build_message_summary([str(inbound.id)])])
+        inbound.refresh_from_db()
+        self.assertTrue(inbound.processed)
+        outbound = Message.objects.get(type=Message.MessageType.OUTBOUND)
+        self.assertEqual(outbound.conversation_id_id, conversation.id)
+        self.assertEqual(outbound.content, result[0])
+
+    @override_settings(INBOUND_PROCESSING_SHARDS=3)
+    @patch('realmate_challenge_app.tasks.process_inbound_messages_shard')
+    @patch('realmate_challenge_app.tasks.group')
+    def test_fans_out_one_task_per_shard(self, mock_group, mock_shard_task):
+        result = process_inbound_messages()
+
+        self.assertEqual(result, [])
+        self.assertEqual(
+            list(mock_group.call_args.args[0]),
+            [mock_shard_task.s.return_value] * 3,
+        )
+        mock_shard_task.s.assert_has_calls([call(0, 3), call(1, 3), call(2, 3)])
+        mock_group.return_value.apply_async.assert_called_once_with()
+
+
+class TestClaimPendingConversations(MessageGroupingBaseTest):
+
+    def _create_pending_conversation(self):
+        conversation = Conversation.objects.create()
+        Message.objects.create(conversation_id=conversation, content="test", timestamp=self.now)
+        return conversation
+
+    def test_shards_partition_pending_conversations(self):
+        conversations = [self._create_pending_conversation() for _ in range(10)]
+        Conversation.objects.create()
+
+        claimed = [
+            queries.claim_pending_conversations(shard, 3, INBOUND_PROCESSING_LOCK_NAMESPACE)
+            for shard in range(3)
+        ]
+
+        self.assertEqual(sum(len(shard_claim) for shard_claim in claimed), 10)
+        self.assertEqual(
+            {conversation_id for shard_claim in claimed for conversation_id in shard_claim},
+            {conversation.id for conversation in conversations},
+        )
+
+    def test_conversation_locked_by_another_run_is_skipped(self):
+        locked_conversation = self._create_pending_conversation()
+        free_conversation = self._create_pending_conversation()
+        database = settings.DATABASES['default']
+        other_connection = psycopg.connect(
+            dbname=connection.settings_dict['NAME'],
+            user=database['USER'],
+            password=database['PASSWORD'],
+            host=database['HOST'],
+            port=database['PORT'],
+        )
+        self.addCleanup(other_connection.close)
+        with other_connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_lock(%s, hashtext(%s))",
+                [INBOUND_PROCESSING_LOCK_NAMESPACE, str(locked_conversation.id)],
+            )
+
+        claimed = queries.claim_pending_conversations(0, 1, INBOUND_PROCESSING_LOCK_NAMESPACE)
+
+        self.assertEqual(claimed, [free_conversation.id])
+
+
+class TestTimerHandlers(MessageGroupingBaseTest):
+
+    def _lock_from_another_connection(self, conversation_id):
+        database = settings.DATABASES['default']
+        other_connection = psycopg.connect(
+            dbname=connection.settings_dict['NAME'],
+            user=database['USER'],
+            password=database['PASSWORD'],
+            host=database['HOST'],
+            port=database['PORT'],
+        )
+        self.addCleanup(other_connection.close)
+        with other_connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_lock(%s, hashtext(%s))",
+                [INBOUND_PROCESSING_LOCK_NAMESPACE, str(conversation_id)],
+            )
+
+    def test_flush_conversation_processes_only_that_conversation(self):
+        conversation = Conversation.objects.create()
+        other_conversation = Conversation.objects.create()
+        inbound = Message.objects.create(conversation_id=conversation, content="test", timestamp=self.now)
+        other_inbound = Message.objects.create(conversation_id=other_conversation, content="test", timestamp=self.now)
+
+        result = flush_conversation(str(conversation.id))
+
+        self.assertEqual(result, [_build_message_summary([str(inbound.id)])])
+        self.assertTrue(Message.objects.get(id=inbound.id).processed)
+        self.assertFalse(Message.objects.get(id=other_inbound.id).processed)
+
+    def test_flush_conversation_returns_none_when_already_claimed(self):
+        conversation = Conversation.objects.create()
+        inbound = Message.objects.create(conversation_id=conversation, content="test", timestamp=self.now)
+        self._lock_from_another_connection(conversation.id)
+
+        self.assertIsNone(flush_conversation(str(conversation.id)))
+        self.assertFalse(Message.objects.get(id=inbound.id).processed)
+
+    @override_settings(SESSION_WINDOW_BACKEND="memory")
+    def test_flush_conversation_replies_to_open_burst_first(self):
+        conversation = Conversation.objects.create()
+        burst = [
+            Message.objects.create(conversation_id=conversation, content="test", timestamp=self.now + timedelta(seconds=offset))
+            for offset in (0, 3)
+        ]
+        unobserved = Message.objects.create(conversation_id=conversation, content="test", timestamp=self.now)
+        for message in burst:
+            memory_session_windows.observe(conversation.id, message.id, message.timestamp)
+
+        result = flush_conversation(str(conversation.id))
+
+        self.assertEqual(result, [
+            _build_message_summary([str(message.id) for message in burst]),
+            _build_message_summary([str(unobserved.id)]),
+        ])
+        self.assertEqual(memory_session_windows.flush(conversation.id), [])
+
+    def test_reply_to_burst_skips_already_processed_messages(self):
+        conversation = Conversation.objects.create()
+        pending = Message.objects.create(conversation_id=conversation, content="test", timestamp=self.now)
+        processed = Message.objects.create(conversation_id=conversation, content="test", timestamp=self.now, processed=True)
+
+        result = reply_to_burst(str(conversation.id), [str(processed.id), str(pending.id)])
+
+        self.assertEqual(result, _build_message_summary([str(pending.id)]))
+        self.assertTrue(Message.objects.get(id=pending.id).processed)
+        self.assertEqual(Message.objects.filter(type=Message.MessageType.OUTBOUND).count(), 1)
+        self.assertIsNone(reply_to_burst(str(conversation.id), [str(pending.id)]))
+        self.assertEqual(Message.objects.filter(type=Message.MessageType.OUTBOUND).count(), 1)
+
+    @patch('realmate_challenge_app.tasks.logger')
+    def test_expire_orphan_messages_only_for_that_conversation(self, mock_logger):
+        expected_conversation_id = uuid.uuid4()
+        expired = Message.objects.create(content="test", timestamp=self.now, expected_conversation_id=expected_conversation_id)
+        recent = Message.objects.create(content="test", timestamp=self.now, expected_conversation_id=expected_conversation_id)
+        other = Message.objects.create(content="test", timestamp=self.now, expected_conversation_id=uuid.uuid4())
+        Message.objects.filter(id__in=[expired.id, other.id]).update(created_at=self.now - timedelta(seconds=10))
+
+        deleted = expire_orphan_messages(str(expected_conversation_id))
+
+        self.assertEqual(deleted, 1)
+        self.assertEqual(set(Message.objects.values_list("id", flat=True)), {recent.id, other.id})
+        mock_logger.info.assert_called_once_with(MSG_EXPIRED_ORPHAN_MESSAGES_SWEPT, count=1)
+
+
+    @patch('realmate_challenge_app.tasks.logger', MagicMock())
+    def test_expiry_adopts_orphans_stored_after_their_conversation(self):
+        conversation = Conversation.objects.create()
+        late = Message.objects.create(content="test", timestamp=self.now, expected_conversation_id=conversation.id)
+        expired = Message.objects.create(content="test", timestamp=self.now, expected_conversation_id=conversation.id)
+        # The late orphan committed right after the conversation; the other
+        # one had already expired when the conversation was created.
+        Conversation.objects.filter(id=conversation.id).update(created_at=self.now - timedelta(seconds=9))
+        Message.objects.filter(id=late.id).update(created_at=self.now - timedelta(seconds=10))
+        Message.objects.filter(id=expired.id).update(created_at=self.now - timedelta(seconds=20))
+
+        with patch('realmate_challenge_app.tasks.schedule_conversation_flush') as mock_schedule_flush:
+            with self.captureOnCommitCallbacks(execute=True):
+                deleted = expire_orphan_messages(str(conversation.id))
+
+        self.assertEqual(deleted, 1)
+        self.assertEqual(Message.objects.get(id=late.id).conversation_id_id, conversation.id)
+        self.assertFalse(Message.objects.filter(id=expired.id).exists())
+        mock_schedule_flush.assert_called_once_with({conversation.id})
+
+class TestFireDueTimers(TestCase):
+
+    @patch('realmate_challenge_app.tasks.TIMER_HANDLERS')
+    @patch('realmate_challenge_app.tasks.timer_service')
+    def test_dispatches_and_acks_due_timers(self, mock_timer_service, mock_handlers):
+        flush_handler = MagicMock(return_value=[])
+        expire_handler = MagicMock(return_value=0)
+        mock_handlers.get.side_effect = {"flush": flush_handler, "expire": expire_handler}.get
+        mock_timer_service.claim.return_value = ["flush:a", "expire:b"]
+
+        self.assertEqual(fire_due_timers(limit=10), 2)
+
+        mock_timer_service.claim.assert_called_once_with(10)
+        flush_handler.assert_called_once_with("a")
+        expire_handler.assert_called_once_with("b")
+        mock_timer_service.ack.assert_called_once_with(["flush:a", "expire:b"])
+        mock_timer_service.schedule.assert_not_called()
+
+    @patch('realmate_challenge_app.tasks.TIMER_HANDLERS')
+    @patch('realmate_challenge_app.tasks.timer_service')
+    def test_busy_flush_is_rescheduled(self, mock_timer_service, mock_handlers):
+        mock_handlers.get.return_value = MagicMock(return_value=None)
+        mock_timer_service.claim.return_value = ["flush:a"]
+
+        fire_due_timers()
+
+        mock_timer_service.schedule.assert_called_once_with("flush:a", TIMER_RETRY_DELAY_MS)
+        mock_timer_service.ack.assert_called_once_with(["flush:a"])
+
+    @patch('realmate_challenge_app.tasks.logger')
+    @patch('realmate_challenge_app.tasks.TIMER_HANDLERS')
+    @patch('realmate_challenge_app.tasks.timer_service')
+    def test_failed_timer_is_left_leased(self, mock_timer_service, mock_handlers, mock_logger):
+        mock_handlers.get.return_value = MagicMock(side_effect=Exception("boom"))
+        mock_timer_service.claim.return_value = ["flush:a"]
+
+        fire_due_timers()
+
+        mock_timer_service.ack.assert_called_once_with([])
+        mock_logger.error.assert_called_once()
+
+    @patch('realmate_challenge_app.tasks.observe_task')
+    @patch('realmate_challenge_app.tasks.logger')
+    @patch('realmate_challenge_app.tasks.TIMER_HANDLERS')
+    @patch('realmate_challenge_app.tasks.timer_service')
+    def test_handler_run_time_is_recorded_by_outcome(
+        self, mock_timer_service, mock_handlers, mock_logger, mock_observe_task
+    ):
+        flush_handler = MagicMock(side_effect=[[], None, Exception("boom")])
+        flush_handler.name = "realmate_challenge_app.tasks.flush_conversation"
+        mock_handlers.get.return_value = flush_handler
+        mock_timer_service.claim.return_value = ["flush:a", "flush:b", "flush:c"]
+
+        fire_due_timers()
+
+        self.assertEqual(mock_observe_task.call_args_list, [
+            call("realmate_challenge_app.tasks.flush_conversation", "SUCCESS", ANY),
+            call("realmate_challenge_app.tasks.flush_conversation", "RETRY", ANY),
+            call("realmate_challenge_app.tasks.flush_conversation", "FAILURE", ANY),
+        ])
+
+    @patch('realmate_challenge_app.tasks.logger')
+    @patch('realmate_challenge_app.tasks.timer_service')
+    def test_unknown_timer_is_dropped(self, mock_timer_service, mock_logger):
+        mock_timer_service.claim.return_value = ["unknown:a"]
+
+        fire_due_timers()
+
+        mock_logger.warning.assert_called_once_with(MSG_UNKNOWN_TIMER, timer="unknown:a")
+        mock_timer_service.ack.assert_called_once_with(["unknown:a"])
@@ -0,0 +1,146 @@
+import uuid
+from unittest.mock import patch
+
+import redis
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import SimpleTestCase, override_settings
+
+from realmate_challenge_app.management.commands.run_timers import MSG_TIMER_RUNNER_DATABASE_ERROR
+from realmate_challenge_app.redis_client import get_redis_client
+from realmate_challenge_app.timers import (
+    TimerService,
+    FLUSH_CONVERSATION_TIMER,
+    EXPIRE_ORPHANS_TIMER,
+    MSG_TIMER_SERVICE_UNAVAILABLE,
+    schedule_conversation_flush,
+    schedule_orphan_expiry,
+)
+
+
+class TestTimerService(SimpleTestCase):
+    def setUp(self):
+        self.timers = TimerService(key_prefix=f"test-timers:{uuid.uuid4()}", lease_ms=1000)
+        self.addCleanup(get_redis_client().delete, self.timers.due_key, self.timers.leased_key)
+        patcher = patch('realmate_challenge_app.timers._now_ms', return_value=1_000_000)
+        self.mock_now = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_timer_is_claimed_only_once_it_is_due(self):
+        self.timers.schedule("flush:a", 5000)
+
+        self.mock_now.return_value = 1_004_999
+        self.assertEqual(self.timers.claim(), [])
+        self.assertEqual(self.timers.next_due_in_ms(), 1)
+
+        self.mock_now.return_value = 1_005_000
+        self.assertEqual(self.timers.claim(), ["flush:a"])
+        self.assertIsNone(self.timers.next_due_in_ms())
+
+    def test_rescheduling_coalesces_into_one_timer(self):
+        self.timers.schedule("flush:a", 5000)
+        self.mock_now.return_value = 1_003_000
+        self.timers.schedule("flush:a", 5000)
+
+        self.assertEqual(get_redis_client().zcard(self.timers.due_key), 1)
+        self.mock_now.return_value = 1_005_000
+        self.assertEqual(self.timers.claim(), [])
+        self.mock_now.return_value = 1_008_000
+        self.assertEqual(self.timers.claim(), ["flush:a"])
+
+    def test_claim_respects_limit_and_due_order(self):
+        self.timers.schedule("flush:b", 20)
+        self.timers.schedule("flush:a", 10)
+        self.timers.schedule("flush:c", 30)
+        self.mock_now.return_value = 1_000_030
+
+        self.assertEqual(self.timers.claim(limit=2), ["flush:a", "flush:b"])
+        self.assertEqual(self.timers.claim(limit=2), ["flush:c"])
+
+    def test_acked_timer_is_not_redelivered(self):
+        self.timers.schedule("flush:a", 0)
+        self.assertEqual(self.timers.claim(), ["flush:a"])
+
+        self.timers.ack(["flush:a"])
+
+        self.mock_now.return_value = 1_010_000
+        self.assertEqual(self.timers.claim(), [])
+
+    def test_unacked_timer_is_redelivered_after_lease_expires(self):
+        self.timers.schedule("flush:a", 0)
+        self.assertEqual(self.timers.claim(), ["flush:a"])
+
+        self.mock_now.return_value = 1_000_999
+        self.assertEqual(self.timers.claim(), [])
+        self.mock_now.return_value = 1_001_000
+        self.assertEqual(self.timers.claim(), ["flush:a"])
+
+    def test_timer_rescheduled_while_leased_keeps_new_due_time(self):
+        self.timers.schedule("flush:a", 0)
+        self.assertEqual(self.timers.claim(), ["flush:a"])
+        self.timers.schedule("flush:a", 5000)
+
+        self.mock_now.return_value = 1_001_000
+        self.assertEqual(self.timers.claim(), [])
+        self.mock_now.return_value = 1_005_000
+        self.assertEqual(self.timers.claim(), ["flush:a"])
+
+    @patch('realmate_challenge_app.timers.logger')
+    @patch('realmate_challenge_app.timers.get_redis_client')
+    def test_schedule_logs_when_redis_is_unavailable(self, mock_get_redis_client, mock_logger):
+        error = redis.ConnectionError("down")
+        mock_get_redis_client.return_value.zadd.side_effect = error
+
+        self.timers.schedule("flush:a", 5000)
+
+        mock_logger.warning.assert_called_once_with(MSG_TIMER_SERVICE_UNAVAILABLE, ["flush:a"], error)
+
+
+class TestScheduleHelpers(SimpleTestCase):
+    @override_settings(INBOUND_FLUSH_DELAY_MS=5000)
+    @patch('realmate_challenge_app.timers.timer_service')
+    def test_schedule_conversation_flush(self, mock_timer_service):
+        conversation_id = uuid.uuid4()
+
+        schedule_conversation_flush([conversation_id])
+
+        mock_timer_service.schedule_many.assert_called_once_with(
+            [FLUSH_CONVERSATION_TIMER.format(conversation_id)], 5000
+        )
+
+    @override_settings(PENDING_MESSAGES_TTL_SECONDS=6)
+    @patch('realmate_challenge_app.timers.timer_service')
+    def test_schedule_orphan_expiry(self, mock_timer_service):
+        conversation_id = uuid.uuid4()
+
+        schedule_orphan_expiry([conversation_id])
+
+        mock_timer_service.schedule_many.assert_called_once_with(
+            [EXPIRE_ORPHANS_TIMER.format(conversation_id)], 6000
+        )
+
+
+class StopRunner(Exception):
+    pass
+
+
+class TestRunTimersCommand(SimpleTestCase):
+    @patch('realmate_challenge_app.management.commands.run_timers.logger')
+    @patch('realmate_challenge_app.management.commands.run_timers.time.sleep', side_effect=[None, StopRunner])
+    @patch('realmate_challenge_app.management.commands.run_timers.timer_service')
+    @patch('realmate_challenge_app.management.commands.run_timers.fire_due_timers')
+    @patch('realmate_challenge_app.management.commands.run_timers.close_old_connections')
+    def test_connections_are_recycled_every_iteration(
+        self, mock_close_old_connections, mock_fire_due_timers, mock_timer_service, mock_sleep, mock_logger
+    ):
+        error = OperationalError("server closed the connection unexpectedly")
+        mock_close_old_connections.side_effect = [error, None, None]
+        mock_fire_due_timers.side_effect = [1, 0]
+        mock_timer_service.next_due_in_ms.return_value = None
+
+        with self.assertRaises(StopRunner):
+            call_command("run_timers")
+
+        self.assertEqual(mock_close_old_connections.call_count, 3)
+        self.assertEqual(mock_fire_due_timers.call_count, 2)
+        mock_logger.warning.assert_called_once_with(MSG_TIMER_RUNNER_DATABASE_ERROR, error)
@@ -0,0 +1,99 @@
+import time
+
+import redis
+from django.conf import settings
+
+from realmate_challenge.logger import logger
+from .redis_client import get_redis_client
+
+TIMERS_KEY_PREFIX = "timers"
+FLUSH_CONVERSATION_TIMER = "flush:{}"
+EXPIRE_ORPHANS_TIMER = "expire:{}"
+MSG_TIMER_SERVICE_UNAVAILABLE = "Timer service unavailable, timer {} not scheduled. Error: {}"
+
+# Gives expired leases back to the due set (unless the timer was rescheduled
+# meanwhile) and leases up to ARGV[3] timers that are due.
+CLAIM_SCRIPT = """
+local now = tonumber(ARGV[1])
+local lease_until = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+for _, timer in ipairs(expired) do
+    redis.call('ZADD', KEYS[1], 'NX', now, timer)
+    redis.call('ZREM', KEYS[2], timer)
+end
+
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, limit)
+for _, timer in ipairs(due) do
+    redis.call('ZREM', KEYS[1], timer)
+    redis.call('ZADD', KEYS[2], lease_until, timer)
+end
+return due
+"""
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class TimerService:
+    """
+    Delayed jobs kept in a Redis sorted set scored by due time in ms. A timer
+    key is unique, so scheduling it again reschedules it instead of adding a
+    second job. Consumers claim due timers, which leases them for
+    ``lease_ms``, and ack them once handled; timers that are never acked
+    become due again when their lease expires.
+    """
+
+    def __init__(self, key_prefix: str = TIMERS_KEY_PREFIX, lease_ms: int = 30000):
+        self.due_key = f"{key_prefix}:due"
+        self.leased_key = f"{key_prefix}:leased"
+        self.lease_ms = lease_ms
+
+    def schedule(self, timer: str, delay_ms: int) -> None:
+        self.schedule_many([timer], delay_ms)
+
+    def schedule_many(self, timers: list[str], delay_ms: int) -> None:
+        if not timers:
+            return
+        due_at = _now_ms() + delay_ms
+        try:
+            get_redis_client().zadd(self.due_key, {timer: due_at for timer in timers})
+        except redis.RedisError as exc:
+            logger.warning(MSG_TIMER_SERVICE_UNAVAILABLE, timers, exc)
+
+    def claim(self, limit: int = 100) -> list[str]:
+        now = _now_ms()
+        claimed = get_redis_client().eval(
+            CLAIM_SCRIPT, 2, self.due_key, self.leased_key, now, now + self.lease_ms, limit
+        )
+        return [timer.decode() for timer in claimed]
+
+    def ack(self, timers: list[str]) -> None:
+        if timers:
+            get_redis_client().zrem(self.leased_key, *timers)
+
+    def next_due_in_ms(self) -> int | None:
+        head = get_redis_client().zrange(self.due_key, 0, 0, withscores=True)
+        if not head:
+            return None
+        _, due_at = head[0]
+        return max(0, int(due_at) - _now_ms())
+
+
+timer_service = TimerService(lease_ms=settings.TIMERS_LEASE_MS)
+
+
+def schedule_conversation_flush(conversation_ids) -> None:
+    timer_service.schedule_many(
+        [FLUSH_CONVERSATION_TIMER.format(conversation_id) for conversation_id in conversation_ids],
+        settings.INBOUND_FLUSH_DELAY_MS,
+    )
+
+
+def schedule_orphan_expiry(conversation_ids) -> None:
+    timer_service.schedule_many(
+        [EXPIRE_ORPHANS_TIMER.format(conversation_id) for conversation_id in conversation_ids],
+        settings.PENDING_MESSAGES_TTL_SECONDS * 1000,
+    )
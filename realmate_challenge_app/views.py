@@ -1,19 +1,77 @@
+import asyncio
+import json
+import time
 from typing import Any
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import QuerySet
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.http.response import HttpResponseBase
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from kombu.exceptions import OperationalError
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework.views import APIView
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.exceptions import APIException, ValidationError as DRFValidationError
 from rest_framework.generics import RetrieveAPIView
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
 
 from realmate_challenge.logger import logger
+from . import queries
+from .conversation_cache import conversation_cache
+from .events import CONVERSATION_EVENTS_CHANNEL, get_async_redis_client, notify_conversations_changed
+from .export import export_conversations
+from .idempotency import seen_events
+from .metrics import observe_webhook, observe_webhook_batch, render_metrics
 from .models import Conversation, Message
+from .pagination import (
+    MessageDeltaSync,
+    MessageKeysetPagination,
+    decode_sequence_cursor,
+    encode_sequence_cursor,
+    messages_since,
+    parse_limit,
+)
+from .parsers import NDJSONParser
+from .pending import get_pending_buffer
+from .sessions import get_session_windows
+from .tasks import reply_to_burst
+from .timers import schedule_conversation_flush
 from .serializers.payloads import (
+    ConversationExportFiltersSerializer,
     NewConversationPayloadSerializer,
     NewMessagePayloadSerializer,
     CloseConversationPayloadSerializer,
 )
-from .serializers.responses import ConversationDetailSerializer
+from .serializers.fast_payloads import get_webhook_decoder
+from .serializers.fast import (
+    message_rows,
+    render_conversation_delta,
+    render_conversation_detail,
+    render_conversation_snapshot,
+)
+from .serializers.responses import ConversationDetailSerializer, MessageSerializer
+
+UTF8_CHARSETS = ("utf-8", "utf8")
+SSE_RETRY = "retry: {}\n\n"
+SSE_KEEPALIVE = ": keepalive\n\n"
 
 INVALID_PAYLOAD_MESSAGE = "Invalid or inexistent payload."
 INTERNAL_SERVER_ERROR_MESSAGE = "Internal server error: {}"
@@ -21,47 +79,72 @@ ERROR_CONVERSATION_ALREADY_EXISTS = "Conversation {} already exists"
 ERROR_CONVERSATION_CLOSED = "Conversation {} is closed"
 ERROR_CONVERSATION_ALREADY_CLOSED = "Conversation {} is already closed"
 ERROR_CONVERSATION_NOT_FOUND = "Conversation {} not found"
+ERROR_NO_CONVERSATION_MATCHES = "No Conversation matches the given query."
+ERROR_INVALID_PAGINATION = "Invalid pagination parameters."
+ERROR_INVALID_WAIT = "wait must be a number of seconds between 0 and {}"
+ERROR_INVALID_EXPORT_FILTERS = "Invalid export filters."
+ERROR_EVENTS_REQUIRE_ASGI = "Conversation events are only streamed by the ASGI application."
+ERROR_INVALID_BATCH = "Batch body must be a non-empty JSON array or NDJSON stream with at most {} events."
 
 MESSAGE_CONVERSATION_CREATED = "Conversation {} created"
 MESSAGE_PROCESSED = "Message {message_id} processed with conversation {conversation_id} and timestamp {timestamp}"
 MESSAGE_WITHOUT_CONVERSATION_PROCESSED = "Message {message_id} processed without conversation {conversation_id}"
 MESSAGE_CONVERSATION_CLOSED = "Conversation {} closed"
+MESSAGE_ALREADY_RECEIVED = "Message {} already received"
+MESSAGE_DUPLICATED_EVENT = "Event {} already applied, replaying its outcome"
 MESSAGE_UNKNOWN_OPERATION_RESULT = "Unknown operation result"
+MESSAGE_BATCH_PROCESSED = "Batch of {total} events processed: {accepted} accepted, {rejected} rejected"
+MESSAGE_EVENT_STREAM_INTERRUPTED = "Event stream of conversation {} interrupted. Error: {}"
+MESSAGE_BURST_REPLY_NOT_QUEUED = "Reply to burst of conversation {} not queued, it will go out on flush. Error: {}"
 
 
-class WebhookView(APIView):
-    def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        payload_type = request.data.get("type")
+class WebhookEventHandler:
+    """
+    Validation and processing of a single webhook event, shared by
+    WebhookView and AsyncWebhookView.
+    """
+
+    def _validate_request(self, request: Request) -> tuple[str | None, dict | tuple[dict, int]]:
+        decoded_event = self._decode_event(request)
+        if decoded_event:
+            return decoded_event
 
+        payload_type = request.data.get("type")
         serializer_class = self._get_serializer_class(payload_type)
         if not serializer_class:
-            return Response(
-                {"error": INVALID_PAYLOAD_MESSAGE},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            return None, ({"error": INVALID_PAYLOAD_MESSAGE}, status.HTTP_400_BAD_REQUEST)
 
+        serializer = serializer_class(data=request.data)
         try:
-            serializer = serializer_class(data=request.data)
             serializer.is_valid(raise_exception=True)
-            validated_payload = serializer.validated_data
+        except DRFValidationError as exc:
+            logger.exception(INVALID_PAYLOAD_MESSAGE)
+            return None, ({"error": INVALID_PAYLOAD_MESSAGE, "details": exc.detail}, status.HTTP_400_BAD_REQUEST)
+        return payload_type, serializer.validated_data
 
+    def _process_event(self, payload_type: str, validated_payload: dict) -> tuple[dict, int]:
+        try:
             output, http_status = self._process_payload(payload_type, validated_payload)
+        except Exception as exc:
+            logger.error(INTERNAL_SERVER_ERROR_MESSAGE, exc)
+            return {"error": INTERNAL_SERVER_ERROR_MESSAGE.format(str(exc))}, status.HTTP_500_INTERNAL_SERVER_ERROR
 
-            logger.info(output.get("message", output.get("error", MESSAGE_UNKNOWN_OPERATION_RESULT)))
-            return Response(output, status=http_status)
+        logger.info(output.get("message", output.get("error", MESSAGE_UNKNOWN_OPERATION_RESULT)))
+        return output, http_status
 
-        except DRFValidationError as exc:
-            logger.exception(INVALID_PAYLOAD_MESSAGE)
-            return Response(
-                {"error": INVALID_PAYLOAD_MESSAGE, "details": exc.detail},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        except Exception as exc:
-            logger.error(INTERNAL_SERVER_ERROR_MESSAGE.format(str(exc)))
-            return Response(
-                {"error": INTERNAL_SERVER_ERROR_MESSAGE.format(str(exc))},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+    def _decode_event(self, request: Request) -> tuple[str, dict] | None:
+        decoder = get_webhook_decoder()
+        body = self._get_utf8_body(request, [JSONParser.media_type]) if decoder else None
+        return decoder.decode(body) if body is not None else None
+
+    def _get_utf8_body(self, request: Request, media_types: list[str]) -> bytes | None:
+        # The fast path decodes raw UTF-8 bytes, anything else goes through the parsers.
+        if request.content_type not in media_types or (request.encoding or "utf-8").lower() not in UTF8_CHARSETS:
+            return None
+        try:
+            return request.body
+        except RequestDataTooBig:
+            return None
 
     def _get_serializer_class(self, payload_type: str):
         if payload_type == "NEW_CONVERSATION":
@@ -82,65 +165,772 @@ class WebhookView(APIView):
 
     def _handle_new_conversation(self, validated_payload: dict) -> tuple[dict, int]:
         conversation_id = validated_payload["data"]["id"]
-        
-        _, created = Conversation.objects.get_or_create(
-            id=conversation_id,
-        )
-        if created:
+
+        if queries.insert_conversation(conversation_id):
+            if get_pending_buffer().adopt([conversation_id]):
+                self._on_messages_added([conversation_id])
             return {"message": MESSAGE_CONVERSATION_CREATED.format(conversation_id)}, status.HTTP_201_CREATED
         return {"error": ERROR_CONVERSATION_ALREADY_EXISTS.format(conversation_id)}, status.HTTP_400_BAD_REQUEST
-    
+
     def _handle_new_message(self, validated_payload: dict) -> tuple[dict, int]:
         message_id = validated_payload["data"]["id"]
         conversation_id = validated_payload["data"]["conversation_id"]
         content = validated_payload["data"]["content"]
         timestamp = validated_payload["timestamp"]
 
-        try:
-            conversation = Conversation.objects.get(id=conversation_id)
-            if conversation.status == Conversation.Status.CLOSED:
-                logger.warning(ERROR_CONVERSATION_CLOSED.format(conversation_id))
-                return {"error": ERROR_CONVERSATION_CLOSED.format(conversation_id)}, status.HTTP_400_BAD_REQUEST
-        except Conversation.DoesNotExist:
-            conversation = None
-        
+        seen_outcome = seen_events.get(message_id)
+        if seen_outcome is not None:
+            logger.info(MESSAGE_DUPLICATED_EVENT, message_id)
+            return seen_outcome
 
-        if not conversation:
+        pending_buffer = get_pending_buffer()
+        conversation_status, inserted = queries.insert_inbound_message(
+            message_id, conversation_id, content, timestamp, keep_orphan=pending_buffer.stores_orphan_rows
+        )
+
+        if conversation_status == Conversation.Status.CLOSED:
+            logger.warning(ERROR_CONVERSATION_CLOSED, conversation_id)
+            return {"error": ERROR_CONVERSATION_CLOSED.format(conversation_id)}, status.HTTP_400_BAD_REQUEST
+
+        if conversation_status is None:
+            self._buffer_early_messages(pending_buffer, [Message(
+                id=message_id,
+                content=content,
+                timestamp=timestamp,
+                expected_conversation_id=conversation_id,
+            )])
             output_message = MESSAGE_WITHOUT_CONVERSATION_PROCESSED.format(
                 message_id=message_id, conversation_id=conversation_id
             )
-            expected_conversation_id = conversation_id
+        elif not inserted:
+            output_message = MESSAGE_ALREADY_RECEIVED.format(message_id)
         else:
+            self._observe_new_messages([(conversation_id, message_id, timestamp)])
+            self._on_messages_added([conversation_id])
             output_message = MESSAGE_PROCESSED.format(
-                message_id=message_id, conversation_id=conversation.id, timestamp=timestamp
+                message_id=message_id, conversation_id=conversation_id, timestamp=timestamp
             )
-            expected_conversation_id = None
 
-        Message.objects.create(
+        seen_events.remember(message_id, {"message": output_message}, status.HTTP_202_ACCEPTED)
+        return {"message": output_message}, status.HTTP_202_ACCEPTED
+
+    def _buffer_early_messages(self, pending_buffer, messages: list[Message]) -> None:
+        pending_buffer.buffer(messages)
+        # A conversation may have been created, and its adoption run, after
+        # these messages found it missing but before they were stored.
+        created_ids = list(Conversation.objects.filter(
+            id__in={message.expected_conversation_id for message in messages}, status=Conversation.Status.OPEN
+        ).values_list("id", flat=True))
+        if created_ids and pending_buffer.adopt(created_ids):
+            self._on_messages_added(created_ids)
+
+    def _on_messages_added(self, conversation_ids) -> None:
+        notify_conversations_changed(conversation_ids)
+        schedule_conversation_flush(conversation_ids)
+
+    def _observe_new_messages(self, messages: list[tuple]) -> None:
+        session_windows = get_session_windows()
+        for conversation_id, message_id, timestamp in messages:
+            closed_burst = session_windows.observe(conversation_id, message_id, timestamp)
+            if not closed_burst:
+                continue
+            try:
+                reply_to_burst.delay(str(conversation_id), closed_burst)
+            except OperationalError as exc:
+                logger.warning(MESSAGE_BURST_REPLY_NOT_QUEUED, conversation_id, exc)
+
+    def _handle_close_conversation(self, validated_payload: dict) -> tuple[dict, int]:
+        conversation_id = validated_payload["data"]["id"]
+
+        conversation_status, closed = queries.close_conversation(conversation_id)
+        if closed:
+            notify_conversations_changed([conversation_id])
+            return {"message": MESSAGE_CONVERSATION_CLOSED.format(conversation_id)}, status.HTTP_200_OK
+        if conversation_status is None:
+            return {"error": ERROR_CONVERSATION_NOT_FOUND.format(conversation_id)}, status.HTTP_400_BAD_REQUEST
+        return {"error": ERROR_CONVERSATION_ALREADY_CLOSED.format(conversation_id)}, status.HTTP_400_BAD_REQUEST
+
+
+class WebhookView(WebhookEventHandler, APIView):
+    def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        started = time.perf_counter()
+        try:
+            payload_type, validated_payload = self._validate_request(request)
+        except APIException as exc:
+            observe_webhook(None, exc.status_code, started)
+            raise
+        if payload_type is None:
+            output, http_status = validated_payload
+        else:
+            output, http_status = self._process_event(payload_type, validated_payload)
+        observe_webhook(payload_type, http_status, started)
+        return Response(output, status=http_status)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncWebhookView(WebhookEventHandler, View):
+    """
+    WebhookView for the ASGI application, routed when API_VIEWS is 'async'.
+    The event is parsed and validated on the event loop. Its single write
+    statement and the Redis side effects around it then run in one
+    sync_to_async call, the way the async ORM runs each of its queries, so
+    a slow Postgres round trip holds a thread instead of a worker process.
+    """
+
+    async def post(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        started = time.perf_counter()
+        try:
+            payload_type, validated_payload = self._validate_request(Request(request, parsers=[JSONParser()]))
+        except APIException as exc:
+            observe_webhook(None, exc.status_code, started)
+            return JsonResponse({"detail": exc.detail}, status=exc.status_code)
+
+        if payload_type is None:
+            output, http_status = validated_payload
+        else:
+            output, http_status = await sync_to_async(self._process_event)(payload_type, validated_payload)
+        observe_webhook(payload_type, http_status, started)
+        return JsonResponse(output, status=http_status)
+
+
+class ConversationDetailMixin:
+    """Parts of the conversation detail read path shared by its sync and async views."""
+
+    def _not_modified(self, etag: str) -> HttpResponseNotModified:
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    def _cached_response(self, body: bytes, etag: str, immutable: bool) -> HttpResponse:
+        response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        response["Cache-Control"] = (
+            f"public, max-age={settings.CLOSED_CONVERSATION_MAX_AGE_SECONDS}, immutable" if immutable else "no-cache"
+        )
+        return response
+
+    def _get_pagination(self) -> MessageKeysetPagination:
+        return MessageKeysetPagination(
+            default_limit=settings.CONVERSATION_MESSAGES_DEFAULT_LIMIT,
+            max_limit=settings.CONVERSATION_MESSAGES_MAX_LIMIT,
+        )
+
+    def _get_delta_sync(self) -> MessageDeltaSync:
+        return MessageDeltaSync(
+            default_limit=settings.CONVERSATION_MESSAGES_DEFAULT_LIMIT,
+            max_limit=settings.CONVERSATION_MESSAGES_MAX_LIMIT,
+        )
+
+    def _render_snapshot(self, request: Request, conversation: Conversation) -> bytes | None:
+        # Only when the first page is the whole conversation and the snapshot
+        # holds all of it; its timestamps are rendered in UTC.
+        snapshot = getattr(conversation, "snapshot", None)
+        if snapshot is None or request.query_params.get("after") or request.query_params.get("before"):
+            return None
+        if str(timezone.get_current_timezone()) != "UTC":
+            return None
+        try:
+            limit = parse_limit(
+                request, settings.CONVERSATION_MESSAGES_DEFAULT_LIMIT, settings.CONVERSATION_MESSAGES_MAX_LIMIT
+            )
+        except ValueError:
+            return None
+        if len(snapshot.transcript) != snapshot.message_count or snapshot.message_count > limit:
+            return None
+        return render_conversation_snapshot(conversation, snapshot.transcript)
+
+    def _get_wait_seconds(self, request: Request) -> float:
+        raw_wait = request.query_params.get("wait")
+        if raw_wait is None:
+            return 0
+        max_wait = settings.CONVERSATION_LONG_POLL_MAX_SECONDS
+        try:
+            wait_seconds = float(raw_wait)
+        except ValueError:
+            raise ValueError(ERROR_INVALID_WAIT.format(max_wait))
+        if not 0 <= wait_seconds <= max_wait:
+            raise ValueError(ERROR_INVALID_WAIT.format(max_wait))
+        return wait_seconds
+
+    def _pending_inbound_messages(self, conversation: Conversation) -> QuerySet:
+        return Message.objects.filter(
+            conversation_id=conversation.id, processed=False, type=Message.MessageType.INBOUND
+        )
+
+
+class ConversationDetailView(ConversationDetailMixin, RetrieveAPIView):
+    queryset = Conversation.objects.select_related("snapshot")
+    serializer_class = ConversationDetailSerializer
+    lookup_field = "id"
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponse:
+        conversation_id = kwargs[self.lookup_field]
+        if "since" in request.query_params:
+            return self._render_delta(request, conversation_id)
+
+        request_key = conversation_cache.request_key(request.build_absolute_uri())
+        version = self._get_version(conversation_id)
+        if version is None:
+            response, _ = self._render_detail(request)
+            return response
+
+        etag = conversation_cache.etag(version, request_key)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return self._not_modified(etag)
+
+        cached = conversation_cache.get(conversation_id, version, request_key)
+        if cached is None:
+            response, conversation = self._render_detail(request)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = response.content
+            immutable = self._is_immutable(conversation)
+            conversation_cache.set(conversation_id, version, request_key, body, immutable)
+        else:
+            body, immutable = cached
+        return self._cached_response(body, etag, immutable)
+
+    def _get_version(self, conversation_id) -> str | None:
+        # The version is created before the conversation is read, so a write
+        # landing in between moves it on, but only for ids that exist.
+        version = conversation_cache.get_version(conversation_id, create=False)
+        if version is None and Conversation.objects.filter(id=conversation_id).exists():
+            version = conversation_cache.get_version(conversation_id)
+        return version
+
+    def _render_detail(self, request: Request) -> tuple[HttpResponseBase, Conversation]:
+        conversation = self.get_object()
+        body = self._render_snapshot(request, conversation)
+        if body is not None:
+            return HttpResponse(body, content_type="application/json"), conversation
+
+        try:
+            messages, next_url, previous_url = self._get_pagination().paginate(
+                message_rows(Message.objects.filter(conversation_id=conversation.id)), request
+            )
+        except ValueError as exc:
+            return Response(
+                {"error": ERROR_INVALID_PAGINATION, "details": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST,
+            ), conversation
+
+        body = render_conversation_detail(conversation, messages, next_url, previous_url)
+        return HttpResponse(body, content_type="application/json"), conversation
+
+    def _render_delta(self, request: Request, conversation_id) -> HttpResponseBase:
+        conversation = self.get_object()
+        delta_sync = self._get_delta_sync()
+        try:
+            wait_seconds = self._get_wait_seconds(request)
+            deadline = time.monotonic() + wait_seconds
+            version = conversation_cache.get_version(conversation_id) if wait_seconds else None
+            messages, cursor, has_more = delta_sync.fetch(
+                message_rows(Message.objects.filter(conversation_id=conversation.id), "sequence"), request
+            )
+            while not messages and self._wait_for_change(conversation_id, version, deadline):
+                version = conversation_cache.get_version(conversation_id)
+                conversation.refresh_from_db(fields=["status"])
+                messages, cursor, has_more = delta_sync.fetch(
+                    message_rows(Message.objects.filter(conversation_id=conversation.id), "sequence"), request
+                )
+        except ValueError as exc:
+            return Response(
+                {"error": ERROR_INVALID_PAGINATION, "details": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        body = render_conversation_delta(conversation, messages, cursor, has_more)
+        return HttpResponse(body, content_type="application/json")
+
+    def _wait_for_change(self, conversation_id, version: str | None, deadline: float) -> bool:
+        """
+        Sleeps until the conversation version moves on or ``deadline``
+        passes. Without a version (Redis unavailable) every interval counts
+        as a change, so the caller falls back to polling the database.
+        """
+        interval_seconds = settings.CONVERSATION_LONG_POLL_INTERVAL_MS / 1000
+        while time.monotonic() < deadline:
+            time.sleep(min(interval_seconds, max(0, deadline - time.monotonic())))
+            if version is None or conversation_cache.get_version(conversation_id) != version:
+                return True
+        return False
+
+    def _is_immutable(self, conversation: Conversation) -> bool:
+        return conversation.status == Conversation.Status.CLOSED and not self._pending_inbound_messages(
+            conversation
+        ).exists()
+
+
+class AsyncConversationDetailView(ConversationDetailMixin, View):
+    """
+    ConversationDetailView for the ASGI application, routed when API_VIEWS
+    is 'async': same responses, cache and ETags. Postgres is read through
+    the async ORM, the thread-safe Redis cache through sync_to_async on the
+    shared executor, and ``?wait=`` long-polls sleep on the event loop
+    instead of holding a worker.
+    """
+
+    async def get(self, request: HttpRequest, id) -> HttpResponseBase:
+        request = Request(request)
+        if "since" in request.query_params:
+            return await self._render_delta(request, id)
+
+        request_key = conversation_cache.request_key(request.build_absolute_uri())
+        version = await self._get_version(id)
+        if version is None:
+            response, _ = await self._render_detail(request, id)
+            return response
+
+        etag = conversation_cache.etag(version, request_key)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return self._not_modified(etag)
+
+        cached = await sync_to_async(conversation_cache.get, thread_sensitive=False)(id, version, request_key)
+        if cached is None:
+            response, conversation = await self._render_detail(request, id)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = response.content
+            immutable = await self._is_immutable(conversation)
+            await sync_to_async(conversation_cache.set, thread_sensitive=False)(id, version, request_key, body, immutable)
+        else:
+            body, immutable = cached
+        return self._cached_response(body, etag, immutable)
+
+    async def _get_version(self, conversation_id) -> str | None:
+        get_version = sync_to_async(conversation_cache.get_version, thread_sensitive=False)
+        version = await get_version(conversation_id, create=False)
+        if version is None and await Conversation.objects.filter(id=conversation_id).aexists():
+            version = await get_version(conversation_id)
+        return version
+
+    async def _get_conversation(self, conversation_id) -> Conversation | None:
+        try:
+            return await Conversation.objects.select_related("snapshot").aget(id=conversation_id)
+        except Conversation.DoesNotExist:
+            return None
+
+    def _not_found(self) -> JsonResponse:
+        # Same body DRF gives get_object_or_404 in the sync view.
+        return JsonResponse({"detail": ERROR_NO_CONVERSATION_MATCHES}, status=status.HTTP_404_NOT_FOUND)
+
+    async def _render_detail(self, request: Request, conversation_id) -> tuple[HttpResponseBase, Conversation | None]:
+        conversation = await self._get_conversation(conversation_id)
+        if conversation is None:
+            return self._not_found(), None
+        body = self._render_snapshot(request, conversation)
+        if body is not None:
+            return HttpResponse(body, content_type="application/json"), conversation
+
+        try:
+            messages, next_url, previous_url = await self._get_pagination().apaginate(
+                message_rows(Message.objects.filter(conversation_id=conversation.id)), request
+            )
+        except ValueError as exc:
+            return JsonResponse(
+                {"error": ERROR_INVALID_PAGINATION, "details": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST,
+            ), conversation
+
+        body = render_conversation_detail(conversation, messages, next_url, previous_url)
+        return HttpResponse(body, content_type="application/json"), conversation
+
+    async def _render_delta(self, request: Request, conversation_id) -> HttpResponseBase:
+        conversation = await self._get_conversation(conversation_id)
+        if conversation is None:
+            return self._not_found()
+        delta_sync = self._get_delta_sync()
+        rows = message_rows(Message.objects.filter(conversation_id=conversation.id), "sequence")
+        try:
+            wait_seconds = self._get_wait_seconds(request)
+            deadline = time.monotonic() + wait_seconds
+            version = await sync_to_async(conversation_cache.get_version, thread_sensitive=False)(conversation_id) if wait_seconds else None
+            messages, cursor, has_more = await delta_sync.afetch(rows, request)
+            while not messages and await self._wait_for_change(conversation_id, version, deadline):
+                version = await sync_to_async(conversation_cache.get_version, thread_sensitive=False)(conversation_id)
+                await conversation.arefresh_from_db(fields=["status"])
+                messages, cursor, has_more = await delta_sync.afetch(rows, request)
+        except ValueError as exc:
+            return JsonResponse(
+                {"error": ERROR_INVALID_PAGINATION, "details": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        body = render_conversation_delta(conversation, messages, cursor, has_more)
+        return HttpResponse(body, content_type="application/json")
+
+    async def _wait_for_change(self, conversation_id, version: str | None, deadline: float) -> bool:
+        interval_seconds = settings.CONVERSATION_LONG_POLL_INTERVAL_MS / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(min(interval_seconds, max(0, deadline - time.monotonic())))
+            if version is None or await sync_to_async(conversation_cache.get_version, thread_sensitive=False)(conversation_id) != version:
+                return True
+        return False
+
+    async def _is_immutable(self, conversation: Conversation) -> bool:
+        return conversation.status == Conversation.Status.CLOSED and not await self._pending_inbound_messages(
+            conversation
+        ).aexists()
+
+
+class ConversationEventsView(View):
+    """
+    Server-Sent Events stream of a conversation: a ``status`` event on
+    connect and whenever it changes, and a ``message`` event per new
+    message. Event ids are delta sync cursors, so a reconnecting client
+    resumes from Last-Event-ID (or ``?since=``) without gaps; without one
+    the stream starts after the latest message. Redis pub/sub only wakes
+    the stream up, messages are always read from Postgres. Only the ASGI
+    application serves it: under WSGI each idle stream would hold a worker,
+    so those requests get a 421.
+    """
+
+    async def get(self, request: HttpRequest, id) -> HttpResponseBase:
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"error": ERROR_EVENTS_REQUIRE_ASGI}, status=status.HTTP_421_MISDIRECTED_REQUEST)
+        conversation_status = await Conversation.objects.filter(id=id).values_list("status", flat=True).afirst()
+        if conversation_status is None:
+            return JsonResponse({"error": ERROR_CONVERSATION_NOT_FOUND.format(id)}, status=status.HTTP_404_NOT_FOUND)
+
+        since = request.headers.get("Last-Event-ID", request.GET.get("since"))
+        if since is None:
+            since = await self._get_latest_cursor(id)
+        elif since:
+            try:
+                decode_sequence_cursor(since)
+            except ValueError as exc:
+                return JsonResponse(
+                    {"error": ERROR_INVALID_PAGINATION, "details": str(exc)}, status=status.HTTP_400_BAD_REQUEST
+                )
+
+        response = StreamingHttpResponse(
+            self._stream(id, since, conversation_status), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def _get_latest_cursor(self, conversation_id) -> str:
+        latest = await Message.objects.filter(
+            conversation_id=conversation_id, sequence__isnull=False
+        ).order_by("-sequence").values_list("sequence", flat=True).afirst()
+        return encode_sequence_cursor(latest) if latest is not None else ""
+
+    async def _stream(self, conversation_id, since: str, last_status: str):
+        client = get_async_redis_client()
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(CONVERSATION_EVENTS_CHANNEL.format(conversation_id))
+            yield SSE_RETRY.format(settings.CONVERSATION_EVENTS_RETRY_MS)
+            yield self._format_event("status", {"status": last_status})
+
+            batch_size = settings.CONVERSATION_MESSAGES_MAX_LIMIT
+            while True:
+                sent = 0
+                async for message in messages_since(
+                    Message.objects.filter(conversation_id=conversation_id), since
+                )[:batch_size]:
+                    since = encode_sequence_cursor(message.sequence)
+                    yield self._format_event("message", MessageSerializer(message).data, event_id=since)
+                    sent += 1
+                if sent == batch_size:
+                    continue
+
+                current_status = await Conversation.objects.filter(
+                    id=conversation_id
+                ).values_list("status", flat=True).afirst()
+                if current_status != last_status:
+                    last_status = current_status
+                    yield self._format_event("status", {"status": last_status})
+
+                if not await self._wait_for_notification(pubsub, settings.CONVERSATION_EVENTS_KEEPALIVE_SECONDS):
+                    yield SSE_KEEPALIVE
+        except redis.RedisError as exc:
+            logger.warning(MESSAGE_EVENT_STREAM_INTERRUPTED, conversation_id, exc)
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+    async def _wait_for_notification(self, pubsub, timeout: float) -> bool:
+        # get_message returns None as soon as it reads a subscribe
+        # confirmation, so keep waiting until the timeout really expires.
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            if await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining) is not None:
+                return True
+        return False
+
+    def _format_event(self, event: str, data: dict, event_id: str | None = None) -> str:
+        payload = JSONRenderer().render(data).decode()
+        if event_id is None:
+            return f"event: {event}\ndata: {payload}\n\n"
+        return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class ConversationExportView(APIView):
+    """
+    Streams the conversations matching ``status``, ``created_after`` and
+    ``created_before`` with their messages as NDJSON. Serve it from the WSGI
+    application: under ASGI a synchronous streaming body is read into memory
+    before it is sent. `manage.py export_conversations` writes the same lines.
+    """
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        filters = ConversationExportFiltersSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return Response(
+                {"error": ERROR_INVALID_EXPORT_FILTERS, "details": filters.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        response = StreamingHttpResponse(
+            export_conversations(settings.CONVERSATION_EXPORT_CHUNK_SIZE, **filters.validated_data),
+            content_type=NDJSONParser.media_type,
+        )
+        response["Cache-Control"] = "no-store"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class WebhookBatchView(WebhookView):
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        started = time.perf_counter()
+        decoder = get_webhook_decoder()
+        raw_events = self._split_raw_events(decoder, request)
+        events = request.data if raw_events is None else raw_events
+        max_events = settings.WEBHOOK_BATCH_MAX_EVENTS
+        if not isinstance(events, list) or not events or len(events) > max_events:
+            observe_webhook_batch([], [], started)
+            return Response(
+                {"error": INVALID_PAYLOAD_MESSAGE, "details": ERROR_INVALID_BATCH.format(max_events)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if raw_events is None:
+            validated_events = [self._validate_event(event) for event in events]
+        else:
+            validated_events = [
+                decoder.decode(raw_event) or self._validate_event(json.loads(bytes(raw_event))) for raw_event in raw_events
+            ]
+
+        try:
+            results = self._process_batch(validated_events)
+        except Exception as exc:
+            logger.error(INTERNAL_SERVER_ERROR_MESSAGE, exc)
+            observe_webhook_batch([], [], started)
+            return Response(
+                {"error": INTERNAL_SERVER_ERROR_MESSAGE.format(str(exc))},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        observe_webhook_batch(
+            [payload_type for payload_type, _ in validated_events], [http_status for _, http_status in results], started
+        )
+        output = [{"status": http_status, **result} for result, http_status in results]
+        accepted = sum(1 for _, http_status in results if http_status < status.HTTP_400_BAD_REQUEST)
+        logger.info(MESSAGE_BATCH_PROCESSED, total=len(results), accepted=accepted, rejected=len(results) - accepted)
+        return Response({"results": output}, status=status.HTTP_200_OK)
+
+    def _split_raw_events(self, decoder, request: Request) -> list | None:
+        body = self._get_utf8_body(request, [JSONParser.media_type, NDJSONParser.media_type]) if decoder else None
+        if body is None:
+            return None
+        return decoder.split_batch(body, ndjson=request.content_type == NDJSONParser.media_type)
+
+    def _validate_event(self, event: Any) -> tuple[str | None, dict | tuple[dict, int]]:
+        payload_type = event.get("type") if isinstance(event, dict) else None
+        serializer_class = self._get_serializer_class(payload_type)
+        if not serializer_class:
+            return None, ({"error": INVALID_PAYLOAD_MESSAGE}, status.HTTP_400_BAD_REQUEST)
+
+        serializer = serializer_class(data=event)
+        if not serializer.is_valid():
+            return None, (
+                {"error": INVALID_PAYLOAD_MESSAGE, "details": serializer.errors},
+                status.HTTP_400_BAD_REQUEST,
+            )
+        return payload_type, serializer.validated_data
+
+    def _process_batch(self, validated_events: list) -> list[tuple[dict, int]]:
+        conversation_ids = set()
+        message_ids = set()
+        for payload_type, validated_payload in validated_events:
+            if payload_type == "NEW_MESSAGE":
+                conversation_ids.add(validated_payload["data"]["conversation_id"])
+                message_ids.add(validated_payload["data"]["id"])
+            elif payload_type is not None:
+                conversation_ids.add(validated_payload["data"]["id"])
+
+        with transaction.atomic():
+            conversation_status = dict(
+                Conversation.objects.select_for_update()
+                .filter(id__in=conversation_ids)
+                .order_by("id")
+                .values_list("id", "status")
+            )
+            existing_message_ids = set(
+                Message.objects.filter(id__in=message_ids).values_list("id", flat=True)
+            )
+
+            batch = {
+                "pending_buffer": get_pending_buffer(),
+                "conversation_status": conversation_status,
+                "existing_message_ids": existing_message_ids,
+                "seen_outcomes": seen_events.get_many(message_ids),
+                "accepted_outcomes": {},
+                "new_conversations": [],
+                "new_messages": [],
+                "orphan_messages": {},
+                "closing_ids": set(),
+            }
+
+            results = []
+            for payload_type, validated_payload in validated_events:
+                if payload_type is None:
+                    results.append(validated_payload)
+                elif payload_type == "NEW_CONVERSATION":
+                    results.append(self._plan_new_conversation(batch, validated_payload))
+                elif payload_type == "NEW_MESSAGE":
+                    results.append(self._plan_new_message(batch, validated_payload))
+                elif payload_type == "CLOSE_CONVERSATION":
+                    results.append(self._plan_close_conversation(batch, validated_payload))
+
+            # Rows a concurrent request inserted since the reads above are
+            # skipped, and their events answered as if they came after it.
+            created_ids = queries.insert_conversations(batch["new_conversations"])
+            inserted_ids = queries.insert_messages(batch["new_messages"])
+            self._apply_concurrent_duplicates(batch, validated_events, results, created_ids, inserted_ids)
+
+            observed_messages = [
+                (message.conversation_id_id, message.id, message.timestamp)
+                for message in batch["new_messages"]
+                if message.conversation_id_id is not None and str(message.id) in inserted_ids
+            ]
+            queries.apply_messages_to_snapshots([message_id for _, message_id, _ in observed_messages])
+            flush_ids = {conversation_id for conversation_id, _, _ in observed_messages}
+            new_conversation_ids = [
+                conversation_id for conversation_id in batch["new_conversations"] if str(conversation_id) in created_ids
+            ]
+            if batch["pending_buffer"].adopt(new_conversation_ids):
+                flush_ids.update(new_conversation_ids)
+            if batch["closing_ids"]:
+                Conversation.objects.filter(id__in=batch["closing_ids"]).update(
+                    status=Conversation.Status.CLOSED
+                )
+
+            orphan_messages = [
+                message
+                for messages in batch["orphan_messages"].values()
+                for message in messages
+            ]
+            # The batch is answered once it commits, so a failing callback is
+            # logged and the ones after it still run.
+            if orphan_messages:
+                transaction.on_commit(
+                    lambda: self._buffer_early_messages(batch["pending_buffer"], orphan_messages), robust=True
+                )
+            if observed_messages:
+                transaction.on_commit(lambda: self._observe_new_messages(observed_messages), robust=True)
+            if flush_ids:
+                transaction.on_commit(lambda: self._on_messages_added(flush_ids), robust=True)
+            if batch["closing_ids"]:
+                transaction.on_commit(lambda: notify_conversations_changed(batch["closing_ids"]), robust=True)
+            transaction.on_commit(lambda: seen_events.remember_many(batch["accepted_outcomes"]), robust=True)
+
+        return results
+
+    def _apply_concurrent_duplicates(
+        self, batch: dict, validated_events: list, results: list, created_ids: set, inserted_ids: set
+    ) -> None:
+        dropped_message_ids = {str(message.id) for message in batch["new_messages"]} - inserted_ids
+        for index, (payload_type, validated_payload) in enumerate(validated_events):
+            if results[index][1] >= status.HTTP_400_BAD_REQUEST:
+                continue
+            event_id = validated_payload["data"]["id"] if payload_type is not None else None
+            if payload_type == "NEW_CONVERSATION" and str(event_id) not in created_ids:
+                results[index] = (
+                    {"error": ERROR_CONVERSATION_ALREADY_EXISTS.format(event_id)}, status.HTTP_400_BAD_REQUEST
+                )
+            elif payload_type == "NEW_MESSAGE" and str(event_id) in dropped_message_ids:
+                results[index] = {"message": MESSAGE_ALREADY_RECEIVED.format(event_id)}, status.HTTP_202_ACCEPTED
+                batch["accepted_outcomes"].pop(str(event_id), None)
+
+    def _plan_new_conversation(self, batch: dict, validated_payload: dict) -> tuple[dict, int]:
+        conversation_id = validated_payload["data"]["id"]
+        if conversation_id in batch["conversation_status"]:
+            return {"error": ERROR_CONVERSATION_ALREADY_EXISTS.format(conversation_id)}, status.HTTP_400_BAD_REQUEST
+
+        batch["conversation_status"][conversation_id] = Conversation.Status.OPEN
+        batch["new_conversations"].append(conversation_id)
+
+        for message in batch["orphan_messages"].pop(conversation_id, []):
+            message.conversation_id_id = conversation_id
+            message.expected_conversation_id = None
+            if not batch["pending_buffer"].stores_orphan_rows:
+                batch["new_messages"].append(message)
+
+        return {"message": MESSAGE_CONVERSATION_CREATED.format(conversation_id)}, status.HTTP_201_CREATED
+
+    def _plan_new_message(self, batch: dict, validated_payload: dict) -> tuple[dict, int]:
+        message_id = validated_payload["data"]["id"]
+        conversation_id = validated_payload["data"]["conversation_id"]
+        timestamp = validated_payload["timestamp"]
+
+        seen_outcome = batch["seen_outcomes"].get(str(message_id))
+        if seen_outcome is not None:
+            return seen_outcome
+        if message_id in batch["existing_message_ids"]:
+            return {"message": MESSAGE_ALREADY_RECEIVED.format(message_id)}, status.HTTP_202_ACCEPTED
+
+        conversation_status = batch["conversation_status"].get(conversation_id)
+        if conversation_status == Conversation.Status.CLOSED:
+            return {"error": ERROR_CONVERSATION_CLOSED.format(conversation_id)}, status.HTTP_400_BAD_REQUEST
+
+        message = Message(
             id=message_id,
-            conversation_id=conversation,
             type=Message.MessageType.INBOUND,
-            content=content,
+            content=validated_payload["data"]["content"],
             timestamp=timestamp,
-            expected_conversation_id=expected_conversation_id
         )
+        batch["existing_message_ids"].add(message_id)
 
-        return {"message": output_message}, status.HTTP_202_ACCEPTED
+        if conversation_status is None:
+            message.expected_conversation_id = conversation_id
+            batch["orphan_messages"].setdefault(conversation_id, []).append(message)
+            if batch["pending_buffer"].stores_orphan_rows:
+                batch["new_messages"].append(message)
+            output_message = MESSAGE_WITHOUT_CONVERSATION_PROCESSED.format(
+                message_id=message_id, conversation_id=conversation_id
+            )
+        else:
+            message.conversation_id_id = conversation_id
+            batch["new_messages"].append(message)
+            output_message = MESSAGE_PROCESSED.format(
+                message_id=message_id, conversation_id=conversation_id, timestamp=timestamp
+            )
 
-    def _handle_close_conversation(self, validated_payload: dict) -> tuple[dict, int]:
+        outcome = {"message": output_message}, status.HTTP_202_ACCEPTED
+        batch["seen_outcomes"][str(message_id)] = outcome
+        batch["accepted_outcomes"][str(message_id)] = outcome
+        return outcome
+
+    def _plan_close_conversation(self, batch: dict, validated_payload: dict) -> tuple[dict, int]:
         conversation_id = validated_payload["data"]["id"]
-        try:
-            conversation = Conversation.objects.get(id=conversation_id)
-            if conversation.status == Conversation.Status.CLOSED:
-                return {"error": ERROR_CONVERSATION_ALREADY_CLOSED.format(conversation_id)}, status.HTTP_400_BAD_REQUEST
-            else:
-                conversation.status = Conversation.Status.CLOSED
-                conversation.save()
-                return {"message": MESSAGE_CONVERSATION_CLOSED.format(conversation_id)}, status.HTTP_200_OK
-        except Conversation.DoesNotExist:
+        conversation_status = batch["conversation_status"].get(conversation_id)
+        if conversation_status is None:
             return {"error": ERROR_CONVERSATION_NOT_FOUND.format(conversation_id)}, status.HTTP_400_BAD_REQUEST
+        if conversation_status == Conversation.Status.CLOSED:
+            return {"error": ERROR_CONVERSATION_ALREADY_CLOSED.format(conversation_id)}, status.HTTP_400_BAD_REQUEST
 
-class ConversationDetailView(RetrieveAPIView):
-    queryset = Conversation.objects.all()
-    serializer_class = ConversationDetailSerializer
-    lookup_field = "id"
\ No newline at end of file
+        batch["conversation_status"][conversation_id] = Conversation.Status.CLOSED
+        batch["closing_ids"].add(conversation_id)
+        return {"message": MESSAGE_CONVERSATION_CLOSED.format(conversation_id)}, status.HTTP_200_OK
+
+
+class MetricsView(View):
+    """Prometheus text exposition of the API, task and backlog metrics."""
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)